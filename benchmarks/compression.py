@@ -0,0 +1,61 @@
+"""
+Compares serialized value sizes (bytes on the wire) and the CPU cost of
+serializing and deserializing a value, for each codec and compressor.
+
+Does not require a running redis server, values are only (de)serialized.
+"""
+import sys
+import timeit
+
+import serialized_redis
+
+from base import Benchmark
+
+VALUES = {
+    'small': {'id': 1, 'name': 'small value', 'tags': ['a', 'b']},
+    'medium': [{'id': i, 'name': 'item %d' % i, 'enabled': True, 'tags': ['a', 'b']} for i in range(20)],
+    'large': [{'id': i, 'name': 'item %d' % i, 'enabled': True, 'tags': ['a', 'b']} for i in range(1000)],
+}
+
+
+class CompressionBenchmark(Benchmark):
+
+    ARGUMENTS = (
+        {
+            'name': 'codec',
+            'values': [serialized_redis.JSONSerializedRedis, serialized_redis.PickleSerializedRedis,
+                       serialized_redis.MsgpackSerializedRedis],
+        },
+        {
+            'name': 'compressor',
+            'values': [None, serialized_redis.ZlibCompressor(threshold=256),
+                       serialized_redis.LzmaCompressor(threshold=256)],
+        },
+        {
+            'name': 'value',
+            'values': list(VALUES),
+        },
+    )
+    NUMBER = 100
+
+    def setup(self, codec, compressor, value):
+        self.client = self.get_client(codec, compressor=compressor)
+        self.value = VALUES[value]
+
+    def run(self, codec, compressor, value):
+        self.client.deserialize(self.client.serialize(self.value))
+
+    def run_benchmark(self):
+        for codec in self.ARGUMENTS[0]['values']:
+            for compressor in self.ARGUMENTS[1]['values']:
+                for value in self.ARGUMENTS[2]['values']:
+                    self.setup(codec, compressor, value)
+                    size = len(self.client.serialize(self.value))
+                    t = timeit.timeit(lambda: self.run(codec, compressor, value), number=self.NUMBER)
+                    sys.stdout.write('Benchmark: codec=%s, compressor=%s, value=%s... %d bytes, %f\n' % (
+                        codec.__name__, type(compressor).__name__ if compressor else None, value, size, t))
+                    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    CompressionBenchmark().run_benchmark()
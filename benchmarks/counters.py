@@ -0,0 +1,93 @@
+"""
+Compares incrementing a serialized counter with the INCR script (see
+serialized_redis.counters) against a WATCH / GET / SET retry loop, with
+concurrent clients incrementing the same key.
+
+Requires a running redis server (db 9 is flushed).
+"""
+import sys
+import threading
+import time
+
+import redis
+
+import serialized_redis
+
+from base import Benchmark
+
+
+def watch_incr(r, name, amount=1):
+    "Increments ``name`` by ``amount`` with optimistic locking, returns the value and the number of retries"
+    retries = 0
+    with r.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(name)
+                value = (pipe.get(name) or 0) + amount
+                pipe.multi()
+                pipe.set(name, value)
+                pipe.execute()
+                return value, retries
+            except redis.WatchError:
+                retries += 1
+
+
+class CountersBenchmark(Benchmark):
+
+    ARGUMENTS = (
+        {
+            'name': 'client',
+            'values': ['pickle', 'msgpack'],
+        },
+        {
+            'name': 'mode',
+            'values': ['watch loop', 'incr script'],
+        },
+        {
+            'name': 'threads',
+            'values': [1, 4, 16],
+        },
+    )
+    CLIENTS = {
+        'pickle': serialized_redis.PickleSerializedRedis,
+        'msgpack': serialized_redis.MsgpackSerializedRedis,
+    }
+    # increments per thread
+    NUMBER = 1000
+
+    def run(self, client, mode, threads):
+        r = self.get_client(self.CLIENTS[client])
+        r.flushdb()
+        retries = []
+
+        def increment():
+            count = 0
+            for _ in range(self.NUMBER):
+                if mode == 'incr script':
+                    r.incr('counter')
+                else:
+                    count += watch_incr(r, 'counter')[1]
+            retries.append(count)
+
+        workers = [threading.Thread(target=increment) for _ in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        assert r.get('counter') == self.NUMBER * threads
+        return elapsed, sum(retries)
+
+    def run_benchmark(self):
+        for client in self.ARGUMENTS[0]['values']:
+            for mode in self.ARGUMENTS[1]['values']:
+                for threads in self.ARGUMENTS[2]['values']:
+                    elapsed, retries = self.run(client, mode, threads)
+                    sys.stdout.write('Benchmark: client=%s, mode=%s, threads=%d... %f (%d retries)\n'
+                                     % (client, mode, threads, elapsed, retries))
+                    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    CountersBenchmark().run_benchmark()
@@ -0,0 +1,66 @@
+"""
+Compares JSON backends of JSONSerializedRedis on a mix of commands
+(SET/GET, MGET, SADD/SMEMBERS, HMSET/HGETALL), backends that are not
+installed are skipped.
+
+Requires a redis server, db 9 is used.
+"""
+import serialized_redis
+from serialized_redis.json_backends import get_json_backend
+
+from base import Benchmark
+
+VALUE = {'id': 1, 'name': 'item', 'enabled': True, 'tags': ['a', 'b'], 'scores': [1.5, 2.5, 3.5]}
+VALUES = [dict(VALUE, id=i) for i in range(100)]
+
+
+def installed_backends():
+    backends = []
+    for name in ('json', 'simplejson', 'ujson', 'orjson'):
+        try:
+            get_json_backend(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    return backends
+
+
+class JSONBackendsBenchmark(Benchmark):
+
+    ARGUMENTS = (
+        {
+            'name': 'backend',
+            'values': installed_backends(),
+        },
+        {
+            'name': 'command',
+            'values': ['set/get', 'mget', 'sadd/smembers', 'hmset/hgetall'],
+        },
+    )
+    NUMBER = 500
+
+    def setup(self, backend, command):
+        self.client = self.get_client(serialized_redis.JSONSerializedRedis, json_backend=backend)
+        self.client.flushdb()
+        self.client.mset({'k%d' % i: value for i, value in enumerate(VALUES)})
+        self.keys = ['k%d' % i for i in range(len(VALUES))]
+        self.mapping = {str(i): value for i, value in enumerate(VALUES)}
+
+    def run(self, backend, command):
+        r = self.client
+        if command == 'set/get':
+            r.set('a', VALUE)
+            r.get('a')
+        elif command == 'mget':
+            r.mget(self.keys)
+        elif command == 'sadd/smembers':
+            r.delete('s')
+            r.sadd('s', *VALUES)
+            r.smembers_as_list('s')
+        else:
+            r.hmset('h', self.mapping)
+            r.hgetall('h')
+
+
+if __name__ == '__main__':
+    JSONBackendsBenchmark().run_benchmark()
@@ -0,0 +1,83 @@
+"""
+Compares msgpack serialization with module level functions (creating a
+packer per value) against MsgpackCodec reusing a packer per thread, with
+and without ext types. Pickle is included as the fallback for types
+msgpack can not serialize. Round trips and deserialization alone are
+timed.
+
+Does not require a running redis server, values are only (de)serialized.
+"""
+import datetime
+import decimal
+import functools
+import pickle
+import sys
+import timeit
+
+import msgpack
+
+from serialized_redis.msgpack_codec import ExtTypes, MsgpackCodec
+
+from base import Benchmark
+
+VALUES = {
+    'small': {'id': 1, 'name': 'small value', 'tags': ['a', 'b']},
+    'medium': [{'id': i, 'name': 'item %d' % i, 'enabled': True, 'tags': ['a', 'b']} for i in range(20)],
+    'typed': {'id': 1, 'created': datetime.datetime(2020, 1, 2, 3, 4, 5), 'price': decimal.Decimal('9.99'),
+              'tags': {'a', 'b'}},
+}
+
+CODECS = {
+    'msgpack functions': (msgpack.dumps, functools.partial(msgpack.unpackb, raw=False)),
+    'MsgpackCodec': (MsgpackCodec().dumps, MsgpackCodec().loads),
+    'MsgpackCodec ext types': (MsgpackCodec(ExtTypes()).dumps, MsgpackCodec(ExtTypes()).loads),
+    'pickle': (pickle.dumps, pickle.loads),
+}
+
+
+class MsgpackCodecBenchmark(Benchmark):
+
+    ARGUMENTS = (
+        {
+            'name': 'codec',
+            'values': list(CODECS),
+        },
+        {
+            'name': 'value',
+            'values': list(VALUES),
+        },
+        {
+            'name': 'operation',
+            'values': ['round trip', 'loads'],
+        },
+    )
+    NUMBER = 100000
+
+    def setup(self, codec, value):
+        self.dumps, self.loads = CODECS[codec]
+        self.value = VALUES[value]
+
+    def run(self, codec, value):
+        self.loads(self.dumps(self.value))
+
+    def run_loads(self, data):
+        self.loads(data)
+
+    def run_benchmark(self):
+        for codec in CODECS:
+            for value in VALUES:
+                self.setup(codec, value)
+                try:
+                    data = self.dumps(self.value)
+                except TypeError:
+                    # types not supported without ext types
+                    continue
+                t = timeit.timeit(lambda: self.run(codec, value), number=self.NUMBER)
+                sys.stdout.write('Benchmark: codec=%s, value=%s, operation=round trip... %f\n' % (codec, value, t))
+                t = timeit.timeit(lambda: self.run_loads(data), number=self.NUMBER)
+                sys.stdout.write('Benchmark: codec=%s, value=%s, operation=loads... %f\n' % (codec, value, t))
+                sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    MsgpackCodecBenchmark().run_benchmark()
@@ -0,0 +1,45 @@
+"""
+Compares the cost of creating pipelines with the cached pipeline class
+against building a new pipeline class on every call.
+
+Does not require a running redis server, pipelines are only created.
+"""
+import redis
+
+from base import Benchmark
+
+
+class PipelineCreationBenchmark(Benchmark):
+
+    ARGUMENTS = (
+        {
+            'name': 'mode',
+            'values': ['uncached class', 'cached class'],
+        },
+    )
+    NUMBER = 10000
+
+    def setup(self, mode):
+        r = self.get_client()
+        if mode == 'uncached class':
+            serialize_fn = r.serialize_fn
+
+            def pipeline(transaction=True, shard_hint=None):
+                # previous implementation of SerializedRedis.pipeline()
+                class SerializedRedisPipeline(redis.client.Pipeline, type(r)):
+
+                    def serialize_fn(self, value):
+                        return serialize_fn(value)
+
+                return SerializedRedisPipeline(r.connection_pool, r.response_callbacks, transaction, shard_hint)
+
+            self.pipeline = pipeline
+        else:
+            self.pipeline = r.pipeline
+
+    def run(self, mode):
+        self.pipeline()
+
+
+if __name__ == '__main__':
+    PipelineCreationBenchmark().run_benchmark()
@@ -1,54 +1,154 @@
+import copy
 import functools
-from json import JSONEncoder, JSONDecoder
+import inspect
+import itertools
+import pickle
+import time
+import uuid
 
 import redis
-from redis.client import string_keys_to_dict, dict_merge
+from redis.client import string_keys_to_dict, list_or_args
+
+from . import codecs
+from .codecs import register_codec, tagged_serializers, tagged_deserializers
+from .bulk import BulkLoadStats, zip_column_chunks, interleave
+from .cache import NearCache, NearCachePipelineMixin, key_name
+from .json_backends import get_json_backend
+from .lazy import LazyList, LazyDict
+from .memo import SerializationMemo, DeserializationMemo, memoized_serializers, memoized_deserializers
+from .offload import Offloader, prefetch
+from .ordered import ordered_serializers, ordered_deserializers, lex_bound
+from .pickle_codec import PickleCodec
+from .scripts import SerializedScript
+from .counters import PICKLE_INCR_SCRIPT, MSGPACK_INCR_SCRIPT, JSON_INCR_SCRIPT
+from .compression import (Compressor, ZlibCompressor, LzmaCompressor, ZlibDictCompressor, ZdictStore, train_zdict,
+                          sample_values, register_compressor, compressed_serializers, compressed_deserializers)
 
 __version__ = '0.4.0-dev0'
 
-
-class SerializedRedis(redis.Redis):
+# Pipeline classes built by SerializedRedisMixin.pipeline_class(), by client class
+_PIPELINE_CLASSES = {}
+
+# Number of chunks sent per round trip by chunked smart_set
+SMART_SET_CHUNKS_PER_PIPELINE = 16
+
+# Number of chunks sent per round trip by zadd_bulk and geoadd_bulk
+BULK_CHUNKS_PER_PIPELINE = 16
+
+# Returns type and content of each key of KEYS, used by smart_get in a single round trip
+SMART_GET_SCRIPT = """
+local reply = {}
+for i, key in ipairs(KEYS) do
+    local key_type = redis.call('TYPE', key)['ok']
+    local value = {}
+    if key_type == 'string' then
+        value = redis.call('GET', key)
+    elseif key_type == 'hash' then
+        value = redis.call('HGETALL', key)
+    elseif key_type == 'list' then
+        value = redis.call('LRANGE', key, 0, -1)
+    elseif key_type == 'set' then
+        value = redis.call('SMEMBERS', key)
+    elseif key_type == 'zset' then
+        value = redis.call('ZRANGE', key, 0, -1)
+    end
+    reply[2 * i - 1] = key_type
+    reply[2 * i] = value
+end
+return reply
+"""
+
+
+class SerializedRedisMixin(object):
     '''
-        Wrapper to Redis that De/Serializes all values.
+        Redis commands De/Serializing values, shared by the sync and asyncio clients, see ``SerializedRedis``.
     '''
 
-    def __init__(self, *args, serialize_fn, deserialize_fn, **kwargs):
+    # tag of the codec used by the class, see ``codecs``
+    CODEC_TAG = None
+    # redis-py Pipeline class pipelines of this class are based on
+    PIPELINE_BASE_CLASS = None
+    # classes pipelines of this class inherit from before PIPELINE_BASE_CLASS
+    PIPELINE_MIXINS = ()
+    # whether response callbacks may return awaitables (asyncio clients)
+    AWAITABLE_CALLBACKS = False
+    # SMART_GET_SCRIPT registered on first use
+    _smart_get_script = None
+    # Lua script incrementing serialized numbers (see ``counters``), None if Redis increments values natively
+    INCR_SCRIPT = None
+    # whether Redis increments untagged values natively, INCR_SCRIPT incrementing tagged values
+    NATIVE_INCR = False
+    # INCR_SCRIPT registered on first use
+    _incr_script = None
+    # whether str, int, float... values are serialized in order, see ``ordered``
+    ordered = False
+
+    def __init__(self, *args, serialize_fn, deserialize_fn, serialize_many_fn=None, deserialize_many_fn=None,
+                 compressor=None, codec_tag=None, untagged_deserialize_fn=None, offloader=None, lazy=False,
+                 serialize_memo=None, deserialize_memo=None, numpy_arrays=False, ordered=False, **kwargs):
+        if codec_tag is True:
+            codec_tag = self.CODEC_TAG
+            if codec_tag is None:
+                raise ValueError('%s has no codec tag' % type(self).__name__)
+        if codec_tag is not None:
+            serialize_fn, serialize_many_fn = tagged_serializers(codec_tag, serialize_fn, serialize_many_fn)
+            deserialize_fn, deserialize_many_fn = tagged_deserializers(codec_tag, deserialize_fn, deserialize_many_fn,
+                                                                       untagged_deserialize_fn)
+        if numpy_arrays:
+            if kwargs.get('decode_responses'):
+                raise ValueError('NumPy arrays are not supported with decode_responses=True')
+            from .numpy_codec import numpy_serializers, numpy_deserializers
+            serialize_fn, serialize_many_fn = numpy_serializers(serialize_fn, serialize_many_fn)
+            deserialize_fn, deserialize_many_fn = numpy_deserializers(deserialize_fn, deserialize_many_fn)
+        if compressor is not None:
+            if kwargs.get('decode_responses'):
+                raise ValueError('Compression is not supported with decode_responses=True')
+            serialize_fn, serialize_many_fn = compressed_serializers(compressor, serialize_fn, serialize_many_fn)
+            deserialize_fn, deserialize_many_fn = compressed_deserializers(compressor, deserialize_fn,
+                                                                           deserialize_many_fn)
+        if ordered:
+            if kwargs.get('decode_responses'):
+                raise ValueError('Order preserving serialization is not supported with decode_responses=True')
+            serialize_fn, serialize_many_fn = ordered_serializers(serialize_fn, serialize_many_fn)
+            deserialize_fn, deserialize_many_fn = ordered_deserializers(deserialize_fn, deserialize_many_fn)
+        if serialize_memo is not None:
+            serialize_fn, serialize_many_fn = memoized_serializers(serialize_memo, serialize_fn, serialize_many_fn)
+        if deserialize_memo is not None:
+            deserialize_fn, deserialize_many_fn = memoized_deserializers(deserialize_memo, deserialize_fn,
+                                                                         deserialize_many_fn)
         super().__init__(*args, **kwargs)
 
+        self.compressor = compressor
+        self.codec_tag = codec_tag
+        self.numpy_arrays = numpy_arrays
+        self.ordered = ordered
+        self.offloader = offloader
+        self.lazy = lazy
+        self.serialize_memo = serialize_memo
+        self.deserialize_memo = deserialize_memo
+
         self.serialize_fn = serialize_fn
         self.deserialize_fn = deserialize_fn
+        # optional functions (de)serializing a list of values at once, returning a list
+        self.serialize_many_fn = serialize_many_fn
+        self.deserialize_many_fn = deserialize_many_fn
 
-        # Chain response callbacks to deserialize output
-        FROM_SERIALIZED_CALLBACKS = dict_merge(
-                string_keys_to_dict('KEYS TYPE SCAN HKEYS', self.decode),
-                string_keys_to_dict('MGET HVALS HMGET LRANGE SRANDMEMBER GET GETSET HGET LPOP '
-                                    'RPOPLPUSH BRPOPLPUSH LINDEX SPOP', self.parse_list),
-                string_keys_to_dict('SMEMBERS SDIFF SINTER SUNION', self.parse_set),
-                string_keys_to_dict('HGETALL', self.parse_hgetall),
-                string_keys_to_dict('HSCAN', self.parse_hscan),
-                string_keys_to_dict('SSCAN', self.parse_sscan),
-                string_keys_to_dict('ZRANGE ZRANGEBYSCORE ZREVRANGE ZREVRANGEBYSCORE', self.parse_zrange),
-                string_keys_to_dict('ZSCAN', self.parse_zscan),
-                string_keys_to_dict('BLPOP BRPOP', self.parse_bpop),
-                {
-                    'PUBSUB CHANNELS': self.decode,
-                    'PUBSUB NUMSUB': self.decode,
-                },
-        )
-
-        for cmd in FROM_SERIALIZED_CALLBACKS:
-            if cmd in self.response_callbacks:
-                self.response_callbacks[cmd] = chain_functions(self.response_callbacks[cmd], FROM_SERIALIZED_CALLBACKS[cmd])
-            else:
-                self.response_callbacks[cmd] = FROM_SERIALIZED_CALLBACKS[cmd]
-
-        # For the following we call first our callback as the redis-py callback returns nativestr, which may no be what we want
-        for cmd in 'GEORADIUS', 'GEORADIUSBYMEMBER':
-            self.response_callbacks[cmd] = chain_functions(self.parse_georadius, self.response_callbacks[cmd])
+        self.response_callbacks.update(self.compile_response_callbacks(deserialize_fn, deserialize_many_fn, offloader,
+                                                                       lazy))
 
     def serialize(self, value):
         return self.serialize_fn(value)
 
+    def serialize_many(self, values):
+        "Returns the list of serialized ``values``"
+        if self.serialize_many_fn is not None:
+            return self.serialize_many_fn(values)
+        return list(map(self.serialize_fn, values))
+
+    def deserialize_many(self, values):
+        "Returns the list of deserialized ``values``"
+        return deserialize_many(self.deserialize_fn, self.deserialize_many_fn, values)
+
     def deserialize(self, value):
         if value is None or value is '':
             return value
@@ -56,15 +156,150 @@ class SerializedRedis(redis.Redis):
 
     def decode(self, value):
         "Return a unicode string from the byte representation"
-        if isinstance(value, bytes):
-            value = value.decode()
-        elif isinstance(value, list):
-            return [self.decode(v) for v in value]
-        elif isinstance(value, tuple):
-            return tuple(self.decode(v) for v in value)
-        elif isinstance(value, dict):
-            return {k: self.decode(v) for k, v in value.items()}
-        return value
+        return decode(value)
+
+    @classmethod
+    @functools.lru_cache(maxsize=128)
+    def compile_response_callbacks(cls, deserialize_fn, deserialize_many_fn=None, offloader=None, lazy=False):
+        """
+        Returns the response callbacks deserializing replies with ``deserialize_fn`` and ``deserialize_many_fn``.
+
+        Each callback replaces the redis-py callback of the command with a single function doing both the
+        redis-py parsing and the deserialization. The table is built once per class and deserialize functions
+        and is shared by all instances and their pipelines.
+
+        With an ``offloader``, large replies are deserialized in its executor. Callbacks of classes with
+        ``AWAITABLE_CALLBACKS`` then return awaitables.
+
+        If ``lazy``, lists and hashes are returned as ``LazyList`` and ``LazyDict``, deserializing values on access.
+        """
+        def deserialize(value):
+            if value is None or value == '':
+                return value
+            return deserialize_fn(value)
+
+        if offloader is None:
+            def deserialize_list(values):
+                return deserialize_many(deserialize_fn, deserialize_many_fn, values)
+        else:
+            offload = offloader.deserialize_many_async if cls.AWAITABLE_CALLBACKS else offloader.deserialize_many
+            deserialize_chunk = functools.partial(deserialize_many, deserialize_fn, deserialize_many_fn)
+            threshold = offloader.threshold
+
+            def deserialize_list(values):
+                if len(values) < threshold:
+                    return deserialize_many(deserialize_fn, deserialize_many_fn, values)
+                return offload(deserialize_chunk, values)
+
+        if lazy:
+            def sequence(values):
+                return LazyList(values, deserialize)
+        else:
+            sequence = deserialize_list
+
+        def parse_list(response, **options):
+            if isinstance(response, list):
+                return sequence(response)
+            return deserialize(response)
+
+        def parse_set(response, as_list=False, **options):
+            values = deserialize_list(response)
+            if as_list:
+                return values
+            return then(values, set)
+
+        def parse_sort(response, **options):
+            if isinstance(response, int):
+                # STORE returns the number of elements
+                return response
+            if not options.get('groups'):
+                return sequence(response)
+            values = deserialize_list(response)
+            n = options['groups']
+            return then(values, lambda values: list(zip(*[values[i::n] for i in range(n)])))
+
+        def parse_hgetall(response, **options):
+            if lazy:
+                return LazyDict(decode(response[0::2]), response[1::2], deserialize)
+            return then(deserialize_list(response[1::2]), lambda values: dict(zip(decode(response[0::2]), values)))
+
+        def parse_hscan(response, **options):
+            cursor, r = response
+            it = iter(r)
+            return int(cursor), {decode(k): deserialize(v) for k, v in zip(it, it)}
+
+        def parse_sscan(response, **options):
+            cursor, r = response
+            return int(cursor), set(deserialize(v) for v in r)
+
+        def parse_zrange(response, **options):
+            if not options.get('withscores'):
+                return sequence(response)
+            score_cast_func = options.get('score_cast_func', float)
+            return then(deserialize_list(response[0::2]),
+                        lambda members: list(zip(members, map(score_cast_func, response[1::2]))))
+
+        def parse_zscan(response, **options):
+            score_cast_func = options.get('score_cast_func', float)
+            cursor, r = response
+            it = iter(r)
+            return int(cursor), [(deserialize(v), score_cast_func(score)) for v, score in zip(it, it)]
+
+        def parse_scan(response, **options):
+            cursor, r = response
+            return int(cursor), decode(r)
+
+        def parse_bpop(response, **options):
+            if not response:
+                return None
+            return (decode(response[0]), deserialize(response[1]))
+
+        def parse_script(response, parse_reply=None, **options):
+            if parse_reply is None:
+                return response
+            return parse_reply(response)
+
+        def parse_pubsub_numsub(response, **options):
+            return list(zip(decode(response[0::2]), response[1::2]))
+
+        parse_georadius_generic = cls.RESPONSE_CALLBACKS['GEORADIUS']
+
+        def parse_georadius(response, **options):
+            if options['store'] or options['store_dist']:
+                # `store` and `store_diff` cant be combined
+                # with other command arguments.
+                return response
+
+            if not options['withdist'] and not options['withcoord'] and not options['withhash']:
+                if type(response) != list:
+                    return [deserialize(response)]
+                return [deserialize(r) for r in response]
+
+            for r in response:
+                r[0] = deserialize(r[0])
+            return parse_georadius_generic(response, **options)
+
+        return dict_merge(
+                string_keys_to_dict('KEYS TYPE HKEYS', lambda response, **options: decode(response)),
+                string_keys_to_dict('MGET HVALS HMGET LRANGE SRANDMEMBER GET GETSET HGET LPOP '
+                                    'RPOP RPOPLPUSH BRPOPLPUSH LINDEX SPOP', parse_list),
+                string_keys_to_dict('SMEMBERS SDIFF SINTER SUNION', parse_set),
+                string_keys_to_dict('HGETALL', parse_hgetall),
+                string_keys_to_dict('HSCAN', parse_hscan),
+                string_keys_to_dict('SSCAN', parse_sscan),
+                string_keys_to_dict('ZRANGE ZRANGEBYSCORE ZREVRANGE ZREVRANGEBYSCORE', parse_zrange),
+                string_keys_to_dict('ZRANGEBYLEX ZREVRANGEBYLEX', parse_list),
+                string_keys_to_dict('ZSCAN', parse_zscan),
+                string_keys_to_dict('SCAN', parse_scan),
+                string_keys_to_dict('BLPOP BRPOP', parse_bpop),
+                string_keys_to_dict('SORT', parse_sort),
+                string_keys_to_dict('GEORADIUS GEORADIUSBYMEMBER', parse_georadius),
+                string_keys_to_dict('EVAL EVALSHA', parse_script),
+                {
+                    'PUBSUB CHANNELS': lambda response, **options: decode(response),
+                    'PUBSUB NUMSUB': parse_pubsub_numsub,
+                },
+        )
 
     def set(self, name, value, *args, **kwargs):
         return super().set(name, self.serialize(value), *args, **kwargs)
@@ -85,10 +320,10 @@ class SerializedRedis(redis.Redis):
         return super().getset(name, self.serialize(value), *args, **kwargs)
 
     def mset(self, mapping):
-        return super().mset({k: self.serialize(v) for k, v in mapping.items()})
+        return super().mset(dict(zip(mapping.keys(), self.serialize_many(mapping.values()))))
 
     def msetnx(self, mapping):
-        return super().msetnx({k: self.serialize(v) for k, v in mapping.items()})
+        return super().msetnx(dict(zip(mapping.keys(), self.serialize_many(mapping.values()))))
 
     def psetex(self, name, time_ms, value):
         return super().psetex(name, time_ms, self.serialize(value))
@@ -96,77 +331,7 @@ class SerializedRedis(redis.Redis):
     def linsert(self, name, where, refvalue, value):
         return super().linsert(name, where, self.serialize(refvalue), self.serialize(value))
 
-    def smart_get(self, name):
-        '''
-        Returns python type corresponding to redis type:
-            if redis hash, returns python dict with values deserialized
-            if redis array, returns python array with members deserialized
-            if redis set, returns python set with members deserialized
-            if redis sorted set, returns a list
-            if redis string, returns a python object from deserialization
-        '''
-        if not self.exists(name):
-            return None
-        return  {
-                    'set': self.smembers,
-                    'hash': self.hgetall,
-                    'string': self.get,
-                    'list': self.lmembers,
-                    'zset': self.zmembers,
-                }[self.type(name)](name)
-
-    def smart_set(self, name, value):
-        '''
-        Saves value using appropriate Redis type:
-            if python dict, uses redis hash, serializing values (not keys)
-            if python list, uses redis array, serializing members
-            if python set, uses redis set, serializing members
-            otherwise uses redis string, serializing ``value``
-        '''
-        with self.pipeline() as pipe:
-            pipe.delete(name)
-
-            value_type = type(value)
-            if value_type is set:
-                pipe.sadd(name, *value)
-            elif value_type is list:
-                pipe.rpush(name, *value)
-            elif value_type is dict:
-                pipe.hmset(name, value)
-            else:
-                pipe.set(name, value)
-
-            pipe.execute()
-
     # Hashes: fields can be objects
-    def parse_hgetall(self, response, **options):
-        return { self.decode(k): self.deserialize(v) for k, v in response.items() }
-
-    def parse_georadius(self, response, **options):
-        if options['store'] or options['store_dist']:
-            # `store` and `store_diff` cant be combined
-            # with other command arguments.
-            return response
-
-        if type(response) != list:
-            response_list = [response]
-        else:
-            response_list = response
-
-        if not options['withdist'] and not options['withcoord']\
-                and not options['withhash']:
-            print('respos', response, response_list)
-            return [self.deserialize(r) for r in response_list]
-
-        for r in response_list:
-            r[0] = self.deserialize(r[0])
-
-        return response_list
-
-    def parse_hscan(self, response, **options):
-        cursor, dic = response
-        return cursor, { self.decode(k): self.deserialize(v) for k, v in dic.items() }
-
     def hset(self, name, field, value):
         return super().hset(name, field, self.serialize(value))
 
@@ -174,74 +339,64 @@ class SerializedRedis(redis.Redis):
         return super().hsetnx(name, field, self.serialize(value))
 
     def hmset(self, name, mapping):
-        return super().hmset(name, { field: self.serialize(value) for field, value in mapping.items() })
+        return super().hmset(name, dict(zip(mapping.keys(), self.serialize_many(mapping.values()))))
 
     # Sets
     def sismember(self, name, value):
         return super().sismember(name, self.serialize(value))
 
     def sadd(self, name, *args):
-        return super().sadd(name, *list(self.serialize(v) for v in args))
+        return super().sadd(name, *self.serialize_many(args))
 
     def srem(self, name, *args):
-        return super().srem(name, *list(self.serialize(v) for v in args))
+        return super().srem(name, *self.serialize_many(args))
 
-    def smembers(self, *args, **kwargs):
-        return set(super().smembers(*args, **kwargs))
+    def smembers(self, name):
+        return self.execute_command('SMEMBERS', name)
 
-    def smembers_as_list(self, *args, **kwargs):
+    def smembers_as_list(self, name):
         """
         Returns SMEMBERS as python list instead of set.
         To be used when deserialized members may not hashable.
         """
-        return super().smembers(*args, **kwargs)
+        return self.execute_command('SMEMBERS', name, as_list=True)
 
-    def sdiff(self, *args, **kwargs):
-        return set(super().sdiff(*args, **kwargs))
+    def sdiff(self, keys, *args):
+        return self.execute_command('SDIFF', *list_or_args(keys, args))
 
-    def sdiff_as_list(self, *args, **kwargs):
+    def sdiff_as_list(self, keys, *args):
         """
         Returns SDIFF as python list instead of set.
         To be used when deserialized members may not hashable.
         """
-        return super().sdiff(*args, **kwargs)
+        return self.execute_command('SDIFF', *list_or_args(keys, args), as_list=True)
 
-    def sinter(self, *args, **kwargs):
-        return set(super().sinter(*args, **kwargs))
+    def sinter(self, keys, *args):
+        return self.execute_command('SINTER', *list_or_args(keys, args))
 
-    def sinter_as_list(self, *args, **kwargs):
+    def sinter_as_list(self, keys, *args):
         """
         Returns SINTER as python list instead of set.
         To be used when deserialized members may not hashable.
         """
-        return super().sinter(*args, **kwargs)
+        return self.execute_command('SINTER', *list_or_args(keys, args), as_list=True)
 
-    def sunion(self, *args, **kwargs):
-        return set(super().sunion(*args, **kwargs))
+    def sunion(self, keys, *args):
+        return self.execute_command('SUNION', *list_or_args(keys, args))
 
-    def sunion_as_list(self, *args, **kwargs):
+    def sunion_as_list(self, keys, *args):
         """
         Returns SUNION as python list instead of set.
         To be used when deserialized members may not hashable.
         """
-        return super().sunion(*args, **kwargs)
+        return self.execute_command('SUNION', *list_or_args(keys, args), as_list=True)
 
     def smove(self, src, dst, value):
         return super().smove(src, dst, self.serialize(value))
 
-    def parse_set(self, response, **options):
-        '''
-        returns list as members may not be hashable, smember, sdiff fct will turn in into set.
-        caller should call smembers/sdiff_as_list if it is known that members may be unhashable and deal with a list instead of a set
-        '''
-        return [self.deserialize(v) for v in response]
-
     # ordered sets
     def zadd(self, name, mapping, **kwargs):
-        serialized_mapping = {}
-
-        for value, score in mapping.items():
-            serialized_mapping[self.serialize(value)] = score
+        serialized_mapping = dict(zip(self.serialize_many(mapping.keys()), mapping.values()))
         return super().zadd(name, serialized_mapping, **kwargs)
 
     def zrank(self, name, value):
@@ -251,7 +406,7 @@ class SerializedRedis(redis.Redis):
         return super().zrevrank(name, self.serialize(value))
 
     def zrem(self, name, *args):
-        return super().zrem(name, *list(self.serialize(v) for v in args))
+        return super().zrem(name, *self.serialize_many(args))
 
     def zmembers(self, name, **kwargs):
         '''
@@ -271,17 +426,41 @@ class SerializedRedis(redis.Redis):
         return super().zscan(name, cursor=cursor, match=match, count=count,
                              score_cast_func=score_cast_func)
 
-    zlexcount = None
-    "Not Supported"
-
-    zrangebylex = None
-    "Not Supported"
+    def _lex_bounds(self, min, max, min_exclusive, max_exclusive):
+        if not self.ordered:
+            raise NotImplementedError('Lexicographical commands require order preserving serialization (ordered=True)')
+        return (lex_bound(self.serialize_fn, min, min_exclusive, b'-'),
+                lex_bound(self.serialize_fn, max, max_exclusive, b'+'))
 
-    zrevrangebylex = None
-    "Not Supported"
+    def zlexcount(self, name, min=None, max=None, min_exclusive=False, max_exclusive=False):
+        '''
+        Returns the number of members of sorted set ``name`` between ``min`` and ``max`` (unbounded if None).
 
-    zremrangebylex = None
-    "Not Supported"
+        Members must be serialized in order (``ordered=True``) and have the same score.
+        '''
+        return super().zlexcount(name, *self._lex_bounds(min, max, min_exclusive, max_exclusive))
+
+    def zrangebylex(self, name, min=None, max=None, start=None, num=None, min_exclusive=False, max_exclusive=False):
+        "Returns members of sorted set ``name`` between ``min`` and ``max``, see ``zlexcount``"
+        return super().zrangebylex(name, *self._lex_bounds(min, max, min_exclusive, max_exclusive), start=start,
+                                   num=num)
+
+    def zrevrangebylex(self, name, max=None, min=None, start=None, num=None, max_exclusive=False,
+                       min_exclusive=False):
+        "Returns members of sorted set ``name`` between ``max`` and ``min`` in reverse order, see ``zlexcount``"
+        min, max = self._lex_bounds(min, max, min_exclusive, max_exclusive)
+        return super().zrevrangebylex(name, max, min, start=start, num=num)
+
+    def zremrangebylex(self, name, min=None, max=None, min_exclusive=False, max_exclusive=False):
+        "Removes members of sorted set ``name`` between ``min`` and ``max``, see ``zlexcount``"
+        return super().zremrangebylex(name, *self._lex_bounds(min, max, min_exclusive, max_exclusive))
+
+    def sort(self, name, start=None, num=None, by=None, get=None, desc=False, alpha=False, store=None, groups=False):
+        if self.ordered:
+            # values serialized in order are compared as strings
+            alpha = True
+        return super().sort(name, start=start, num=num, by=by, get=get, desc=desc, alpha=alpha, store=store,
+                            groups=groups)
 
     def sscan(self, name, cursor=0, match=None, count=None):
         if match is not None:
@@ -291,27 +470,6 @@ class SerializedRedis(redis.Redis):
     def zincrby(self, name, amount, value):
         return super().zincrby(name, amount, self.serialize(value))
 
-    def parse_zrange(self, response, **options):
-        if options.get('withscores', False):
-            return [(self.deserialize(v[0]), v[1]) for v in response]
-        else:
-            return [self.deserialize(v) for v in response]
-
-    def parse_zscan(self, response, **options):
-        cursor, data = response
-        return cursor, [(self.deserialize(value), score) for value, score in data]
-
-    def parse_sscan(self, response, **options):
-        cursor, data = response
-        return cursor, set(self.deserialize(value) for value in data)
-
-    def sort(self, name, start=None, num=None, by=None, get=None,
-             desc=False, alpha=False, store=None, groups=False):
-        response = super().sort(name, start=start, num=num, by=by, get=get, desc=desc, alpha=alpha, store=store, groups=groups)
-        if store is None:
-            return self.parse_list(response)
-        return response
-
     # Lists
     def lmembers(self, name):
         '''
@@ -320,13 +478,8 @@ class SerializedRedis(redis.Redis):
         '''
         return self.lrange(name, 0, -1)
 
-    def parse_list(self, response, **options):
-        if isinstance(response, (list, tuple)):
-            return [self.deserialize(v) for v in response]
-        return self.deserialize(response)
-
     def lpush(self, name, *args):
-        return super().lpush(name, *list(self.serialize(v) for v in args))
+        return super().lpush(name, *self.serialize_many(args))
 
     def lpushx(self, name, value):
         return super().lpushx(name, self.serialize(value))
@@ -337,34 +490,19 @@ class SerializedRedis(redis.Redis):
     def lrem(self, name, count, value):
         return super().lrem(name, count, self.serialize(value))
 
-    def parse_bpop(self, response, **options):
-        if response == None:
-            return None
-        return (self.decode(response[0]), self.deserialize(response[1]))
-
     def rpush(self, name, *args):
-        return super().rpush(name, *list(self.serialize(v) for v in args))
+        return super().rpush(name, *self.serialize_many(args))
 
     def rpushx(self, name, value):
         return super().rpushx(name, self.serialize(value))
 
-    def rpop(self, name):
-        data = super().rpop(name)
-        if data == None:
-            return None
-        return self.deserialize(data)
-
     def geoadd(self, name, *values):
-        serialized_values = []
-        for i, v in enumerate(values):
-            if i % 3 == 2:
-                v = self.serialize(v)
-            serialized_values.append(v)
-
+        serialized_values = list(values)
+        serialized_values[2::3] = self.serialize_many(values[2::3])
         return super().geoadd(name, *serialized_values)
 
     def geopos(self, name, *values):
-        return super().geopos(name, *(self.serialize(v) for v in values))
+        return super().geopos(name, *self.serialize_many(values))
 
     def georadiusbymember(self, name, member, radius, unit=None,
                           withdist=False, withcoord=False, withhash=False,
@@ -377,35 +515,602 @@ class SerializedRedis(redis.Redis):
         return super().geodist(name, self.serialize(place1), self.serialize(place2), unit=unit)
 
     def geohash(self, name, *values):
-        return super().geohash(name, *(self.serialize(v) for v in values))
+        return super().geohash(name, *self.serialize_many(values))
 
     def publish(self, channel, msg):
         return super().publish(channel, self.serialize(msg))
 
-    def pipeline(self, transaction=True, shard_hint=None):
-        serialize_fn = self.serialize_fn
+    def smart_get_script(self):
+        "Returns SMART_GET_SCRIPT registered on this client"
+        if self._smart_get_script is None:
+            self._smart_get_script = self.register_script(SMART_GET_SCRIPT)
+        return self._smart_get_script
+
+    def register_script(self, script, values=None, reply=None):
+        '''
+        Returns a callable running Lua ``script`` with ``keys`` and ``args``, see redis-py ``register_script``.
+
+        If ``values`` (positions of ``args`` holding values, or True for all args) or ``reply`` (shape of the reply,
+        see ``scripts``) is provided, returns a ``SerializedScript`` serializing these args and deserializing the
+        reply, also when run in a pipeline (``script(keys, args, client=pipe)``).
+        '''
+        if values is None and reply is None:
+            return super().register_script(script)
+        return SerializedScript(self, script, () if values is None else values, reply)
+
+    def run_script(self, script, keys=(), args=(), parse_reply=None):
+        '''
+        Runs ``script`` (returned by ``register_script``) with EVALSHA, loading it if needed, and returns its reply
+        parsed by ``parse_reply`` if provided. Unlike calling ``script``, the reply is also parsed in pipelines.
+        '''
+        command = ('EVALSHA', script.sha, len(keys)) + tuple(keys) + tuple(args)
+        if isinstance(self, self.PIPELINE_BASE_CLASS):
+            # loaded by the pipeline before execution if needed
+            self.scripts.add(script)
+            return self.execute_command(*command, parse_reply=parse_reply)
+        try:
+            return self.execute_command(*command, parse_reply=parse_reply)
+        except redis.exceptions.NoScriptError:
+            script.sha = self.script_load(script.script)
+            return self.execute_command('EVALSHA', script.sha, *command[2:], parse_reply=parse_reply)
+
+    def incr_script(self):
+        "Returns INCR_SCRIPT registered on this client"
+        if self._incr_script is None:
+            self._incr_script = self.register_script(self.INCR_SCRIPT)
+        return self._incr_script
+
+    def incr_serialized(self, name, amount, is_float):
+        "Increments the serialized number of key ``name`` by ``amount`` with INCR_SCRIPT, see ``counters``"
+        if self.ordered:
+            raise NotImplementedError('Increments are not supported with order preserving serialization')
+        return self.run_script(self.incr_script(), [name], [amount, 1 if is_float else 0, self.codec_tag or b''],
+                               parse_reply=float if is_float else None)
+
+    def native_incr(self):
+        "Returns whether values are incremented with Redis INCRBY and INCRBYFLOAT instead of INCR_SCRIPT"
+        if self.ordered:
+            return False
+        return self.INCR_SCRIPT is None or (self.NATIVE_INCR and not self.codec_tag)
+
+    def incr(self, name, amount=1):
+        # redis-py 4 binds incr to its own incrby
+        return self.incrby(name, amount)
+
+    def decr(self, name, amount=1):
+        return self.decrby(name, amount)
+
+    def incrby(self, name, amount=1):
+        if self.native_incr():
+            return super().incrby(name, amount)
+        return self.incr_serialized(name, amount, False)
+
+    def decrby(self, name, amount=1):
+        if self.native_incr():
+            return super().decrby(name, amount)
+        return self.incr_serialized(name, -amount, False)
+
+    def incrbyfloat(self, name, amount=1.0):
+        if self.native_incr():
+            return super().incrbyfloat(name, amount)
+        return self.incr_serialized(name, amount, True)
+
+    def queue_smart_set(self, pipe, name, value):
+        "Queues on ``pipe`` the commands replacing key ``name`` by ``value``, see ``smart_set``"
+        pipe.delete(name)
+
+        value_type = type(value)
+        if value_type is set:
+            pipe.sadd(name, *value)
+        elif value_type is list:
+            pipe.rpush(name, *value)
+        elif value_type is dict:
+            pipe.hmset(name, value)
+        else:
+            pipe.set(name, value)
 
-        # create a Pipeline class based on our class and provide our serialize function
-        # deserialize not required as it is called only form response_callbacks which
-        # refer to current SerializedRedis instance
-        class SerializedRedisPipeline(redis.client.Pipeline, type(self)):
-            "Pipeline for the SerializedRedis class"
+    def queue_smart_set_diff(self, pipe, name, value, key_type, data):
+        '''
+        Queues on ``pipe`` the commands changing key ``name`` of ``key_type`` and serialized content ``data``
+        (as returned by SMART_GET_SCRIPT) to ``value``:
+            hash fields are set and deleted (HMSET, HDEL)
+            set members are added and removed (SADD, SREM)
+            lists are appended to (RPUSH) or truncated (LTRIM) if the current list is a prefix of ``value``
+            or the opposite
+            strings are set if they changed
+        Otherwise, the key is replaced. Serialized values are compared, so serialization must be deterministic.
+        '''
+        value_type = type(value)
+        if value_type is dict and key_type == 'hash':
+            current = dict(zip(map(key_name, self.decode(data[0::2])), data[1::2]))
+            serialized = dict(zip(map(key_name, value), self.serialize_many(value.values())))
+            removed = [field for field in current if field not in serialized]
+            changed = [(field, d) for field, d in serialized.items() if current.get(field) != d]
+            if removed:
+                pipe.hdel(name, *removed)
+            if changed:
+                pipe.execute_command('HMSET', name, *itertools.chain.from_iterable(changed))
+        elif value_type is set and key_type == 'set':
+            current = set(data)
+            serialized = set(self.serialize_many(value))
+            removed = current - serialized
+            added = serialized - current
+            if removed:
+                pipe.execute_command('SREM', name, *removed)
+            if added:
+                pipe.execute_command('SADD', name, *added)
+        elif value_type is list and key_type == 'list' and value:
+            serialized = self.serialize_many(value)
+            if serialized[:len(data)] == data:
+                if len(serialized) > len(data):
+                    pipe.execute_command('RPUSH', name, *serialized[len(data):])
+            elif data[:len(serialized)] == serialized:
+                pipe.ltrim(name, 0, len(serialized) - 1)
+            else:
+                pipe.delete(name)
+                pipe.execute_command('RPUSH', name, *serialized)
+        elif value_type not in (dict, set, list) and key_type == 'string':
+            serialized = self.serialize(value)
+            if serialized != data:
+                pipe.execute_command('SET', name, serialized)
+        else:
+            self.queue_smart_set(pipe, name, value)
+
+    def smart_serialize(self, value):
+        "Returns redis type and serialized content of ``value`` stored by ``smart_set``, as SMART_GET_SCRIPT does"
+        value_type = type(value)
+        if value_type is dict:
+            return 'hash', list(itertools.chain.from_iterable(zip(value, self.serialize_many(value.values()))))
+        if value_type is set:
+            return 'set', self.serialize_many(value)
+        if value_type is list:
+            return 'list', self.serialize_many(value)
+        return 'string', self.serialize(value)
+
+    def parse_smart_get(self, response):
+        "Returns the python values of keys from SMART_GET_SCRIPT ``response``"
+        values = []
+        for key_type, data in zip(self.decode(response[0::2]), response[1::2]):
+            if key_type == 'none':
+                values.append(None)
+            elif key_type == 'string':
+                values.append(self.deserialize(data))
+            elif key_type == 'hash':
+                values.append(dict(zip(self.decode(data[0::2]), self.deserialize_many(data[1::2]))))
+            elif key_type == 'set':
+                values.append(set(self.deserialize_many(data)))
+            elif key_type in ('list', 'zset'):
+                values.append(self.deserialize_many(data))
+            else:
+                raise NotImplementedError('smart_get does not support %s keys' % key_type)
+        return values
+
+    @classmethod
+    def pipeline_class(cls):
+        """
+        Returns the Pipeline class for this client class, based on ``PIPELINE_BASE_CLASS``.
 
-            def serialize_fn(self, value):
-                return serialize_fn(value)
+        The class is built once per client class and cached, so that creating a pipeline
+        only costs an object allocation.
+        """
+        try:
+            return _PIPELINE_CLASSES[cls]
+        except KeyError:
+            pass
+
+        # create a Pipeline class based on our class, serialize and deserialize functions
+        # are set on the pipeline instance by ``pipeline()``
+        pipeline_cls = type(cls.__name__ + 'Pipeline', cls.PIPELINE_MIXINS + (cls.PIPELINE_BASE_CLASS, cls), {
+            '__doc__': 'Pipeline for the %s class' % cls.__name__,
+        })
+        _PIPELINE_CLASSES[cls] = pipeline_cls
+        return pipeline_cls
 
-        return SerializedRedisPipeline(
+    def pipeline(self, transaction=True, shard_hint=None):
+        """
+        Returns a new pipeline object sharing this client's connection pool,
+        response callbacks and serializer.
+
+        The pipeline is reset after ``execute()`` (or explicitly with ``reset()``)
+        and can be reused for further batches.
+        """
+        pipe = self.pipeline_class()(
             self.connection_pool,
             self.response_callbacks,
             transaction,
             shard_hint
         )
+        pipe.serialize_fn = self.serialize_fn
+        pipe.deserialize_fn = self.deserialize_fn
+        pipe.serialize_many_fn = self.serialize_many_fn
+        pipe.deserialize_many_fn = self.deserialize_many_fn
+        pipe.codec_tag = self.codec_tag
+        pipe.ordered = self.ordered
+        return pipe
+
+    def ordered_client(self):
+        '''
+        Returns a client sharing this client's connection pool and options, serializing values in order (see
+        ``ordered``), e.g. to use order preserving serialization on some keys only.
+        '''
+        if self.ordered:
+            return self
+        if self.connection_pool.connection_kwargs.get('decode_responses'):
+            raise ValueError('Order preserving serialization is not supported with decode_responses=True')
+        client = copy.copy(self)
+        client.ordered = True
+        client.serialize_fn, client.serialize_many_fn = ordered_serializers(self.serialize_fn, self.serialize_many_fn)
+        client.deserialize_fn, client.deserialize_many_fn = ordered_deserializers(self.deserialize_fn,
+                                                                                  self.deserialize_many_fn)
+        client.response_callbacks = dict(self.response_callbacks)
+        client.response_callbacks.update(self.compile_response_callbacks(
+            client.deserialize_fn, client.deserialize_many_fn, self.offloader, self.lazy))
+        return client
+
+
+class SerializedRedis(SerializedRedisMixin, redis.Redis):
+    '''
+        Wrapper to Redis that De/Serializes all values.
+
+        If ``compressor`` is provided, large serialized values are compressed. Compressed values are binary so
+        responses must not be decoded (``decode_responses=False``).
+
+        If ``codec_tag`` is provided (a single byte registered with ``register_codec``, or True for the ``CODEC_TAG``
+        of the class), it is prepended to serialized values. Values tagged by other codecs are then deserialized with
+        their codec, and untagged values with ``untagged_deserialize_fn`` (``deserialize_fn`` by default), allowing
+        to read values written by different codecs.
+
+        If ``near_cache`` (a ``NearCache``) is provided, deserialized values of ``get`` and ``hgetall`` are cached
+        in process. The cache subscribes to keyspace notifications to invalidate values written by other clients.
+
+        With ``numpy_arrays=True``, NumPy arrays are serialized as their dtype, shape and raw data, and deserialized
+        without copy as read only arrays (see ``numpy_codec``).
+
+        With ``ordered=True``, ``None``, ``bool``, ``int``, ``float``, ``bytes`` and ``str`` values are serialized
+        in order (see ``ordered``), other values with the codec of the class: ``sort`` then sorts values server side
+        (``alpha`` is implied), and ``zrangebylex``, ``zlexcount``... range members of sorted sets having the same
+        score. ``ordered_client`` returns such a client for some keys only.
+    '''
+
+    PIPELINE_BASE_CLASS = redis.client.Pipeline
+    PIPELINE_MIXINS = (NearCachePipelineMixin,)
+    near_cache = None
+    _raw_redis = None
+
+    def __init__(self, *args, near_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if near_cache is not None:
+            self.near_cache = near_cache
+            near_cache.listen(self)
+
+    def raw_redis(self):
+        "Returns a client sharing the connection pool, not deserializing replies"
+        if self._raw_redis is None:
+            self._raw_redis = redis.Redis(connection_pool=self.connection_pool)
+        return self._raw_redis
+
+    def execute_command(self, *args, **options):
+        if self.near_cache is not None:
+            self.near_cache.invalidate_command(args)
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        # keys written by the pipeline are invalidated once executed
+        pipe.invalidated_cache = self.near_cache
+        return pipe
+
+    def get(self, name):
+        if self.near_cache is None:
+            return super().get(name)
+        return self.near_cache.get_or_fetch('GET', name, lambda: self._fetch_get(name))
+
+    def _fetch_get(self, name):
+        # reads cached values raw, to account their size
+        data = self.raw_redis().get(name)
+        return self.deserialize(data), len(data) if data is not None else 0
+
+    def hgetall(self, name):
+        if self.near_cache is None:
+            return super().hgetall(name)
+        return self.near_cache.get_or_fetch('HGETALL', name, lambda: self._fetch_hgetall(name))
+
+    def _fetch_hgetall(self, name):
+        response = self.raw_redis().hgetall(name)
+        size = sum(len(field) + len(data) for field, data in response.items())
+        return dict(zip(self.decode(list(response)), self.deserialize_many(list(response.values())))), size
+
+    def mget_arrays(self, keys, *args, dtype=None):
+        '''
+        Returns the NumPy arrays of ``keys`` stacked in a single array, e.g. a 2-D array of vectors.
+
+        The result is allocated once and rows are copied from the replies. Values that are not serialized arrays are
+        deserialized and converted. Raises ``KeyError`` if a key does not exist.
+        '''
+        from .numpy_codec import stack
+        keys = list_or_args(keys, args)
+        values = self.raw_redis().mget(keys)
+        for key, value in zip(keys, values):
+            if value is None:
+                raise KeyError(key)
+        return stack(values, self.deserialize, dtype)
+
+    def lrange_arrays(self, name, start=0, end=-1, dtype=None):
+        '''
+        Returns the NumPy arrays of list ``name`` between ``start`` and ``end`` stacked in a single array, see
+        ``mget_arrays``.
+        '''
+        from .numpy_codec import stack
+        return stack(self.raw_redis().lrange(name, start, end), self.deserialize, dtype)
+
+    def smart_get(self, name, chunk_size=None):
+        '''
+        Returns python type corresponding to redis type:
+            if redis hash, returns python dict with values deserialized
+            if redis array, returns python array with members deserialized
+            if redis set, returns python set with members deserialized
+            if redis sorted set, returns a list
+            if redis string, returns a python object from deserialization
+        Type and value are fetched in a single round trip by a Lua script, or if ``chunk_size`` is provided, by
+        chunks of ``chunk_size`` elements (see ``smart_iter``) so that large collections do not block Redis.
+        '''
+        if chunk_size is None:
+            return self.smart_get_many([name])[0]
+        key_type = self.type(name)
+        items = self._smart_iter(name, key_type, chunk_size)
+        if key_type == 'none':
+            return None
+        if key_type == 'string':
+            return next(items)
+        if key_type == 'hash':
+            return dict(items)
+        if key_type == 'set':
+            return set(items)
+        return list(items)
+
+    def smart_iter(self, name, chunk_size=1000):
+        '''
+        Yields the content of key ``name`` read by chunks of ``chunk_size`` elements:
+            if redis hash, yields (field, value) pairs, using HSCAN
+            if redis set, yields members, using SSCAN (members may be yielded more than once)
+            if redis array or sorted set, yields members, using LRANGE or ZRANGE windows
+            if redis string, yields the value
+        Chunks are read in separate commands, so a key modified meanwhile may not be read consistently.
+        '''
+        return self._smart_iter(name, self.type(name), chunk_size)
+
+    def _smart_iter(self, name, key_type, chunk_size):
+        if key_type == 'none':
+            return
+        if key_type == 'string':
+            yield self.get(name)
+        elif key_type == 'hash':
+            yield from self.hscan_iter(name, count=chunk_size)
+        elif key_type == 'set':
+            yield from self.sscan_iter(name, count=chunk_size)
+        elif key_type in ('list', 'zset'):
+            read_range = self.lrange if key_type == 'list' else self.zrange
+            start = 0
+            while True:
+                values = read_range(name, start, start + chunk_size - 1)
+                yield from values
+                if len(values) < chunk_size:
+                    break
+                start += chunk_size
+        else:
+            raise NotImplementedError('smart_get does not support %s keys' % key_type)
+
+    def smart_get_many(self, names):
+        '''
+        Returns the list of python values of keys ``names``, see ``smart_get``, fetched in a single round trip.
+        '''
+        if not names:
+            return []
+        return self.parse_smart_get(self.smart_get_script()(keys=names))
+
+    def smart_set(self, name, value, diff=False, previous=None, chunk_size=None):
+        '''
+        Saves value using appropriate Redis type:
+            if python dict, uses redis hash, serializing values (not keys)
+            if python list, uses redis array, serializing members
+            if python set, uses redis set, serializing members
+            otherwise uses redis string, serializing ``value``
+
+        If ``diff``, only the changes from the current content of the key are written, see ``queue_smart_set_diff``.
+        Current content is read in the same optimistic transaction, unless the ``previous`` value is provided.
+
+        If ``chunk_size`` is provided, collections are written by chunks of ``chunk_size`` elements to a temporary
+        key, renamed to ``name`` once complete, so that large collections do not block Redis.
+        '''
+        if chunk_size is not None:
+            if diff:
+                raise ValueError('chunk_size is not supported with diff')
+            return self._smart_set_chunks(name, value, chunk_size)
+
+        with self.pipeline() as pipe:
+            while True:
+                try:
+                    if not diff:
+                        self.queue_smart_set(pipe, name, value)
+                    elif previous is not None:
+                        self.queue_smart_set_diff(pipe, name, value, *self.smart_serialize(previous))
+                    else:
+                        pipe.watch(name)
+                        key_type, data = self.smart_get_script()(keys=[name])
+                        pipe.multi()
+                        self.queue_smart_set_diff(pipe, name, value, self.decode(key_type), data)
+                    pipe.execute()
+                    return
+                except redis.WatchError:
+                    continue
+
+    def _smart_set_chunks(self, name, value, chunk_size):
+        value_type = type(value)
+        if value_type is dict:
+            command, items = 'hmset', value.items()
+        elif value_type is set:
+            command, items = 'sadd', value
+        elif value_type is list:
+            command, items = 'rpush', value
+        else:
+            return self.smart_set(name, value)
+
+        tmp_name = '%s:smart_set:%s' % (key_name(name), uuid.uuid4().hex)
+        written = False
+        try:
+            with self.pipeline(transaction=False) as pipe:
+                write = getattr(pipe, command)
+                for i, chunk in enumerate(chunks(items, chunk_size)):
+                    if value_type is dict:
+                        write(tmp_name, dict(chunk))
+                    else:
+                        write(tmp_name, *chunk)
+                    written = True
+                    if (i + 1) % SMART_SET_CHUNKS_PER_PIPELINE == 0:
+                        pipe.execute()
+                pipe.execute()
+            if written:
+                self.rename(tmp_name, name)
+            else:
+                self.delete(name)
+        except Exception:
+            self.delete(tmp_name)
+            raise
+
+    def zadd_bulk(self, name, members, scores, chunk_size=10000, progress=None):
+        '''
+        Adds ``members`` with their ``scores`` to sorted set ``name``, returns ``BulkLoadStats``.
+
+        ``members`` and ``scores`` are NumPy arrays, sequences or iterables of the same length, e.g. columns of a
+        large dataset. Members are serialized by chunks of ``chunk_size``, each chunk being sent as a single ZADD,
+        ``BULK_CHUNKS_PER_PIPELINE`` chunks per round trip. ``progress(stats)`` is called after each round trip.
+        Chunks are not written atomically.
+        '''
+        return self._bulk_load('ZADD', name, (scores, members), chunk_size, progress)
+
+    def geoadd_bulk(self, name, lons, lats, members, chunk_size=10000, progress=None):
+        '''
+        Adds ``members`` at positions ``lons``, ``lats`` to geo index ``name``, returns ``BulkLoadStats``.
+
+        Columns are loaded by chunks sent as single GEOADD, see ``zadd_bulk``.
+        '''
+        return self._bulk_load('GEOADD', name, (lons, lats, members), chunk_size, progress)
+
+    def _bulk_load(self, command, name, columns, chunk_size, progress):
+        "Sends ``command`` with chunks of ``columns``, the last one being members"
+        stats = BulkLoadStats()
+        with self.pipeline(transaction=False) as pipe:
+            for chunk in zip_column_chunks(chunk_size, *columns):
+                members = chunk[-1]
+                pipe.execute_command(command, name,
+                                     *interleave(len(members), *chunk[:-1], self.serialize_many(members)))
+                stats.items += len(members)
+                stats.chunks += 1
+                if len(pipe) == BULK_CHUNKS_PER_PIPELINE:
+                    self._execute_bulk_pipeline(pipe, stats, progress)
+            if len(pipe):
+                self._execute_bulk_pipeline(pipe, stats, progress)
+        stats.elapsed = time.monotonic() - stats.started
+        return stats
+
+    def _execute_bulk_pipeline(self, pipe, stats, progress):
+        stats.added += sum(pipe.execute())
+        stats.round_trips += 1
+        stats.elapsed = time.monotonic() - stats.started
+        if progress is not None:
+            progress(stats)
+
+    def scan_iter(self, match=None, count=None, batch=False, worker=False):
+        '''
+        Iterates over keys using SCAN, see ``scan_pages``.
+
+        If ``batch``, yields pages (lists of keys) instead of keys.
+        '''
+        return self._scan_iter('SCAN', (), match, count, batch, worker)
+
+    def sscan_iter(self, name, match=None, count=None, batch=False, worker=False):
+        '''
+        Iterates over members of set ``name`` using SSCAN, see ``scan_pages``.
+
+        If ``batch``, yields pages (sets of members) instead of members.
+        '''
+        # Only support exact match.
+        if match is not None:
+            match = self.serialize(match)
+        return self._scan_iter('SSCAN', (name,), match, count, batch, worker)
+
+    def hscan_iter(self, name, match=None, count=None, batch=False, worker=False):
+        '''
+        Iterates over (field, value) pairs of hash ``name`` using HSCAN, see ``scan_pages``.
+
+        If ``batch``, yields pages (dicts) instead of pairs.
+        '''
+        pages = self._scan_iter('HSCAN', (name,), match, count, True, worker)
+        if batch:
+            return pages
+        return iter_pages(pages, dict.items)
+
+    def zscan_iter(self, name, match=None, count=None, score_cast_func=float, batch=False, worker=False):
+        '''
+        Iterates over (member, score) pairs of sorted set ``name`` using ZSCAN, see ``scan_pages``.
+
+        If ``batch``, yields pages (lists of pairs) instead of pairs.
+        '''
+        # Only support exact match.
+        if match is not None:
+            match = self.serialize(match)
+        return self._scan_iter('ZSCAN', (name,), match, count, batch, worker, score_cast_func=score_cast_func)
+
+    def _scan_iter(self, command, keys, match, count, batch, worker, **options):
+        pages = self.scan_pages(command, keys, match=match, count=count, **options)
+        if worker:
+            pages = prefetch(pages)
+        if batch:
+            return pages
+        return iter_pages(pages)
+
+    def scan_pages(self, command, keys=(), match=None, count=None, **options):
+        '''
+        Yields the pages of SCAN like ``command`` (SCAN, SSCAN, HSCAN or ZSCAN) on ``keys``, parsed by the response
+        callback of the command.
+
+        The request of the next page is sent before parsing the current one, so that Redis and the network work while
+        values are deserialized. If ``worker`` is passed to the ``*scan_iter`` methods, pages are fetched and
+        deserialized by a worker thread while the caller processes the previous page.
+        '''
+        pieces = []
+        if match is not None:
+            pieces.extend([b'MATCH', match])
+        if count is not None:
+            pieces.extend([b'COUNT', count])
+        callback = self.response_callbacks[command]
+        connection = self.connection_pool.get_connection(command)
+        pending = False
+        try:
+            connection.send_command(command, *keys, 0, *pieces)
+            pending = True
+            while True:
+                response = connection.read_response()
+                pending = False
+                cursor = int(response[0])
+                if cursor != 0:
+                    connection.send_command(command, *keys, cursor, *pieces)
+                    pending = True
+                yield callback(response, **options)[1]
+                if cursor == 0:
+                    return
+        finally:
+            if pending:
+                # reply of the prefetched page can't be left on the connection
+                connection.disconnect()
+            self.connection_pool.release(connection)
 
     def pubsub(self, **kwargs):
         return PubSub(self.connection_pool, serialized_redis=self, **kwargs)
 
 
-class PubSub(redis.client.PubSub):
+class SerializedPubSubMixin(object):
+    "PubSub deserializing messages, shared by the sync and asyncio clients"
 
     def __init__(self, *args, serialized_redis, **kwargs):
         super().__init__(*args, **kwargs)
@@ -427,49 +1132,113 @@ class PubSub(redis.client.PubSub):
         return data
 
 
-def chain_functions(innerFn, *outerFns):
+class PubSub(SerializedPubSubMixin, redis.client.PubSub):
+    pass
 
-    def newFn(response, **options):
-        new_response = innerFn(response, **options)
-        for outerFn in outerFns:
-            new_response = outerFn(new_response, **options)
-        return new_response
 
-    return newFn
+def dict_merge(*dicts):
+    "Merges ``dicts`` into a new dict, not provided by redis-py 4"
+    merged = {}
+    for d in dicts:
+        merged.update(d)
+    return merged
 
 
-class JSONSerializedRedis(SerializedRedis):
-    '''
-    Redis connection that serializes and deserializes all values using json.
+def then(result, fn):
+    """
+    Returns ``fn(result)``, or an awaitable of it if ``result`` is awaitable (deserialization offloaded by an
+    asyncio client).
+    """
+    if inspect.isawaitable(result):
+        return _await_then(result, fn)
+    return fn(result)
 
-    dict keys are normalized using sort_keys=True which means in a same dict, keys must be sortable.
-    '''
 
-    def __init__(self, *args, **kwargs):
-        import json
-        serialize_fct = json.JSONEncoder(sort_keys=True).encode
-        super().__init__(*args, serialize_fn=serialize_fct, deserialize_fn=json.loads, decode_responses=True, **kwargs)
+async def _await_then(result, fn):
+    return fn(await result)
 
 
-class PickleSerializedRedis(SerializedRedis):
-    '''
-    Redis connection that serializes and deserializes all values using pickle.
+def chunks(iterable, size):
+    "Yields lists of ``size`` items of ``iterable``"
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
-    dict keys are normalized using sort_keys=True which means in a same dict, keys must be sortable.
-    '''
 
-    def __init__(self, *args, **kwargs):
-        import pickle
-        super().__init__(*args, serialize_fn=pickle.dumps, deserialize_fn=pickle.loads, **kwargs)
+def iter_pages(pages, items=iter):
+    "Yields the items of ``pages``, closing ``pages`` when closed"
+    try:
+        for page in pages:
+            yield from items(page)
+    finally:
+        pages.close()
 
-    def incrby(self, name, amount=1):
-        raise NotImplementedError('Operation not supported with pickle serializer')
 
-    def incrbyfloat(self, name, amount=1.0):
-        raise NotImplementedError('Operation not supported with pickle serializer')
+def decode(value):
+    "Return a unicode string from the byte representation"
+    if isinstance(value, bytes):
+        value = value.decode()
+    elif isinstance(value, list):
+        return [decode(v) for v in value]
+    elif isinstance(value, tuple):
+        return tuple(decode(v) for v in value)
+    elif isinstance(value, dict):
+        return {k: decode(v) for k, v in value.items()}
+    return value
+
+
+def deserialize_many(deserialize_fn, deserialize_many_fn, values):
+    """
+    Returns the list of deserialized ``values`` using ``deserialize_many_fn`` if provided.
+
+    None and empty values (missing keys or fields) are returned as is.
+    """
+    if None in values or '' in values:
+        return [v if v is None or v == '' else deserialize_fn(v) for v in values]
+    if deserialize_many_fn is not None:
+        return deserialize_many_fn(values)
+    return list(map(deserialize_fn, values))
+
+
+class JSONSerializedMixin(object):
+    "Serializes values using json, see ``JSONSerializedRedis``"
+
+    CODEC_TAG = codecs.JSON
+    INCR_SCRIPT = JSON_INCR_SCRIPT
+    # json numbers are the strings Redis increments
+    NATIVE_INCR = True
+
+    def __init__(self, *args, json_backend='json', **kwargs):
+        serialize_fct, deserialize_fct = get_json_backend(json_backend)
+        # compressed values and values of other codecs are binary and can not be decoded,
+        # other backends than json parse bytes
+        decode_responses = kwargs.pop('decode_responses', json_backend == 'json' and kwargs.get('compressor') is None
+                                      and not kwargs.get('codec_tag') and not kwargs.get('numpy_arrays')
+                                      and not kwargs.get('ordered'))
+        super().__init__(*args, serialize_fn=serialize_fct, deserialize_fn=deserialize_fct,
+                         decode_responses=decode_responses, **kwargs)
+
+
+class PickleSerializedMixin(object):
+    "Serializes values using pickle, see ``PickleSerializedRedis``"
+
+    CODEC_TAG = codecs.PICKLE
+    INCR_SCRIPT = PICKLE_INCR_SCRIPT
+
+    def __init__(self, *args, pickle_codec=None, **kwargs):
+        serialize_fct = pickle.dumps if pickle_codec is None else pickle_codec.dumps
+        # values with out-of-band buffers are only read by clients with an out-of-band codec
+        deserialize_fct = pickle_codec.loads if pickle_codec is not None and pickle_codec.out_of_band else pickle.loads
+        super().__init__(*args, serialize_fn=serialize_fct, deserialize_fn=deserialize_fct, **kwargs)
 
     def sort(self, name, start=None, num=None, by=None, get=None,
         desc=False, alpha=False, store=None, groups=False):
+        if self.ordered:
+            return super().sort(name, start=start, num=num, by=by, get=get, desc=desc, alpha=alpha, store=store,
+                                groups=groups)
         # once pickled aplha order seems respected for numbers but not for pickled strings
         if alpha:
             raise NotImplementedError('Server side string comparison not supported with pickle serializer')
@@ -479,21 +1248,24 @@ class PickleSerializedRedis(SerializedRedis):
         return super().sort(name, start=start, num=num, by=by, get=get, desc=desc, alpha=True, store=store, groups=groups)
 
 
-class MsgpackSerializedRedis(SerializedRedis):
+class MsgpackSerializedMixin(object):
+    "Serializes values using msgpack, see ``MsgpackSerializedRedis``"
 
-    def __init__(self, *args, **kwargs):
-        import msgpack
-        deserialize_fct = functools.partial(msgpack.unpackb, raw=False)
-        super().__init__(*args, serialize_fn=msgpack.dumps, deserialize_fn=deserialize_fct, **kwargs)
+    CODEC_TAG = codecs.MSGPACK
+    INCR_SCRIPT = MSGPACK_INCR_SCRIPT
 
-    def incrby(self, name, amount=1):
-        raise NotImplementedError('Operation not supported with msgpack serializer')
-
-    def incrbyfloat(self, name, amount=1.0):
-        raise NotImplementedError('Operation not supported with pickle serializer')
+    def __init__(self, *args, ext_types=None, **kwargs):
+        from .msgpack_codec import get_msgpack_codec
+        # shared by all instances with the same ext types so that they share their compiled response callbacks
+        codec = get_msgpack_codec(ext_types)
+        super().__init__(*args, serialize_fn=codec.dumps, deserialize_fn=codec.loads,
+                         serialize_many_fn=codec.dumps_many, deserialize_many_fn=codec.loads_many, **kwargs)
 
     def sort(self, name, start=None, num=None, by=None, get=None,
              desc=False, alpha=False, store=None, groups=False):
+        if self.ordered:
+            return super().sort(name, start=start, num=num, by=by, get=get, desc=desc, alpha=alpha, store=store,
+                                groups=groups)
         # once pickled aplha order seems respected for numbers but not for pickled strings
         if alpha:
             raise NotImplementedError('Server side string comparison not supported with pickle serializer')
@@ -501,3 +1273,34 @@ class MsgpackSerializedRedis(SerializedRedis):
             raise NotImplementedError('Server side string comparison using weights with pickle serializer')
         # for number comparison, force alpha to True
         return super().sort(name, start=start, num=num, by=by, get=get, desc=desc, alpha=True, store=store, groups=groups)
+
+
+class JSONSerializedRedis(JSONSerializedMixin, SerializedRedis):
+    '''
+    Redis connection that serializes and deserializes all values using json.
+
+    dict keys are normalized using sort_keys=True which means in a same dict, keys must be sortable.
+
+    ``json_backend`` selects the JSON library, see ``json_backends``. Responses are decoded to str only with the
+    default 'json' backend, other backends parse bytes.
+    '''
+
+
+class PickleSerializedRedis(PickleSerializedMixin, SerializedRedis):
+    '''
+    Redis connection that serializes and deserializes all values using pickle.
+
+    dict keys are normalized using sort_keys=True which means in a same dict, keys must be sortable.
+
+    A ``PickleCodec`` can be provided as ``pickle_codec`` to choose the pickle protocol, serialize large buffers
+    out-of-band or optimize pickles. Values with out-of-band buffers are read by clients with an out-of-band codec.
+    '''
+
+
+class MsgpackSerializedRedis(MsgpackSerializedMixin, SerializedRedis):
+    '''
+    Redis connection that serializes and deserializes all values using msgpack.
+
+    Types msgpack has no type for (tuple, set, datetime...) can be serialized as msgpack extension types by
+    providing ``ext_types``, see ``msgpack_codec.ExtTypes``.
+    '''
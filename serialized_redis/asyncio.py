@@ -0,0 +1,92 @@
+'''
+asyncio clients, requiring redis-py >= 4.2 (``redis.asyncio``).
+
+Commands, response callbacks, compression and codec tags are shared with the sync clients, only network I/O is
+awaited::
+
+    r = AsyncJSONSerializedRedis()
+    await r.set('key', {'a': 1})
+    await r.get('key')
+'''
+import redis.asyncio
+import redis.exceptions
+import redis.asyncio.client
+
+from . import (SerializedRedisMixin, SerializedPubSubMixin, JSONSerializedMixin, PickleSerializedMixin,
+               MsgpackSerializedMixin)
+
+
+class AsyncSerializedRedis(SerializedRedisMixin, redis.asyncio.Redis):
+    '''
+        asyncio wrapper to Redis that De/Serializes all values, see ``SerializedRedis``.
+    '''
+
+    PIPELINE_BASE_CLASS = redis.asyncio.client.Pipeline
+    AWAITABLE_CALLBACKS = True
+
+    async def smart_get(self, name):
+        '''
+        Returns python type corresponding to redis type, see ``SerializedRedis.smart_get``.
+        '''
+        return (await self.smart_get_many([name]))[0]
+
+    async def smart_get_many(self, names):
+        '''
+        Returns the list of python values of keys ``names``, see ``SerializedRedis.smart_get_many``.
+        '''
+        if not names:
+            return []
+        return self.parse_smart_get(await self.smart_get_script()(keys=names))
+
+    async def smart_set(self, name, value, diff=False, previous=None):
+        '''
+        Saves value using appropriate Redis type, see ``SerializedRedis.smart_set``.
+        '''
+        async with self.pipeline() as pipe:
+            while True:
+                try:
+                    if not diff:
+                        self.queue_smart_set(pipe, name, value)
+                    elif previous is not None:
+                        self.queue_smart_set_diff(pipe, name, value, *self.smart_serialize(previous))
+                    else:
+                        await pipe.watch(name)
+                        key_type, data = await self.smart_get_script()(keys=[name])
+                        pipe.multi()
+                        self.queue_smart_set_diff(pipe, name, value, self.decode(key_type), data)
+                    await pipe.execute()
+                    return
+                except redis.exceptions.WatchError:
+                    continue
+
+    def run_script(self, script, keys=(), args=(), parse_reply=None):
+        "Runs ``script`` with EVALSHA, see ``SerializedRedis.run_script``"
+        if isinstance(self, self.PIPELINE_BASE_CLASS):
+            return super().run_script(script, keys, args, parse_reply)
+        return self._run_script(script, keys, args, parse_reply)
+
+    async def _run_script(self, script, keys, args, parse_reply):
+        try:
+            return await self.execute_command('EVALSHA', script.sha, len(keys), *keys, *args, parse_reply=parse_reply)
+        except redis.exceptions.NoScriptError:
+            script.sha = await self.script_load(script.script)
+            return await self.execute_command('EVALSHA', script.sha, len(keys), *keys, *args, parse_reply=parse_reply)
+
+    def pubsub(self, **kwargs):
+        return AsyncPubSub(self.connection_pool, serialized_redis=self, **kwargs)
+
+
+class AsyncPubSub(SerializedPubSubMixin, redis.asyncio.client.PubSub):
+    pass
+
+
+class AsyncJSONSerializedRedis(JSONSerializedMixin, AsyncSerializedRedis):
+    "asyncio Redis connection that serializes and deserializes all values using json."
+
+
+class AsyncPickleSerializedRedis(PickleSerializedMixin, AsyncSerializedRedis):
+    "asyncio Redis connection that serializes and deserializes all values using pickle."
+
+
+class AsyncMsgpackSerializedRedis(MsgpackSerializedMixin, AsyncSerializedRedis):
+    "asyncio Redis connection that serializes and deserializes all values using msgpack."
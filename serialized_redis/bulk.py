@@ -0,0 +1,60 @@
+'''
+Helpers of bulk loaders (``SerializedRedis.zadd_bulk``, ``SerializedRedis.geoadd_bulk``).
+
+Columns (NumPy arrays, sequences or iterables) are read by chunks, NumPy arrays being sliced and converted with
+``tolist`` instead of iterated item by item.
+'''
+import itertools
+import time
+
+
+class BulkLoadStats(object):
+    "Counters of a bulk load"
+
+    def __init__(self):
+        self.items = 0
+        self.added = 0
+        self.chunks = 0
+        self.round_trips = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        "Items per second"
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return ('BulkLoadStats(items=%d, added=%d, chunks=%d, round_trips=%d, elapsed=%.3fs, throughput=%.1f items/s)'
+                % (self.items, self.added, self.chunks, self.round_trips, self.elapsed, self.throughput))
+
+
+def column_chunks(column, size):
+    "Yields lists of ``size`` values of ``column``"
+    if hasattr(column, 'tolist') and hasattr(column, '__getitem__'):
+        # NumPy arrays: convert slices at once to python values
+        for offset in range(0, len(column), size):
+            yield column[offset:offset + size].tolist()
+        return
+    iterator = iter(column)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def zip_column_chunks(size, *columns):
+    "Yields tuples of chunks of ``size`` values of ``columns``, raises ``ValueError`` if columns lengths differ"
+    for chunks in itertools.zip_longest(*(column_chunks(column, size) for column in columns)):
+        if any(chunk is None or len(chunk) != len(chunks[0]) for chunk in chunks):
+            raise ValueError('Columns must have the same length')
+        yield chunks
+
+
+def interleave(length, *columns):
+    "Returns the flat list of the items of ``columns``, e.g. [score, member, score, member...]"
+    values = [None] * (length * len(columns))
+    for i, column in enumerate(columns):
+        values[i::len(columns)] = column
+    return values
@@ -0,0 +1,236 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+import redis
+from redis.client import string_keys_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def key_name(name):
+    "Returns ``name`` as str, as received in keyspace notifications"
+    if isinstance(name, bytes):
+        return name.decode('utf-8', 'surrogateescape')
+    return str(name)
+
+
+def _first_key(args):
+    return args[1:2]
+
+
+def _all_keys(args):
+    return args[1:]
+
+
+def _mset_keys(args):
+    return args[1::2]
+
+
+def _two_keys(args):
+    return args[1:3]
+
+
+def _script_keys(args):
+    # EVAL script numkeys key [key ...] arg [arg ...]
+    return args[3:3 + int(args[2])]
+
+
+# commands writing strings and hashes, with functions returning their keys from command args
+WRITE_COMMANDS = dict(
+    string_keys_to_dict('SET SETEX PSETEX SETNX GETSET APPEND INCRBY DECRBY INCRBYFLOAT GETDEL GETEX '
+                        'HSET HSETNX HMSET HDEL HINCRBY HINCRBYFLOAT RESTORE MOVE', _first_key),
+    **string_keys_to_dict('DEL UNLINK', _all_keys),
+    **string_keys_to_dict('MSET MSETNX', _mset_keys),
+    **string_keys_to_dict('RENAME RENAMENX', _two_keys),
+    **string_keys_to_dict('EVAL EVALSHA', _script_keys),
+)
+
+
+class NearCachePipelineMixin(object):
+    "Invalidates keys written by pipelines in the near cache of their client, see ``SerializedRedis.pipeline``"
+
+    # NearCache of the client, not named near_cache so that pipelines do not read cached values
+    invalidated_cache = None
+
+    def execute(self, raise_on_error=True):
+        if self.invalidated_cache is None:
+            return super().execute(raise_on_error)
+        commands = [args for args, options in self.command_stack]
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            for args in commands:
+                self.invalidated_cache.invalidate_command(args)
+
+    def immediate_execute_command(self, *args, **options):
+        # commands run while watching keys
+        if self.invalidated_cache is not None:
+            self.invalidated_cache.invalidate_command(args)
+        return super().immediate_execute_command(*args, **options)
+
+
+class NearCache(object):
+    '''
+    In-process LRU cache of deserialized values of ``GET`` and ``HGETALL`` replies.
+
+    Cache holds at most ``max_bytes`` bytes of serialized values and ``max_entries`` entries, entries expire after
+    ``ttl`` seconds if provided. Cached values are shared, they must not be modified.
+
+    Entries are invalidated by the client's own writes, and by keyspace notifications received by a background
+    thread (see ``listen``) for writes of other clients and pipelines. Values are only cached while the notifications
+    subscription is active.
+    '''
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=None, ttl=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (command, key name) -> (value, size, expiration time)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # (command, key name) -> token of the last fetch, removed when the key is invalidated so that values
+        # fetched before an invalidation are not cached
+        self._fetching = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.notifications = 0
+        self.listening = False
+        self._pubsub = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_fetch(self, command, name, fetch):
+        '''
+        Returns cached value of ``command`` on key ``name``.
+
+        On miss, ``fetch()`` returns the value and its serialized size, the value is cached if the key was not
+        invalidated meanwhile.
+        '''
+        key = (command, key_name(name))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            token = self._fetching[key] = object()
+
+        value, size = fetch()
+
+        with self._lock:
+            if self._fetching.get(key) is token:
+                del self._fetching[key]
+                if self.listening:
+                    self._store(key, value, size)
+        return value
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, size, expires)
+        self.size += size
+        while self.size > self.max_bytes or (self.max_entries is not None and len(self._entries) > self.max_entries):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+        return entry
+
+    def invalidate(self, *names):
+        "Removes cached values of keys ``names``"
+        with self._lock:
+            for name in names:
+                name = key_name(name)
+                for command in ('GET', 'HGETALL'):
+                    key = (command, name)
+                    self._fetching.pop(key, None)
+                    if self._remove(key) is not None:
+                        self.invalidations += 1
+
+    def invalidate_command(self, args):
+        "Invalidates keys written by command ``args``"
+        keys_fn = WRITE_COMMANDS.get(args[0])
+        if keys_fn is not None:
+            self.invalidate(*keys_fn(args))
+        elif args[0] in ('FLUSHDB', 'FLUSHALL'):
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._fetching.clear()
+            self._entries.clear()
+            self.size = 0
+
+    def listen(self, client, configure=False):
+        '''
+        Starts a thread subscribing to keyspace notifications of ``client`` database to invalidate entries.
+
+        Notifications must be enabled on the server (``notify-keyspace-events`` including ``K``, ``g``, ``$``, ``h``,
+        ``x`` and ``e``), which is done with ``CONFIG SET`` if ``configure``.
+        '''
+        if self._thread is not None:
+            return
+        # raw client, notifications are not serialized
+        raw = redis.Redis(connection_pool=client.connection_pool)
+        if configure:
+            raw.config_set('notify-keyspace-events', 'KA')
+        db = client.connection_pool.connection_kwargs.get('db', 0)
+        self._prefix = '__keyspace@%d__:' % db
+        self._pubsub = raw.pubsub()
+        self._pubsub.psubscribe(self._prefix + '*')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='NearCache', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        "Stops listening to notifications and clears the cache"
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._pubsub.close()
+        self.listening = False
+        self.clear()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                message = self._pubsub.get_message(timeout=0.1)
+            except redis.ConnectionError:
+                # notifications may have been missed
+                logger.warning('near cache lost keyspace notifications connection, clearing cache')
+                self.listening = False
+                self.clear()
+                time.sleep(1)
+                continue
+            if message is None:
+                continue
+            if message['type'] == 'psubscribe':
+                self.clear()
+                self.listening = True
+            elif message['type'] == 'pmessage':
+                self.notifications += 1
+                self.invalidate(key_name(message['channel'])[len(self._prefix):])
+
+    def __repr__(self):
+        return '%s(entries=%d, size=%d, hits=%d, misses=%d, evictions=%d, invalidations=%d, notifications=%d)' % (
+            type(self).__name__, len(self._entries), self.size, self.hits, self.misses, self.evictions,
+            self.invalidations, self.notifications)
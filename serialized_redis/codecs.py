@@ -0,0 +1,124 @@
+import functools
+import json
+
+from . import pickle_codec
+
+# Tags prepended to serialized values, identifying the codec used to serialize them.
+# Multi bytes pickle, json and msgpack values never start with a byte from 0x01 to 0x1f, so tagged values can be
+# told apart from untagged ones.
+PICKLE = b'\x01'
+JSON = b'\x02'
+MSGPACK = b'\x03'
+# NumPy arrays, see numpy_codec
+NUMPY = b'\x04'
+# order preserving values, see ordered
+ORDERED = b'\x05'
+
+# Deserialize functions by tag, as bytes and str (when responses are decoded)
+_DESERIALIZERS = {}
+
+
+def register_codec(tag, deserialize_fn):
+    '''
+    Registers ``deserialize_fn`` to deserialize values tagged with ``tag``.
+
+    ``tag`` must be a single byte from 0x01 to 0x1f.
+    '''
+    if not isinstance(tag, bytes) or len(tag) != 1 or not 0 < tag[0] < 0x20:
+        raise ValueError('Codec tag must be a single byte from 0x01 to 0x1f')
+    _DESERIALIZERS[tag] = deserialize_fn
+    _DESERIALIZERS[tag.decode()] = deserialize_fn
+
+
+def _msgpack_loads(value):
+    import msgpack
+    return msgpack.unpackb(value, raw=False)
+
+
+def _numpy_loads(value):
+    from .numpy_codec import loads_untagged
+    return loads_untagged(value)
+
+
+def _ordered_loads(value):
+    from .ordered import loads_untagged
+    return loads_untagged(value)
+
+
+register_codec(PICKLE, pickle_codec.loads)
+register_codec(JSON, json.loads)
+register_codec(MSGPACK, _msgpack_loads)
+register_codec(NUMPY, _numpy_loads)
+register_codec(ORDERED, _ordered_loads)
+
+
+@functools.lru_cache(maxsize=128)
+def tagged_serializers(tag, serialize_fn, serialize_many_fn=None):
+    '''
+    Returns ``serialize_fn`` and ``serialize_many_fn`` prepending ``tag`` to serialized values.
+
+    ``serialize_many_fn`` is always returned, a generic one is created if not provided.
+    '''
+    str_tag = tag.decode()
+
+    def add_tag(data):
+        if isinstance(data, str):
+            return str_tag + data
+        return tag + data
+
+    def serialize(value):
+        return add_tag(serialize_fn(value))
+
+    def serialize_many(values):
+        if serialize_many_fn is None:
+            return [add_tag(serialize_fn(v)) for v in values]
+        return [add_tag(data) for data in serialize_many_fn(values)]
+
+    return serialize, serialize_many
+
+
+@functools.lru_cache(maxsize=128)
+def tagged_deserializers(tag, deserialize_fn, deserialize_many_fn=None, untagged_deserialize_fn=None):
+    '''
+    Returns ``deserialize_fn`` and ``deserialize_many_fn`` dispatching values to the deserializer of their tag.
+
+    Values tagged with ``tag`` are deserialized with ``deserialize_fn`` / ``deserialize_many_fn``, values tagged by
+    another registered codec with its deserializer, and untagged values with ``untagged_deserialize_fn``
+    (``deserialize_fn`` by default).
+    '''
+    own_tags = (tag, tag.decode())
+    if untagged_deserialize_fn is None:
+        untagged_deserialize_fn = deserialize_fn
+
+    def deserialize(value):
+        # a single byte is an untagged value (e.g. msgpack int 3 is b'\x03'), tags are followed by a payload
+        if len(value) > 1:
+            value_tag = value[:1]
+            if value_tag in own_tags:
+                return deserialize_fn(value[1:])
+            other_deserialize_fn = _DESERIALIZERS.get(value_tag)
+            if other_deserialize_fn is not None:
+                return other_deserialize_fn(value[1:])
+        return untagged_deserialize_fn(value)
+
+    def deserialize_many(values):
+        for value in values:
+            if len(value) < 2 or value[:1] not in own_tags:
+                return [deserialize(v) for v in values]
+        values = [v[1:] for v in values]
+        if deserialize_many_fn is None:
+            return list(map(deserialize_fn, values))
+        return deserialize_many_fn(values)
+
+    return deserialize, deserialize_many
+
+
+def merge_many(done, values, fn, many_fn=None):
+    '''
+    Returns the list of ``values`` processed by index in ``done`` or else by ``fn`` (or ``many_fn`` at once).
+
+    Used by layers (de)serializing some values themselves and the others with another codec.
+    '''
+    others = [value for i, value in enumerate(values) if i not in done]
+    others = iter(list(map(fn, others)) if many_fn is None else many_fn(others))
+    return [done[i] if i in done else next(others) for i in range(len(values))]
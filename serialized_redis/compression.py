@@ -0,0 +1,362 @@
+from collections import Counter
+import functools
+import heapq
+import lzma
+import struct
+import time
+import zlib
+
+import redis
+
+# Compressed payloads are prefixed with this byte followed by the compressor tag.
+# Neither pickle, json nor msgpack serialized values start with a null byte (except msgpack ``0`` which is a single
+# byte long), so uncompressed values can still be read.
+HEADER = b'\x00'
+
+# Compressors by tag, used to decompress values compressed by another compressor than the client's one
+_COMPRESSORS = {}
+
+
+class Compressor(object):
+    '''
+    Base class of value compressors.
+
+    Serialized values of at least ``threshold`` bytes are compressed and prefixed with a header holding the
+    compressor ``tag``. Values that do not get smaller are stored uncompressed.
+    '''
+
+    # single byte identifying the compressor in payload headers
+    tag = None
+
+    def __init__(self, threshold=1024):
+        self.threshold = threshold
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data):
+        raise NotImplementedError
+
+    def _key(self):
+        return (type(self), tuple(sorted(self.__dict__.items())))
+
+    def __eq__(self, other):
+        return isinstance(other, Compressor) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % item for item in sorted(self.__dict__.items())))
+
+
+class ZlibCompressor(Compressor):
+    "Compresses values using zlib"
+
+    tag = b'z'
+
+    def __init__(self, threshold=1024, level=6):
+        super().__init__(threshold=threshold)
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class LzmaCompressor(Compressor):
+    "Compresses values using lzma, slower than zlib but usually smaller"
+
+    tag = b'x'
+
+    def __init__(self, threshold=1024, preset=None):
+        super().__init__(threshold=threshold)
+        self.preset = preset
+
+    def compress(self, data):
+        return lzma.compress(data, format=lzma.FORMAT_XZ, check=lzma.CHECK_NONE, preset=self.preset)
+
+    def decompress(self, data):
+        return lzma.decompress(data, format=lzma.FORMAT_XZ)
+
+
+class ZlibDictCompressor(Compressor):
+    '''
+    Compresses values using zlib with a preset dictionary.
+
+    Suited to small values sharing the same structure (dict keys...) which can not be compressed on their own.
+    Payloads hold the id of the dictionary used, so dictionaries can be rotated: values compressed with any known
+    dictionary can be read. If ``store`` (a ``ZdictStore``) is provided, the current dictionary is loaded from redis
+    and unknown dictionaries are fetched when reading values. With ``refresh_interval`` (seconds), the current
+    dictionary is periodically reloaded from the store to follow rotations.
+    '''
+
+    tag = b'd'
+
+    # compressors hold dictionaries, compare them by identity
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __init__(self, zdict=None, threshold=64, level=9, store=None, refresh_interval=None):
+        super().__init__(threshold=threshold)
+        self.level = level
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.dictionaries = {}
+        self.dict_id = None
+        # a provided zdict is the current dictionary until the first refresh
+        self._last_reload = time.monotonic()
+        if zdict is not None:
+            self.add_dictionary(zdict)
+        elif store is not None:
+            self.reload()
+
+    def add_dictionary(self, zdict, current=True):
+        "Adds ``zdict`` to known dictionaries, returns its id"
+        dict_id = zdict_id(zdict)
+        self.dictionaries[dict_id] = zdict
+        if current:
+            self.dict_id = dict_id
+        return dict_id
+
+    def reload(self):
+        "Loads current dictionary from the store"
+        self._last_reload = time.monotonic()
+        current = self.store.current()
+        if current is not None:
+            self.add_dictionary(current)
+
+    def compress(self, data):
+        if self.refresh_interval is not None and self.store is not None \
+                and time.monotonic() - self._last_reload > self.refresh_interval:
+            self.reload()
+        if self.dict_id is None:
+            # no dictionary yet, value is stored uncompressed
+            return data
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY,
+                                      self.dictionaries[self.dict_id])
+        return struct.pack('>I', self.dict_id) + compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        dict_id, = struct.unpack_from('>I', data)
+        try:
+            zdict = self.dictionaries[dict_id]
+        except KeyError:
+            zdict = self.store.get(dict_id) if self.store is not None else None
+            if zdict is None:
+                raise ValueError('Unknown compression dictionary %d' % dict_id)
+            self.add_dictionary(zdict, current=False)
+        decompressor = zlib.decompressobj(-15, zdict=zdict)
+        return decompressor.decompress(data[4:]) + decompressor.flush()
+
+    def __repr__(self):
+        return '%s(dict_id=%r, threshold=%r, level=%r)' % (type(self).__name__, self.dict_id, self.threshold,
+                                                            self.level)
+
+
+class ZdictStore(object):
+    '''
+    Stores zlib compression dictionaries in redis.
+
+    Dictionaries are stored by id in the ``key`` hash, the id of the current dictionary is stored in ``key:current``.
+    ``client`` connection pool must not decode responses.
+    '''
+
+    def __init__(self, client, key='serialized_redis:zdict'):
+        # raw client, dictionaries must not be serialized
+        self.redis = redis.Redis(connection_pool=client.connection_pool)
+        self.key = key
+        self.current_key = key + ':current'
+
+    def save(self, zdict, current=True):
+        "Saves ``zdict``, making it the current dictionary if ``current``, returns its id"
+        dict_id = zdict_id(zdict)
+        with self.redis.pipeline() as pipe:
+            pipe.hset(self.key, dict_id, zdict)
+            if current:
+                pipe.set(self.current_key, dict_id)
+            pipe.execute()
+        return dict_id
+
+    def get(self, dict_id):
+        return self.redis.hget(self.key, dict_id)
+
+    def current(self):
+        "Returns current dictionary or None"
+        dict_id = self.redis.get(self.current_key)
+        if dict_id is None:
+            return None
+        return self.get(int(dict_id))
+
+    def rotate(self, samples, size=16384):
+        "Trains a new dictionary from ``samples`` and saves it as the current dictionary, returns its id"
+        return self.save(train_zdict(samples, size=size))
+
+
+def zdict_id(zdict):
+    return zlib.crc32(zdict)
+
+
+def train_zdict(samples, size=16384, segment_size=64, kmer_size=8):
+    '''
+    Returns a zlib preset dictionary of at most ``size`` bytes built from ``samples`` (serialized values).
+
+    Segments of the samples covering the byte sequences (k-mers) shared by most samples are greedily selected,
+    the most useful ones being placed at the end of the dictionary as zlib favors closer matches. Remaining space
+    is filled with whole samples.
+    '''
+    samples = [sample.encode() if isinstance(sample, str) else bytes(sample) for sample in samples]
+
+    # number of samples containing each k-mer
+    frequencies = Counter()
+    for sample in samples:
+        frequencies.update({sample[i:i + kmer_size] for i in range(len(sample) - kmer_size + 1)})
+
+    def kmers(segment):
+        return {segment[i:i + kmer_size] for i in range(len(segment) - kmer_size + 1)}
+
+    def score(segment, covered):
+        return sum(frequencies[kmer] for kmer in kmers(segment) - covered if frequencies[kmer] > 1)
+
+    segments = {sample[i:i + segment_size]
+                for sample in samples
+                for i in range(0, max(len(sample) - segment_size, 0) + 1, kmer_size)}
+    # max heap of segments by score, scores only decrease as k-mers get covered so they are lazily updated
+    heap = [(-score(segment, set()), segment) for segment in segments]
+    heapq.heapify(heap)
+
+    covered = set()
+    selected = []
+    total_size = 0
+    while heap and total_size < size:
+        _, segment = heapq.heappop(heap)
+        current_score = score(segment, covered)
+        if current_score == 0:
+            break
+        if heap and current_score < -heap[0][0]:
+            heapq.heappush(heap, (-current_score, segment))
+            continue
+        selected.append(segment)
+        covered |= kmers(segment)
+        total_size += len(segment)
+
+    # fill remaining space with whole samples, which still hold useful less frequent sequences
+    for sample in samples:
+        if total_size >= size:
+            break
+        selected.append(sample)
+        total_size += len(sample)
+
+    return b''.join(reversed(selected))[-size:]
+
+
+def sample_values(client, count=1000, match=None):
+    '''
+    Returns up to ``count`` serialized values of string keys, decompressed, to be used as ``train_zdict`` samples.
+
+    ``client`` is a SerializedRedis, its compressor is used to decompress values.
+    '''
+    raw = redis.Redis(connection_pool=client.connection_pool)
+    compressor = getattr(client, 'compressor', None)
+    samples = []
+    for key in raw.scan_iter(match=match, count=count):
+        # type is decoded if the pool decodes responses (e.g. JSON clients)
+        if raw.type(key) not in (b'string', 'string'):
+            continue
+        value = raw.get(key)
+        if value is None:
+            continue
+        samples.append(decompress(value, compressor))
+        if len(samples) >= count:
+            break
+    return samples
+
+
+def register_compressor(compressor):
+    '''
+    Registers ``compressor`` so that values compressed with its tag can be read by any client.
+
+    The compressor used to write values does not need to be registered.
+    '''
+    tag = compressor.tag
+    if not isinstance(tag, bytes) or len(tag) != 1:
+        raise ValueError('Compressor tag must be a single byte')
+    _COMPRESSORS[tag] = compressor
+
+
+register_compressor(ZlibCompressor())
+register_compressor(LzmaCompressor())
+
+
+def get_compressor(tag):
+    "Returns compressor registered for ``tag``"
+    try:
+        return _COMPRESSORS[tag]
+    except KeyError:
+        raise ValueError('Unknown compressor %r' % tag)
+
+
+def decompress(data, compressor=None):
+    '''
+    Returns decompressed ``data`` if it is compressed, using ``compressor`` or the registered compressor of its tag.
+    '''
+    if not data or data[0] != 0 or len(data) == 1:
+        return data
+    tag = data[1:2]
+    if compressor is None or tag != compressor.tag:
+        compressor = get_compressor(tag)
+    return compressor.decompress(data[2:])
+
+
+@functools.lru_cache(maxsize=128)
+def compressed_serializers(compressor, serialize_fn, serialize_many_fn=None):
+    '''
+    Returns ``serialize_fn`` and ``serialize_many_fn`` compressing serialized values with ``compressor``.
+
+    ``serialize_many_fn`` is always returned, a generic one is created if not provided.
+    '''
+    threshold = compressor.threshold
+    compress = compressor.compress
+    prefix = HEADER + compressor.tag
+
+    def maybe_compress(data):
+        if len(data) < threshold:
+            return data
+        if isinstance(data, str):
+            data = data.encode()
+        compressed = compress(data)
+        if len(compressed) + len(prefix) >= len(data):
+            return data
+        return prefix + compressed
+
+    def serialize(value):
+        return maybe_compress(serialize_fn(value))
+
+    def serialize_many(values):
+        if serialize_many_fn is None:
+            return [maybe_compress(serialize_fn(v)) for v in values]
+        return [maybe_compress(data) for data in serialize_many_fn(values)]
+
+    return serialize, serialize_many
+
+
+@functools.lru_cache(maxsize=128)
+def compressed_deserializers(compressor, deserialize_fn, deserialize_many_fn=None):
+    '''
+    Returns ``deserialize_fn`` and ``deserialize_many_fn`` decompressing values before deserialization.
+
+    Values compressed by ``compressor`` or by any registered compressor are decompressed, other values
+    are deserialized as is.
+    '''
+    def deserialize(value):
+        return deserialize_fn(decompress(value, compressor))
+
+    def deserialize_many(values):
+        values = [decompress(v, compressor) for v in values]
+        if deserialize_many_fn is None:
+            return list(map(deserialize_fn, values))
+        return deserialize_many_fn(values)
+
+    return deserialize, deserialize_many
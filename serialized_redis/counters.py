@@ -0,0 +1,197 @@
+'''
+Atomic increments of serialized numbers, used by ``incrby`` and ``incrbyfloat`` of pickle and msgpack clients, and
+of json clients with a codec tag (untagged json numbers are incremented by Redis).
+
+Numbers are decoded, incremented and encoded again by a Lua script in a single call, instead of a ``WATCH`` /
+``GET`` / ``SET`` loop. Lua numbers being doubles, ints are limited to +/- (2 ** 53 - 1) (``MAX_INT``).
+
+Like ``INCRBY``, ``incrby`` fails on floats and ``incrbyfloat`` stores a float, and both fail on values that are
+not numbers (``ResponseError``). Scripts are given the key, the increment, whether the increment is a float and
+the codec tag of the client (an empty string if none).
+'''
+
+# largest int incremented exactly
+MAX_INT = 2 ** 53 - 1
+
+# Lua helpers shared by the scripts, the codec part of the scripts defines decode(data) returning the number and
+# whether it is a float, and encode(n, is_float)
+_INCR_HEADER = """
+local MAX_INT = 9007199254740991
+local function fail(message)
+    error(message, 0)
+end
+"""
+
+_INCR_FOOTER = """
+local function incr()
+    local data = redis.call('GET', KEYS[1])
+    local increment = tonumber(ARGV[1])
+    local float_increment = ARGV[2] == '1'
+    local tag = ARGV[3]
+    if not increment or (not float_increment and increment % 1 ~= 0) then
+        fail('ERR value is not an integer or out of range')
+    end
+    local n, is_float = 0, float_increment
+    if data then
+        -- a value as long as the tag is untagged (e.g. msgpack int 3 is the msgpack tag)
+        if tag ~= '' and #data > #tag and data:sub(1, #tag) == tag then
+            data = data:sub(#tag + 1)
+        end
+        n, is_float = decode(data)
+        if (is_float and not float_increment) or (not is_float and (n > MAX_INT or n < -MAX_INT)) then
+            fail('ERR value is not an integer or out of range')
+        end
+        is_float = float_increment
+    end
+    n = n + increment
+    if n ~= n or n == math.huge or n == -math.huge then
+        fail('ERR increment would produce NaN or Infinity')
+    end
+    if not is_float and (n > MAX_INT or n < -MAX_INT) then
+        fail('ERR increment or decrement would overflow')
+    end
+    -- keeps the time to live, as INCRBY does
+    local ttl = redis.call('PTTL', KEYS[1])
+    redis.call('SET', KEYS[1], tag .. encode(n, is_float))
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[1], ttl)
+    end
+    if is_float then
+        return string.format('%.17g', n)
+    end
+    return n
+end
+
+local ok, result = pcall(incr)
+if not ok then
+    -- errors of redis.call are tables
+    return type(result) == 'table' and result or redis.error_reply(result)
+end
+return result
+"""
+
+# pickles of ints (BININT1, BININT2, BININT, LONG1 opcodes) and floats (BINFLOAT), with or without PROTO and FRAME
+PICKLE_INCR_SCRIPT = _INCR_HEADER + """
+local NOT_A_NUMBER = 'ERR value is not a pickled number'
+
+local function decode(data)
+    local pos = 1
+    if data:byte(pos) == 0x80 then
+        pos = pos + 2
+    end
+    if data:byte(pos) == 0x95 then
+        pos = pos + 9
+    end
+    local op = data:sub(pos, pos)
+    local n, is_float = nil, false
+    if op == 'K' then
+        n = data:byte(pos + 1)
+        pos = pos + 2
+    elseif op == 'M' then
+        n = struct.unpack('<I2', data, pos + 1)
+        pos = pos + 3
+    elseif op == 'J' then
+        n = struct.unpack('<i4', data, pos + 1)
+        pos = pos + 5
+    elseif op == '\\138' then
+        local size = data:byte(pos + 1)
+        if not size or size > 7 then
+            fail(NOT_A_NUMBER)
+        end
+        -- negative numbers are read complemented, staying exact
+        local negative = size > 0 and data:byte(pos + 1 + size) >= 0x80
+        n = 0
+        for i = size, 1, -1 do
+            local byte = data:byte(pos + 1 + i)
+            n = n * 256 + (negative and 255 - byte or byte)
+        end
+        if negative then
+            n = -n - 1
+        end
+        pos = pos + 2 + size
+    elseif op == 'G' then
+        n = struct.unpack('>d', data, pos + 1)
+        is_float = true
+        pos = pos + 9
+    end
+    if not n or data:sub(pos) ~= '.' then
+        fail(NOT_A_NUMBER)
+    end
+    return n, is_float
+end
+
+local function encode(n, is_float)
+    local body
+    if is_float then
+        body = 'G' .. struct.pack('>d', n)
+    elseif n >= 0 and n < 256 then
+        body = 'K' .. string.char(n)
+    elseif n >= 0 and n < 65536 then
+        body = 'M' .. struct.pack('<I2', n)
+    elseif n >= -2147483648 and n < 2147483648 then
+        body = 'J' .. struct.pack('<i4', n)
+    else
+        -- LONG1, 7 bytes two's complement little endian
+        local negative = n < 0
+        local m = negative and -n - 1 or n
+        local bytes = {}
+        for i = 1, 7 do
+            local byte = m % 256
+            m = (m - byte) / 256
+            bytes[i] = string.char(negative and 255 - byte or byte)
+        end
+        body = '\\138\\7' .. table.concat(bytes)
+    end
+    return '\\128\\2' .. body .. '.'
+end
+""" + _INCR_FOOTER
+
+# json numbers, for tagged values
+JSON_INCR_SCRIPT = _INCR_HEADER + """
+local function decode(data)
+    local n = tonumber(data)
+    -- tonumber also reads hex numbers and surrounding spaces
+    if not n or not data:match('^%-?%d[%d%.eE%+%-]*$') then
+        fail('ERR value is not a json number')
+    end
+    return n, data:find('[%.eE]') ~= nil
+end
+
+local function encode(n, is_float)
+    if not is_float then
+        return string.format('%d', n)
+    end
+    -- shortest representation, with a fraction so that it is read as a float
+    local text
+    for precision = 15, 17 do
+        text = string.format('%.' .. precision .. 'g', n)
+        if tonumber(text) == n then
+            break
+        end
+    end
+    if not text:find('[%.eE]') then
+        text = text .. '.0'
+    end
+    return text
+end
+""" + _INCR_FOOTER
+
+# msgpack ints and floats (float 32 and float 64)
+MSGPACK_INCR_SCRIPT = _INCR_HEADER + """
+local function decode(data)
+    local first = data:byte(1)
+    local ok, n = pcall(cmsgpack.unpack, data)
+    if not ok or type(n) ~= 'number' then
+        fail('ERR value is not a msgpack number')
+    end
+    return n, first == 0xca or first == 0xcb
+end
+
+local function encode(n, is_float)
+    if is_float then
+        -- float 64 even if integral, as msgpack python does
+        return '\\203' .. struct.pack('>d', n)
+    end
+    return cmsgpack.pack(n)
+end
+""" + _INCR_FOOTER
@@ -0,0 +1,75 @@
+'''
+JSON libraries usable by ``JSONSerializedRedis``.
+
+Each backend returns a ``(dumps, loads)`` pair. ``dumps`` sorts dict keys so that equal values are serialized the same
+way (needed by set and sorted set members, e.g. ``SISMEMBER``), ``loads`` accepts bytes as well as str.
+
+Backends do not all produce the same output (separators, escaping of non ASCII characters), so clients sharing
+set or sorted set members must use the same backend. ``json`` and ``simplejson`` produce the same output.
+'''
+
+# backends tried by 'auto', fastest first
+AUTO_BACKENDS = ('orjson', 'ujson', 'simplejson', 'json')
+
+
+def _json():
+    import json
+    return json.JSONEncoder(sort_keys=True).encode, json.loads
+
+
+def _simplejson():
+    import simplejson
+    return simplejson.JSONEncoder(sort_keys=True).encode, simplejson.loads
+
+
+def _orjson():
+    import orjson
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        return orjson.dumps(value, option=option)
+
+    return dumps, orjson.loads
+
+
+def _ujson():
+    import ujson
+
+    def dumps(value):
+        return ujson.dumps(value, sort_keys=True, ensure_ascii=False, escape_forward_slashes=False)
+
+    return dumps, ujson.loads
+
+
+_BACKENDS = {
+    'json': _json,
+    'simplejson': _simplejson,
+    'orjson': _orjson,
+    'ujson': _ujson,
+}
+
+# (dumps, loads) by backend name, so that clients share their functions and compiled response callbacks
+_LOADED = {}
+
+
+def get_json_backend(name='json'):
+    '''
+    Returns ``(dumps, loads)`` of JSON backend ``name``: 'json', 'simplejson', 'orjson', 'ujson', or 'auto' for the
+    fastest installed one.
+    '''
+    if name == 'auto':
+        for name in AUTO_BACKENDS:
+            try:
+                return get_json_backend(name)
+            except ImportError:
+                continue
+    try:
+        return _LOADED[name]
+    except KeyError:
+        pass
+    try:
+        backend = _BACKENDS[name]
+    except KeyError:
+        raise ValueError('Unknown JSON backend %r' % name)
+    _LOADED[name] = backend()
+    return _LOADED[name]
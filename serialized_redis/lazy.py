@@ -0,0 +1,73 @@
+from collections.abc import Mapping, Sequence
+
+# marks values not deserialized yet
+_MISSING = object()
+
+
+class LazyList(Sequence):
+    '''
+    Read only list of serialized values, deserialized on first access.
+
+    Deserialized values are memoized, deserialization errors are raised when accessing the value.
+    '''
+
+    __slots__ = ('_values', '_deserialize', '_cache')
+
+    def __init__(self, values, deserialize):
+        self._values = values
+        self._deserialize = deserialize
+        self._cache = [_MISSING] * len(values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._values)))]
+        value = self._cache[index]
+        if value is _MISSING:
+            value = self._cache[index] = self._deserialize(self._values[index])
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LazyList)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, list(self))
+
+
+class LazyDict(Mapping):
+    '''
+    Read only dict of serialized values, deserialized on first access.
+
+    Deserialized values are memoized, deserialization errors are raised when accessing the value.
+    '''
+
+    __slots__ = ('_values', '_deserialize', '_cache')
+
+    def __init__(self, keys, values, deserialize):
+        self._values = dict(zip(keys, values))
+        self._deserialize = deserialize
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        value = self._cache[key] = self._deserialize(self._values[key])
+        return value
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, dict(self.items()))
@@ -0,0 +1,149 @@
+import copy as _copy
+import functools
+
+# types of immutable values whose serialization can be memoized, with tuples of them
+SCALAR_TYPES = frozenset((str, bytes, int, float, bool, type(None)))
+
+
+def memo_key(value):
+    '''
+    Returns the types of ``value``, distinguishing equal values of different types (``1``, ``1.0``, ``True``),
+    or None if ``value`` can not be memoized. Floats are keyed by their hex representation, distinguishing ``0.0``
+    from ``-0.0``.
+    '''
+    value_type = type(value)
+    if value_type is float:
+        return value.hex()
+    if value_type in SCALAR_TYPES:
+        return value_type
+    if value_type is tuple:
+        types = tuple(map(memo_key, value))
+        if None in types:
+            return None
+        return types
+    return None
+
+
+class Memo(object):
+    "Base class of memos, holding the stats of their ``lru_cache`` wrappers"
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        # lru_cache wrappers created for this memo
+        self._caches = []
+
+    def _cache_info(self, field):
+        "Returns the sum of ``field`` of the caches of this memo"
+        return sum(getattr(cache.cache_info(), field) for cache in self._caches)
+
+    @property
+    def hits(self):
+        return self._cache_info('hits')
+
+    @property
+    def misses(self):
+        return self._cache_info('misses')
+
+    @property
+    def size(self):
+        return self._cache_info('currsize')
+
+    def clear(self):
+        for cache in self._caches:
+            cache.cache_clear()
+
+    @property
+    def hit_rate(self):
+        "Ratio of memoized values used"
+        hits, misses = self.hits, self.misses
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def __repr__(self):
+        return '%s(maxsize=%d, size=%d, hits=%d, misses=%d)' % (type(self).__name__, self.maxsize, self.size,
+                                                                self.hits, self.misses)
+
+
+class SerializationMemo(Memo):
+    '''
+    Bounded LRU memo of serialized values, for immutable scalars and tuples of them.
+
+    Useful when the same small values (ids, tags...) are serialized over and over, e.g. by ``sismember``, ``zscore``
+    or ``srem``. Clients sharing the same memo and serializer share memoized values.
+    '''
+
+
+@functools.lru_cache(maxsize=128)
+def memoized_serializers(memo, serialize_fn, serialize_many_fn=None):
+    '''
+    Returns ``serialize_fn`` and ``serialize_many_fn`` memoizing serialized values in ``memo``.
+
+    ``serialize_many_fn`` is always returned, a generic one is created if not provided. It is only used when
+    some of the values can not be memoized.
+    '''
+    @functools.lru_cache(maxsize=memo.maxsize)
+    def cached_serialize(value, types):
+        return serialize_fn(value)
+
+    memo._caches.append(cached_serialize)
+
+    def serialize(value):
+        types = memo_key(value)
+        if types is None:
+            return serialize_fn(value)
+        return cached_serialize(value, types)
+
+    def serialize_many(values):
+        keys = [memo_key(v) for v in values]
+        if None not in keys:
+            return list(map(cached_serialize, values, keys))
+        if serialize_many_fn is None:
+            return list(map(serialize, values))
+        return serialize_many_fn(values)
+
+    return serialize, serialize_many
+
+
+class DeserializationMemo(Memo):
+    '''
+    Bounded LRU memo of deserialized values, keyed on serialized values of at most ``max_length`` bytes.
+
+    Useful when the same payloads (e.g. enum like objects) repeat heavily across replies. Memoized values are
+    shared: mutable values (anything but scalars and tuples of them) must not be modified, unless ``copy`` is
+    provided, either True to return deep copies or a function returning a copy of a value. Memoized values replace
+    batch deserialization (``deserialize_many_fn``), check ``hit_rate`` to tell whether the memo pays off.
+    '''
+
+    def __init__(self, maxsize=4096, max_length=256, copy=None):
+        super().__init__(maxsize=maxsize)
+        self.max_length = max_length
+        self.copy = _copy.deepcopy if copy is True else copy
+
+
+@functools.lru_cache(maxsize=128)
+def memoized_deserializers(memo, deserialize_fn, deserialize_many_fn=None):
+    '''
+    Returns ``deserialize_fn`` and ``deserialize_many_fn`` memoizing deserialized values in ``memo``.
+    '''
+    max_length = memo.max_length
+    copy = memo.copy
+    cached_deserialize = functools.lru_cache(maxsize=memo.maxsize)(deserialize_fn)
+    memo._caches.append(cached_deserialize)
+
+    if copy is None:
+        def deserialize(value):
+            if len(value) > max_length:
+                return deserialize_fn(value)
+            return cached_deserialize(value)
+    else:
+        def deserialize(value):
+            if len(value) > max_length:
+                return deserialize_fn(value)
+            result = cached_deserialize(value)
+            if memo_key(result) is None:
+                return copy(result)
+            return result
+
+    def deserialize_many(values):
+        return list(map(deserialize, values))
+
+    return deserialize, deserialize_many
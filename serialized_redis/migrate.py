@@ -0,0 +1,284 @@
+'''
+Rewrites the keyspace from a source client codec to a target client codec.
+
+Keys are walked with SCAN, read with the source client and rewritten with the target client in pipelined batches,
+preserving their type and TTL. Strings, hashes, lists, sets and sorted sets are supported, other types are skipped.
+
+Keys whose values can not be read with the source codec or written with the target codec are logged, counted as
+errors and left as is. Migration can be resumed from a checkpointed SCAN cursor, and throttled to a number of keys
+per second.
+Rewriting in place (source and target on the same database) requires both clients to read the target codec values,
+e.g. with ``codec_tag=True``, as keys may be returned more than once by SCAN.
+
+Usage::
+
+    python -m serialized_redis.migrate --source-codec pickle --target-codec msgpack --codec-tag --ext-types \
+        --url redis://localhost:6379/0 --checkpoint migration.json --rate 10000
+'''
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+
+import redis
+
+from . import JSONSerializedRedis, PickleSerializedRedis, MsgpackSerializedRedis
+
+logger = logging.getLogger(__name__)
+
+# value of keys deleted between TYPE and read, None being a valid deserialized string value
+_MISSING = object()
+
+CODECS = {
+    'json': JSONSerializedRedis,
+    'pickle': PickleSerializedRedis,
+    'msgpack': MsgpackSerializedRedis,
+}
+
+
+class MigrationStats(object):
+    "Counters of a migration"
+
+    def __init__(self):
+        self.migrated = 0
+        self.skipped = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    @property
+    def throughput(self):
+        "Keys per second"
+        elapsed = time.monotonic() - self.started
+        return (self.migrated + self.skipped + self.errors) / elapsed if elapsed else 0.0
+
+    def __repr__(self):
+        return 'MigrationStats(migrated=%d, skipped=%d, errors=%d, throughput=%.1f keys/s)' % (
+            self.migrated, self.skipped, self.errors, self.throughput)
+
+
+class FileCheckpoint(object):
+    "Stores the SCAN cursor of a migration in a json file"
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        "Returns saved cursor, 0 if there is none"
+        try:
+            with open(self.path) as f:
+                return json.load(f)['cursor']
+        except FileNotFoundError:
+            return 0
+
+    def save(self, cursor):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'cursor': cursor}, f)
+        os.replace(tmp_path, self.path)
+
+
+def migrate(source, target, match=None, batch_size=100, rate=None, checkpoint=None, stats=None):
+    '''
+    Rewrites keys read with ``source`` using ``target``, returns ``MigrationStats``.
+
+    ``batch_size`` keys are read and written per round trip. ``rate`` limits the number of keys per second.
+    If ``checkpoint`` is provided (see ``FileCheckpoint``), migration starts from its cursor and the cursor is saved
+    after each batch. Once done, the cursor is reset to 0.
+    '''
+    stats = stats or MigrationStats()
+    # keys are read raw, values are deserialized by us so that a bad value only fails its key
+    raw = redis.Redis(connection_pool=source.connection_pool)
+    cursor = checkpoint.load() if checkpoint is not None else 0
+    first = True
+
+    while first or cursor != 0:
+        first = False
+        cursor, keys = raw.scan(cursor, match=match, count=batch_size)
+        for offset in range(0, len(keys), batch_size):
+            _migrate_batch(source, target, raw, keys[offset:offset + batch_size], stats)
+            _throttle(stats, rate)
+        if checkpoint is not None:
+            checkpoint.save(cursor)
+        logger.info('cursor %d: %r', cursor, stats)
+
+    return stats
+
+
+def _throttle(stats, rate):
+    if rate is None:
+        return
+    processed = stats.migrated + stats.skipped + stats.errors
+    delay = processed / rate - (time.monotonic() - stats.started)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _migrate_batch(source, target, raw, keys, stats):
+    with target.pipeline() as write_pipe:
+        while True:
+            try:
+                # detect keys modified by others while being migrated
+                write_pipe.watch(*keys)
+                values, skipped, errors = _read_batch(source, target, raw, keys)
+                if values:
+                    write_pipe.multi()
+                    for key, (key_type, ttl, value) in values.items():
+                        _write(write_pipe, key, key_type, ttl, value)
+                    write_pipe.execute()
+                else:
+                    write_pipe.reset()
+                # counted once the batch is committed, not for each retry
+                stats.migrated += len(values)
+                stats.skipped += skipped
+                stats.errors += errors
+                return
+            except redis.WatchError:
+                logger.debug('keys modified during migration, retrying batch')
+                continue
+
+
+def _read_batch(source, target, raw, keys):
+    '''
+    Returns {key: (type, ttl, value serialized by ``target``)} of ``keys``, skipping missing keys, unsupported types
+    and values that can not be deserialized or serialized, and the numbers of skipped keys and errors.
+    '''
+    skipped = errors = 0
+    with raw.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.type(key)
+            pipe.pttl(key)
+        metadata = pipe.execute()
+
+        fetched_keys = []
+        for key, key_type, ttl in zip(keys, metadata[0::2], metadata[1::2]):
+            key_type = key_type.decode() if isinstance(key_type, bytes) else key_type
+            if key_type == 'string':
+                pipe.get(key)
+            elif key_type == 'hash':
+                pipe.hgetall(key)
+            elif key_type == 'list':
+                pipe.lrange(key, 0, -1)
+            elif key_type == 'set':
+                pipe.smembers(key)
+            elif key_type == 'zset':
+                pipe.zrange(key, 0, -1, withscores=True)
+            else:
+                if key_type != 'none':
+                    logger.warning('skipping key %r of unsupported type %s', key, key_type)
+                skipped += 1
+                continue
+            fetched_keys.append((key, key_type, ttl))
+        responses = pipe.execute()
+
+    values = {}
+    for (key, key_type, ttl), response in zip(fetched_keys, responses):
+        try:
+            value = _deserialize(source, key_type, response)
+        except Exception:
+            logger.exception('could not deserialize key %r', key)
+            errors += 1
+            continue
+        if value is _MISSING:
+            # deleted between TYPE and read
+            skipped += 1
+            continue
+        try:
+            # before MULTI, so that a value the target codec can not serialize only fails its key
+            value = _serialize(target, key_type, value)
+        except Exception:
+            logger.exception('could not serialize key %r', key)
+            errors += 1
+            continue
+        values[key] = (key_type, ttl, value)
+    return values, skipped, errors
+
+
+def _deserialize(source, key_type, response):
+    if key_type == 'string':
+        return _MISSING if response is None else source.deserialize(response)
+    if not response:
+        # redis has no empty collections
+        return _MISSING
+    if key_type == 'hash':
+        return dict(zip(response.keys(), source.deserialize_many(list(response.values()))))
+    if key_type in ('list', 'set'):
+        return source.deserialize_many(list(response))
+    # zset
+    return list(zip(source.deserialize_many([member for member, _ in response]), (score for _, score in response)))
+
+
+def _serialize(target, key_type, value):
+    if key_type == 'string':
+        return target.serialize(value)
+    if key_type == 'hash':
+        return list(zip(value.keys(), target.serialize_many(list(value.values()))))
+    if key_type in ('list', 'set'):
+        return target.serialize_many(value)
+    # zset, members may not be hashable
+    return list(zip(target.serialize_many([member for member, _ in value]), (score for _, score in value)))
+
+
+def _write(pipe, key, key_type, ttl, value):
+    "Writes ``value`` serialized by ``_serialize``"
+    pipe.delete(key)
+    if key_type == 'string':
+        pipe.execute_command('SET', key, value)
+    elif key_type == 'hash':
+        pipe.execute_command('HMSET', key, *itertools.chain.from_iterable(value))
+    elif key_type == 'list':
+        pipe.execute_command('RPUSH', key, *value)
+    elif key_type == 'set':
+        pipe.execute_command('SADD', key, *value)
+    else:
+        pipe.execute_command('ZADD', key, *itertools.chain.from_iterable(
+            (score, member) for member, score in value))
+    if ttl is not None and ttl > 0:
+        pipe.pexpire(key, ttl)
+
+
+def _client(codec, options, ext_types, **kwargs):
+    if codec == 'msgpack':
+        kwargs['ext_types'] = ext_types
+    return CODECS[codec](codec_tag=options.codec_tag or None, **kwargs)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Rewrites redis values from a codec to another.')
+    parser.add_argument('--url', default='redis://localhost:6379/0', help='source redis url')
+    parser.add_argument('--target-url', help='target redis url, defaults to source url')
+    parser.add_argument('--source-codec', choices=sorted(CODECS), required=True)
+    parser.add_argument('--target-codec', choices=sorted(CODECS), required=True)
+    parser.add_argument('--codec-tag', action='store_true',
+                        help='tag written values with their codec, source values may be tagged or not')
+    parser.add_argument('--ext-types', action='store_true',
+                        help='serialize tuples, sets, datetimes, decimals and uuids as msgpack extension types, '
+                             'see msgpack_codec.ExtTypes')
+    parser.add_argument('--match', help='only migrate keys matching pattern')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--rate', type=float, help='maximum number of keys per second')
+    parser.add_argument('--checkpoint', help='file storing the scan cursor to resume the migration')
+    options = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    source_pool = redis.ConnectionPool.from_url(options.url)
+    target_pool = redis.ConnectionPool.from_url(options.target_url) if options.target_url else source_pool
+    ext_types = None
+    if options.ext_types:
+        from .msgpack_codec import ExtTypes
+        ext_types = ExtTypes()
+    # with codec tags, source reads values already migrated to the target codec
+    source = _client(options.source_codec, options, ext_types, connection_pool=source_pool)
+    target = _client(options.target_codec, options, ext_types, connection_pool=target_pool)
+    checkpoint = FileCheckpoint(options.checkpoint) if options.checkpoint else None
+
+    stats = migrate(source, target, match=options.match, batch_size=options.batch_size, rate=options.rate,
+                    checkpoint=checkpoint)
+    logger.info('done: %r', stats)
+    return stats
+
+
+if __name__ == '__main__':
+    main()
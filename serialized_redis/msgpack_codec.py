@@ -0,0 +1,229 @@
+'''
+msgpack serialization used by ``MsgpackSerializedRedis``.
+
+``MsgpackCodec`` reuses a ``Packer`` and an ``Unpacker`` per thread instead of creating them for every value, and
+optionally round-trips python types msgpack has no type for (``tuple``, ``set``, ``datetime``, ``Decimal``...) as
+msgpack extension types, see ``ExtTypes``.
+'''
+import datetime
+import decimal
+import functools
+import threading
+import uuid
+
+import msgpack
+
+# ext type codes used by ``ExtTypes`` common types, codes from 0 to 15 are reserved
+TUPLE = 1
+SET = 2
+FROZENSET = 3
+DATETIME = 4
+DATE = 5
+TIMEDELTA = 6
+DECIMAL = 7
+UUID = 8
+
+_DATETIME_MIN = datetime.datetime.min
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _encode_set(value):
+    # sorted when possible so that equal sets are serialized the same way (set members, SISMEMBER...)
+    try:
+        return sorted(value)
+    except TypeError:
+        return list(value)
+
+
+def _encode_datetime(value):
+    # local time as microseconds since datetime.min, with the UTC offset in microseconds if aware
+    micros = (value.replace(tzinfo=None) - _DATETIME_MIN) // _MICROSECOND
+    offset = value.utcoffset()
+    if offset is None:
+        return micros
+    return [micros, offset // _MICROSECOND]
+
+
+def _decode_datetime(value):
+    if isinstance(value, int):
+        return _DATETIME_MIN + datetime.timedelta(microseconds=value)
+    micros, offset = value
+    tz = datetime.timezone(datetime.timedelta(microseconds=offset))
+    return (_DATETIME_MIN + datetime.timedelta(microseconds=micros)).replace(tzinfo=tz)
+
+
+def _encode_timedelta(value):
+    return value // _MICROSECOND
+
+
+def _decode_timedelta(value):
+    return datetime.timedelta(microseconds=value)
+
+
+class ExtTypes(object):
+    '''
+    Registry of python types serialized as msgpack extension types.
+
+    Unless ``common`` is False, ``tuple``, ``set``, ``frozenset``, ``datetime``, ``date``, ``timedelta``, ``Decimal``
+    and ``UUID`` are registered. Aware datetimes keep their UTC offset, not their time zone.
+
+    Other types are registered with ``register``. Values of subclasses of registered types are serialized as their
+    registered base type, values of other subclasses of msgpack types (e.g. ``IntEnum``, ``OrderedDict``) as their
+    msgpack type.
+    '''
+
+    def __init__(self, common=True):
+        # code -> (type, encode, decode)
+        self._codes = {}
+        # type -> (code, encode)
+        self._types = {}
+        if common:
+            self.register(TUPLE, tuple, list, tuple)
+            self.register(SET, set, _encode_set, set)
+            self.register(FROZENSET, frozenset, _encode_set, frozenset)
+            # before date, datetime being a subclass of date
+            self.register(DATETIME, datetime.datetime, _encode_datetime, _decode_datetime)
+            self.register(DATE, datetime.date, datetime.date.toordinal, datetime.date.fromordinal)
+            self.register(TIMEDELTA, datetime.timedelta, _encode_timedelta, _decode_timedelta)
+            self.register(DECIMAL, decimal.Decimal, str, decimal.Decimal)
+            self.register(UUID, uuid.UUID, _uuid_bytes, _uuid_from_bytes)
+
+    def register(self, code, cls, encode, decode):
+        '''
+        Serializes values of type ``cls`` as extension type ``code`` (0 to 127).
+
+        ``encode(value)`` returns a value msgpack can serialize (including registered types), ``decode`` builds the
+        value back from it. Functions must be picklable to deserialize in a ``ProcessPoolExecutor``.
+        '''
+        if not 0 <= code <= 127:
+            raise ValueError('msgpack ext type code must be from 0 to 127')
+        if code in self._codes:
+            raise ValueError('msgpack ext type code %d already registered for %r' % (code, self._codes[code][0]))
+        self._codes[code] = (cls, encode, decode)
+        self._types[cls] = (code, encode)
+
+    def default(self, value):
+        "``default`` hook of msgpack packers"
+        try:
+            code, encode = self._types[type(value)]
+        except KeyError:
+            return self._default_subclass(value)
+        return msgpack.ExtType(code, self.packb(encode(value)))
+
+    def _default_subclass(self, value):
+        for cls, (code, encode) in self._types.items():
+            if isinstance(value, cls):
+                return msgpack.ExtType(code, self.packb(encode(value)))
+        if isinstance(value, (list, tuple)):
+            return list(value)
+        for cls in (int, float, str, bytes, dict):
+            if isinstance(value, cls):
+                return cls(value)
+        raise TypeError('Can not serialize %r' % (value,))
+
+    def ext_hook(self, code, data):
+        "``ext_hook`` of msgpack unpackers"
+        try:
+            decode = self._codes[code][2]
+        except KeyError:
+            return msgpack.ExtType(code, data)
+        return decode(msgpack.unpackb(data, raw=False, ext_hook=self.ext_hook))
+
+    def packb(self, value):
+        # packers are not reentrant, nested values can't use the per thread packer
+        return msgpack.packb(value, default=self.default, strict_types=True)
+
+    def __repr__(self):
+        return 'ExtTypes(%s)' % ', '.join('%d=%s' % (code, cls.__name__) for code, (cls, _, _) in self._codes.items())
+
+
+def _uuid_bytes(value):
+    return value.bytes
+
+
+def _uuid_from_bytes(value):
+    return uuid.UUID(bytes=value)
+
+
+class MsgpackCodec(object):
+    '''
+    msgpack serialize and deserialize functions, reusing a ``Packer`` per thread. Single values are deserialized
+    with ``unpackb``, batches are streamed through an ``Unpacker``.
+
+    Values of ``ext_types`` registered types are serialized as msgpack extension types.
+    '''
+
+    def __init__(self, ext_types=None):
+        self.ext_types = ext_types
+        self._local = threading.local()
+        # unpackb keyword arguments, built once as loads is called for every value
+        self._unpackb_options = self._unpacker_options()
+
+    def __getstate__(self):
+        # thread locals can't be pickled, e.g. sent to a ProcessPoolExecutor
+        return {'ext_types': self.ext_types}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _packer_options(self):
+        if self.ext_types is None:
+            return {}
+        return {'default': self.ext_types.default, 'strict_types': True}
+
+    def _unpacker_options(self):
+        if self.ext_types is None:
+            return {'raw': False}
+        return {'raw': False, 'ext_hook': self.ext_types.ext_hook}
+
+    def _packer(self):
+        try:
+            return self._local.packer
+        except AttributeError:
+            packer = self._local.packer = msgpack.Packer(**self._packer_options())
+            return packer
+
+    def dumps(self, value):
+        return self._packer().pack(value)
+
+    def dumps_many(self, values):
+        return list(map(self._packer().pack, values))
+
+    def loads(self, data):
+        return msgpack.unpackb(data, **self._unpackb_options)
+
+    def loads_many(self, values):
+        "Deserializes ``values`` by streaming them through a single Unpacker"
+        if not values:
+            return []
+        data = b''.join(values)
+        unpacker = msgpack.Unpacker(max_buffer_size=max(len(data), 1), **self._unpacker_options())
+        unpacker.feed(data)
+        deserialized = []
+        end = 0
+        try:
+            for value in values:
+                end += len(value)
+                deserialized.append(unpacker.unpack())
+                # each object must end where its value does
+                if unpacker.tell() != end:
+                    break
+            else:
+                return deserialized
+        except Exception:
+            pass
+        # a value holding more or less than one msgpack object, unpackb raises the error
+        return [msgpack.unpackb(v, **self._unpackb_options) for v in values]
+
+    def __repr__(self):
+        return 'MsgpackCodec(ext_types=%r)' % (self.ext_types,)
+
+
+@functools.lru_cache(maxsize=128)
+def get_msgpack_codec(ext_types=None):
+    '''
+    Returns the ``MsgpackCodec`` of ``ext_types``, shared by clients so that they share compiled response callbacks.
+
+    Registries are compared by identity, clients should share one ``ExtTypes`` instead of creating their own.
+    '''
+    return MsgpackCodec(ext_types)
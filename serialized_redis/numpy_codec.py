@@ -0,0 +1,132 @@
+'''
+NumPy arrays serialization.
+
+Arrays are stored as a header holding their dtype and shape followed by their raw buffer, and are decoded with
+``numpy.frombuffer`` over the reply: decoded arrays are not copied, and are read only.
+
+Serialized arrays start with the ``codecs.NUMPY`` codec tag, so they can be told apart from values of other codecs:
+``numpy_serializers`` and ``numpy_deserializers`` add arrays support to another codec (``numpy_arrays=True`` option of
+clients), and clients using ``codec_tag`` read arrays written by any client.
+'''
+import functools
+import struct
+
+import numpy
+
+from .codecs import NUMPY, merge_many
+
+# header: tag, dtype length, dtype (e.g. '<f4'), number of dimensions, dimensions, padding to HEADER_ALIGNMENT
+_DTYPE_LENGTH = struct.Struct('<B')
+_NDIM = struct.Struct('<B')
+_DIMENSION = struct.Struct('<Q')
+
+# array data is aligned in serialized values, bytes objects data being aligned in memory
+HEADER_ALIGNMENT = 16
+
+
+def is_supported(value):
+    "Returns whether ``value`` is an array serialized by ``dumps``, arrays of objects or records are not"
+    return type(value) is numpy.ndarray and value.dtype.kind in 'biufcmMSU'
+
+
+def is_serialized_array(data):
+    "Returns whether ``data`` is an array serialized by ``dumps``"
+    return len(data) > 1 and data[:1] == NUMPY
+
+
+def dumps(array):
+    "Returns ``array`` header and data"
+    if not array.flags.c_contiguous:
+        array = array.copy(order='C')
+    dtype = array.dtype.str.encode()
+    parts = [NUMPY, _DTYPE_LENGTH.pack(len(dtype)), dtype, _NDIM.pack(array.ndim)]
+    parts.extend(_DIMENSION.pack(dimension) for dimension in array.shape)
+    length = sum(map(len, parts))
+    parts.append(b'\0' * (-length % HEADER_ALIGNMENT))
+    # flat bytes view of the data, not copied
+    parts.append(array.reshape(-1).view(numpy.uint8))
+    return b''.join(parts)
+
+
+def parse_header(data, offset=0):
+    "Returns dtype, shape and data offset of the array serialized in ``data`` from ``offset``"
+    start = offset
+    offset += len(NUMPY)
+    dtype_length, = _DTYPE_LENGTH.unpack_from(data, offset)
+    offset += _DTYPE_LENGTH.size
+    dtype = numpy.dtype(bytes(data[offset:offset + dtype_length]).decode())
+    offset += dtype_length
+    ndim, = _NDIM.unpack_from(data, offset)
+    offset += _NDIM.size
+    shape = tuple(_DIMENSION.unpack_from(data, offset + i * _DIMENSION.size)[0] for i in range(ndim))
+    offset += ndim * _DIMENSION.size
+    offset += -(offset - start) % HEADER_ALIGNMENT
+    return dtype, shape, offset
+
+
+def loads(data):
+    "Returns a read only array over ``data``"
+    dtype, shape, offset = parse_header(data)
+    if len(data) == offset:
+        # frombuffer does not accept empty buffers
+        return numpy.empty(shape, dtype)
+    return numpy.frombuffer(data, dtype=dtype, offset=offset).reshape(shape)
+
+
+def loads_untagged(data):
+    "Returns the array of ``data`` without its codec tag, used by clients with ``codec_tag``"
+    return loads(NUMPY + data)
+
+
+def stack(values, deserialize_fn=None, dtype=None):
+    '''
+    Returns serialized arrays ``values`` stacked in a new array, allocated once.
+
+    Values that are not serialized arrays (e.g. lists) are deserialized with ``deserialize_fn``. Arrays must have the
+    same shape.
+    '''
+    rows = [loads(value) if is_serialized_array(value) else numpy.asarray(deserialize_fn(value)) for value in values]
+    if not rows:
+        return numpy.empty((0,), dtype)
+    out = numpy.empty((len(rows),) + rows[0].shape, dtype or numpy.result_type(*rows))
+    return numpy.stack(rows, out=out)
+
+
+@functools.lru_cache(maxsize=128)
+def numpy_serializers(serialize_fn, serialize_many_fn=None):
+    '''
+    Returns ``serialize_fn`` and ``serialize_many_fn`` serializing arrays with ``dumps``.
+
+    ``serialize_many_fn`` is always returned, a generic one is created if not provided.
+    '''
+    def serialize(value):
+        if is_supported(value):
+            return dumps(value)
+        return serialize_fn(value)
+
+    def serialize_many(values):
+        arrays = {i: dumps(value) for i, value in enumerate(values) if is_supported(value)}
+        if not arrays:
+            return list(map(serialize_fn, values)) if serialize_many_fn is None else serialize_many_fn(values)
+        return merge_many(arrays, values, serialize_fn, serialize_many_fn)
+
+    return serialize, serialize_many
+
+
+@functools.lru_cache(maxsize=128)
+def numpy_deserializers(deserialize_fn, deserialize_many_fn=None):
+    '''
+    Returns ``deserialize_fn`` and ``deserialize_many_fn`` deserializing arrays with ``loads``.
+    '''
+    def deserialize(value):
+        if is_serialized_array(value):
+            return loads(value)
+        return deserialize_fn(value)
+
+    def deserialize_many(values):
+        arrays = {i: loads(value) for i, value in enumerate(values) if is_serialized_array(value)}
+        if not arrays:
+            return list(map(deserialize_fn, values)) if deserialize_many_fn is None else deserialize_many_fn(values)
+        return merge_many(arrays, values, deserialize_fn, deserialize_many_fn)
+
+    return deserialize, deserialize_many
@@ -0,0 +1,99 @@
+import asyncio
+import itertools
+import queue
+import threading
+
+
+class Offloader(object):
+    '''
+    Deserializes replies of at least ``threshold`` values in ``executor`` (a ``concurrent.futures.Executor``).
+
+    Replies are split in chunks of ``chunk_size`` values deserialized in parallel, a single chunk by default.
+    asyncio clients await the executor, so that large replies do not block the event loop. Sync clients wait for
+    the chunks, which only speeds deserialization up when there are several chunks, and with a
+    ``ProcessPoolExecutor`` for pure python deserializers.
+
+    Process pools require picklable deserialize functions, which compressed and tagged ones are not.
+    '''
+
+    def __init__(self, executor, threshold=10000, chunk_size=None):
+        self.executor = executor
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+
+    def chunks(self, values):
+        if self.chunk_size is None:
+            return [values]
+        return [values[i:i + self.chunk_size] for i in range(0, len(values), self.chunk_size)]
+
+    def deserialize_many(self, deserialize_many_fn, values):
+        "Returns ``deserialize_many_fn(values)``, deserializing chunks in parallel"
+        chunks = self.chunks(values)
+        if len(chunks) == 1:
+            return deserialize_many_fn(values)
+        return list(itertools.chain.from_iterable(self.executor.map(deserialize_many_fn, chunks)))
+
+    async def deserialize_many_async(self, deserialize_many_fn, values):
+        "Returns ``deserialize_many_fn(values)``, deserializing chunks in the executor"
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[loop.run_in_executor(self.executor, deserialize_many_fn, chunk)
+                                         for chunk in self.chunks(values)])
+        return list(itertools.chain.from_iterable(results))
+
+    def __repr__(self):
+        return '%s(executor=%r, threshold=%r, chunk_size=%r)' % (type(self).__name__, self.executor, self.threshold,
+                                                                 self.chunk_size)
+
+
+class _End(object):
+    "Marks the end of the items of a prefetched iterator, holding the error raised by the iterator if any"
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+def prefetch(iterator, size=2):
+    '''
+    Yields the items of ``iterator`` consumed by a worker thread, up to ``size`` items ahead.
+
+    The iterator is closed by the worker thread when it is exhausted or when the returned generator is closed.
+    '''
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_End(e))
+            return
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+        put(_End())
+
+    thread = threading.Thread(target=produce, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if isinstance(item, _End):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,224 @@
+'''
+Order preserving serialization of ``None``, ``bool``, ``int``, ``float``, ``bytes`` and ``str`` values.
+
+Serialized values compare bytewise (memcmp) in the same order as the values, so that Redis can sort and range them
+server side: ``SORT ... ALPHA``, ``SORT ... BY``, and lexicographical commands of sorted sets (``ZRANGEBYLEX``...).
+
+Values of different types are ordered by type: ``None`` < ``False`` < ``True`` < ints < floats < bytes < str. Ints
+and floats are ordered separately, so a key should hold one numeric type.
+
+Serialized values never hold a null byte, as ``SORT ... ALPHA`` compares values as C strings (with ``strcoll``, which
+is bytewise with the C locale Redis usually runs with). They start with the ``codecs.ORDERED`` codec tag, so they can
+be told apart from values of other codecs: ``ordered_serializers`` and ``ordered_deserializers`` serialize supported
+values in order and other values with another codec (``ordered=True`` option of clients).
+'''
+import functools
+import re
+import struct
+
+from .codecs import ORDERED, merge_many
+
+# type bytes, following the tag, giving the order of types
+NONE = b'\x20'
+FALSE = b'\x21'
+TRUE = b'\x22'
+INT = b'\x30'
+FLOAT = b'\x31'
+BYTES = b'\x40'
+STR = b'\x41'
+
+# ints are written in base 255 with digits from 1 to 255 (no null byte), after a length byte
+_BASE = 255
+_MAX_INT_DIGITS = 126
+_POSITIVE = 0x80
+_NEGATIVE = 0x7f
+
+# floats are written as 9 digits in base 255 of their 64 bits order preserving key
+_FLOAT_DIGITS = 9
+_DOUBLE = struct.Struct('>d')
+_UINT64 = struct.Struct('>Q')
+_SIGN_BIT = 1 << 63
+_UINT64_MASK = (1 << 64) - 1
+
+# bytes 0x00 and 0x01 are escaped as 0x01 0x01 and 0x01 0x02, which keeps order
+_ESCAPED = re.compile(b'\x01([\x01\x02])')
+
+
+def is_supported(value):
+    "Returns whether ``value`` is serialized in order"
+    return value is None or type(value) in _ENCODERS
+
+
+def dumps(value):
+    "Returns the order preserving serialization of ``value``"
+    if value is None:
+        return ORDERED + NONE
+    try:
+        encode = _ENCODERS[type(value)]
+    except KeyError:
+        raise TypeError('Order preserving serialization of %r is not supported' % (value,))
+    return ORDERED + encode(value)
+
+
+def loads(data):
+    "Returns the value serialized by ``dumps``"
+    return loads_untagged(data[1:])
+
+
+def loads_untagged(data):
+    "Returns the value serialized by ``dumps`` without its codec tag, used by clients with ``codec_tag``"
+    value_type = data[:1]
+    body = data[1:]
+    if value_type == STR:
+        return _unescape(body).decode('utf-8')
+    if value_type == INT:
+        return _decode_int(body)
+    if value_type == FLOAT:
+        return _decode_float(body)
+    if value_type == BYTES:
+        return _unescape(body)
+    if value_type == NONE:
+        return None
+    if value_type == FALSE:
+        return False
+    if value_type == TRUE:
+        return True
+    raise ValueError('Unknown order preserving type %r' % value_type)
+
+
+def is_serialized(data):
+    "Returns whether ``data`` is serialized by ``dumps``"
+    return len(data) > 1 and data[:1] == ORDERED
+
+
+def _digits(n, count=None):
+    "Returns the base 255 digits of ``n`` as bytes from 1 to 255, on ``count`` digits if provided"
+    digits = []
+    while n or (count is not None and len(digits) < count):
+        n, digit = divmod(n, _BASE)
+        digits.append(digit + 1)
+    digits.reverse()
+    return bytes(digits)
+
+
+def _from_digits(data):
+    n = 0
+    for digit in data:
+        n = n * _BASE + digit - 1
+    return n
+
+
+def _encode_bool(value):
+    return TRUE if value else FALSE
+
+
+def _encode_int(value):
+    if value >= 0:
+        digits = _digits(value)
+        length = _POSITIVE + len(digits)
+    else:
+        # complemented digits and length: larger magnitudes sort first
+        digits = bytes(_BASE + 1 - digit for digit in _digits(-value))
+        length = _NEGATIVE - len(digits)
+    if len(digits) > _MAX_INT_DIGITS:
+        raise ValueError('int too large for order preserving serialization')
+    return INT + bytes([length]) + digits
+
+
+def _decode_int(data):
+    if data[0] >= _POSITIVE:
+        return _from_digits(data[1:])
+    return -_from_digits(bytes(_BASE + 1 - digit for digit in data[1:]))
+
+
+def _encode_float(value):
+    bits, = _UINT64.unpack(_DOUBLE.pack(value))
+    # negative floats: all bits flipped, positive floats: sign bit set
+    key = bits ^ _UINT64_MASK if bits & _SIGN_BIT else bits | _SIGN_BIT
+    return FLOAT + _digits(key, _FLOAT_DIGITS)
+
+
+def _decode_float(data):
+    key = _from_digits(data)
+    bits = key ^ _SIGN_BIT if key & _SIGN_BIT else key ^ _UINT64_MASK
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+def _escape(data):
+    if b'\x00' not in data and b'\x01' not in data:
+        return data
+    return data.replace(b'\x01', b'\x01\x02').replace(b'\x00', b'\x01\x01')
+
+
+def _unescape(data):
+    if b'\x01' not in data:
+        return bytes(data)
+    return _ESCAPED.sub(lambda match: bytes([match.group(1)[0] - 1]), data)
+
+
+def _encode_bytes(value):
+    return BYTES + _escape(value)
+
+
+def _encode_str(value):
+    # UTF-8 preserves code points order
+    return STR + _escape(value.encode('utf-8'))
+
+
+_ENCODERS = {
+    bool: _encode_bool,
+    int: _encode_int,
+    float: _encode_float,
+    bytes: _encode_bytes,
+    str: _encode_str,
+}
+
+
+def lex_bound(serialize_fn, value, exclusive=False, default=b'-'):
+    '''
+    Returns the ``ZRANGEBYLEX`` bound of ``value`` serialized with ``serialize_fn``, ``default`` (``-`` or ``+``) if
+    ``value`` is None.
+    '''
+    if value is None:
+        return default
+    return (b'(' if exclusive else b'[') + serialize_fn(value)
+
+
+@functools.lru_cache(maxsize=128)
+def ordered_serializers(serialize_fn, serialize_many_fn=None):
+    '''
+    Returns ``serialize_fn`` and ``serialize_many_fn`` serializing supported values with ``dumps``.
+
+    ``serialize_many_fn`` is always returned, a generic one is created if not provided.
+    '''
+    def serialize(value):
+        if is_supported(value):
+            return dumps(value)
+        return serialize_fn(value)
+
+    def serialize_many(values):
+        ordered = {i: dumps(value) for i, value in enumerate(values) if is_supported(value)}
+        if len(ordered) == len(values):
+            return [ordered[i] for i in range(len(values))]
+        return merge_many(ordered, values, serialize_fn, serialize_many_fn)
+
+    return serialize, serialize_many
+
+
+@functools.lru_cache(maxsize=128)
+def ordered_deserializers(deserialize_fn, deserialize_many_fn=None):
+    '''
+    Returns ``deserialize_fn`` and ``deserialize_many_fn`` deserializing values serialized in order with ``loads``.
+    '''
+    def deserialize(value):
+        if is_serialized(value):
+            return loads(value)
+        return deserialize_fn(value)
+
+    def deserialize_many(values):
+        ordered = {i: loads(value) for i, value in enumerate(values) if is_serialized(value)}
+        if len(ordered) == len(values):
+            return [ordered[i] for i in range(len(values))]
+        return merge_many(ordered, values, deserialize_fn, deserialize_many_fn)
+
+    return deserialize, deserialize_many
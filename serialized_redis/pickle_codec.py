@@ -0,0 +1,159 @@
+'''
+pickle serialization used by ``PickleSerializedRedis``.
+
+With out-of-band buffers, large binary payloads (``bytes``, ``bytearray``, NumPy arrays...) are not copied in the
+pickle stream: values are stored as a header, the pickle stream and the raw buffers, and are rebuilt from views on
+the reply. Values without large buffers are plain pickles.
+'''
+import io
+import pickle
+import pickletools
+import struct
+
+# prefix of values holding out-of-band buffers, 0xff is not a pickle opcode so plain pickles never start with it
+OUT_OF_BAND_HEADER = b'\xffP5'
+
+_COUNT = struct.Struct('<I')
+_LENGTH = struct.Struct('<Q')
+
+
+# kinds of out-of-band buffers
+_BYTES = 0
+_BYTEARRAY = 1
+_BUFFER = 2
+
+
+def loads(data):
+    "Deserializes plain pickles and values holding out-of-band buffers"
+    if data[:3] != OUT_OF_BAND_HEADER:
+        return pickle.loads(data)
+    view = memoryview(data)
+    offset = len(OUT_OF_BAND_HEADER)
+    count, = _COUNT.unpack_from(view, offset)
+    offset += _COUNT.size
+    lengths = [_LENGTH.unpack_from(view, offset + i * _LENGTH.size)[0] for i in range(count)]
+    offset += count * _LENGTH.size
+    end = len(view) - sum(lengths)
+    buffers = []
+    position = end
+    for length in lengths:
+        buffers.append(view[position:position + length])
+        position += length
+    return _Unpickler(io.BytesIO(view[offset:end]), buffers).load()
+
+
+class _Pickler(pickle.Pickler):
+    '''
+    Pickler storing large buffers out of the pickle stream in ``buffers``.
+
+    Buffers are stored as persistent ids, as ``bytes`` and ``bytearray`` are always pickled in-band (buffer_callback
+    only applies to ``PickleBuffer``, used by NumPy arrays).
+    '''
+
+    def __init__(self, file, protocol, threshold):
+        super().__init__(file, protocol=protocol)
+        self.threshold = threshold
+        self.buffers = []
+        # id of serialized objects -> index of their buffer
+        self._indexes = {}
+
+    def persistent_id(self, obj):
+        obj_type = type(obj)
+        if obj_type is bytes:
+            kind = _BYTES
+        elif obj_type is bytearray:
+            kind = _BYTEARRAY
+        elif obj_type is pickle.PickleBuffer:
+            kind = _BUFFER
+        else:
+            return None
+        if kind != _BUFFER and len(obj) < self.threshold:
+            return None
+        index = self._indexes.get(id(obj))
+        if index is not None:
+            # same object referenced more than once
+            return index, kind
+        try:
+            buffer = memoryview(obj).cast('B')
+        except TypeError:
+            # not contiguous
+            return None
+        if buffer.nbytes < self.threshold:
+            return None
+        index = self._indexes[id(obj)] = len(self.buffers)
+        self.buffers.append(buffer)
+        return index, kind
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, buffers):
+        super().__init__(file)
+        self.buffers = buffers
+        # index -> object, so that objects referenced more than once are rebuilt once
+        self._objects = {}
+
+    def persistent_load(self, pid):
+        index, kind = pid
+        try:
+            return self._objects[index]
+        except KeyError:
+            pass
+        buffer = self.buffers[index]
+        if kind == _BYTES:
+            obj = bytes(buffer)
+        elif kind == _BYTEARRAY:
+            obj = bytearray(buffer)
+        else:
+            obj = buffer
+        self._objects[index] = obj
+        return obj
+
+
+class PickleCodec(object):
+    '''
+    Serializes values with pickle ``protocol`` (pickle default protocol if None), see ``PickleSerializedRedis``.
+
+    With ``out_of_band``, ``bytes``, ``bytearray`` and pickle protocol 5 buffers (e.g. of NumPy arrays) of at least
+    ``threshold`` bytes are serialized out of the pickle stream: they are copied once in the serialized value,
+    and rebuilt from views of the reply. NumPy arrays are not copied but are read only.
+
+    With ``optimize``, pickles are optimized with ``pickletools.optimize``, making them smaller and faster to
+    deserialize for a higher serialization cost, e.g. for small values read often.
+    '''
+
+    def __init__(self, protocol=None, out_of_band=False, threshold=4096, optimize=False):
+        if out_of_band:
+            # NumPy arrays only expose their buffer with protocol 5
+            if protocol is None:
+                protocol = 5
+            elif protocol < 5:
+                raise ValueError('Out-of-band buffers require pickle protocol 5')
+        self.protocol = protocol
+        self.out_of_band = out_of_band
+        self.threshold = threshold
+        self.optimize = optimize
+
+    def dumps(self, value):
+        if not self.out_of_band:
+            data = pickle.dumps(value, protocol=self.protocol)
+            return pickletools.optimize(data) if self.optimize else data
+
+        output = io.BytesIO()
+        pickler = _Pickler(output, self.protocol, self.threshold)
+        pickler.dump(value)
+        data = output.getvalue()
+        buffers = pickler.buffers
+        if self.optimize:
+            data = pickletools.optimize(data)
+        if not buffers:
+            return data
+        return b''.join([OUT_OF_BAND_HEADER, _COUNT.pack(len(buffers))]
+                        + [_LENGTH.pack(buffer.nbytes) for buffer in buffers] + [data] + buffers)
+
+    loads = staticmethod(loads)
+
+    def __repr__(self):
+        return 'PickleCodec(protocol=%r, out_of_band=%r, threshold=%r, optimize=%r)' % (
+            self.protocol, self.out_of_band, self.threshold, self.optimize)
+
@@ -0,0 +1,113 @@
+'''
+Lua scripts serializing their arguments and deserializing their replies, see ``SerializedRedis.register_script``.
+
+Arguments at the ``values`` positions of ``ARGV`` are serialized by the client running the script, and the reply
+is parsed according to its ``reply`` shape:
+
+* None: returned as is (default)
+* ``'value'``: a single value
+* ``'list'``: a list of values
+* ``'hash'``: a flat list of fields and values (as ``HGETALL``), returned as a dict
+* ``'zset'``: a flat list of members and scores (as ``ZRANGE ... WITHSCORES``), returned as a list of
+  (member, score) tuples
+* a callable, called with the client and the raw reply
+
+Integers (Lua numbers) and nil / false (None) are returned as is, where values or lists are expected.
+'''
+
+REPLY_SHAPES = ('value', 'list', 'hash', 'zset')
+
+
+def deserialize_value(client, value):
+    if value is None or isinstance(value, int):
+        return value
+    return client.deserialize(value)
+
+
+def deserialize_values(client, values):
+    if any(isinstance(value, int) for value in values):
+        return [deserialize_value(client, value) for value in values]
+    return client.deserialize_many(values)
+
+
+def parse_value(client, response):
+    return deserialize_value(client, response)
+
+
+def parse_list(client, response):
+    if response is None:
+        return None
+    return deserialize_values(client, response)
+
+
+def parse_hash(client, response):
+    if response is None:
+        return None
+    return dict(zip(client.decode(response[0::2]), deserialize_values(client, response[1::2])))
+
+
+def parse_zset(client, response):
+    if response is None:
+        return None
+    return list(zip(deserialize_values(client, response[0::2]), map(float, response[1::2])))
+
+
+_PARSERS = {
+    'value': parse_value,
+    'list': parse_list,
+    'hash': parse_hash,
+    'zset': parse_zset,
+}
+
+
+class SerializedScript(object):
+    '''
+    Lua script run with ``EVALSHA`` by ``registered_client`` (or the client or pipeline given when called), serializing
+    ``ARGV`` values at ``values`` positions (indexes of ``args``, or True for all args) and parsing the reply
+    according to ``reply`` (see ``scripts``).
+
+    The script is loaded on first use, and loaded again if the server does not know it (e.g. after a restart or a
+    ``SCRIPT FLUSH``), pipelines loading their scripts before executing.
+    '''
+
+    def __init__(self, registered_client, script, values=(), reply=None):
+        if reply is not None and not callable(reply) and reply not in _PARSERS:
+            raise ValueError('Unknown reply shape %r, expected one of %s or a callable'
+                             % (reply, ', '.join(REPLY_SHAPES)))
+        self.registered_client = registered_client
+        # redis-py Script, caching the sha of the script
+        self.redis_script = registered_client.register_script(script)
+        self.values = values if values is True else frozenset(values)
+        self.reply = reply
+        self._parse = _PARSERS.get(reply, reply)
+
+    @property
+    def sha(self):
+        return self.redis_script.sha
+
+    def serialize_args(self, client, args):
+        "Returns ``args`` with values at ``values`` positions serialized by ``client``"
+        args = list(args)
+        if self.values is True:
+            return client.serialize_many(args)
+        positions = [i for i in range(len(args)) if i in self.values or i - len(args) in self.values]
+        for position, value in zip(positions, client.serialize_many([args[i] for i in positions])):
+            args[position] = value
+        return args
+
+    def __call__(self, keys=(), args=(), client=None):
+        "Runs the script on ``client`` (``registered_client`` by default), e.g. a pipeline"
+        if client is None:
+            client = self.registered_client
+        parse_reply = None
+        if self._parse is not None:
+            parse = self._parse
+
+            def parse_reply(response):
+                return parse(client, response)
+
+        return client.run_script(self.redis_script, keys, self.serialize_args(client, args), parse_reply=parse_reply)
+
+    def __repr__(self):
+        return 'SerializedScript(sha=%r, values=%r, reply=%r)' % (
+            self.sha, True if self.values is True else sorted(self.values), self.reply)
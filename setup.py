@@ -66,6 +66,7 @@ setup(
     install_requires=['redis>3'],
     extras_require={
         'msgpack': ['msgpack'],
+        'numpy': ['numpy'],
     },
     tests_require=[
         'mock',
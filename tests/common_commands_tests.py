@@ -18,6 +18,29 @@ class TestRedisCommands(object):
         del r['a']
         assert r.get('a') is None
 
+    def test_response_callbacks_shared_between_instances(self, r):
+        other = type(r)(connection_pool=r.connection_pool)
+        for command in ('GET', 'HGETALL', 'ZRANGE', 'SMEMBERS', 'GEORADIUS'):
+            assert other.response_callbacks[command] is r.response_callbacks[command]
+
+    def test_serialize_many(self, r):
+        values = [1, 'a', {'b': [1, 2]}, None]
+        assert r.serialize_many(values) == [r.serialize(v) for v in values]
+        serialized = r.serialize_many(values)
+        assert r.deserialize_many(serialized) == values
+        assert r.deserialize_many([None] + serialized) == [None] + values
+
+    def test_multi_values_commands_batch(self, r):
+        values = [{'i': i} for i in range(1000)]
+        r.rpush('l', *values)
+        assert r.lrange('l', 0, -1) == values
+        r.hmset('h', {str(i): v for i, v in enumerate(values)})
+        assert r.hgetall('h') == {str(i): v for i, v in enumerate(values)}
+        r.mset({'k%d' % i: v for i, v in enumerate(values)})
+        assert r.mget(['k%d' % i for i in range(1000)] + ['missing']) == values + [None]
+        r.zadd('z', {str(i): i for i in range(1000)})
+        assert r.zrange('z', 0, -1, withscores=True) == [(str(i), float(i)) for i in range(1000)]
+
     def test_smart_get_and_set(self, r):
         # get and set can't be tested independently of each other
         assert r.smart_get('a') is None
@@ -45,6 +68,81 @@ class TestRedisCommands(object):
         assert r.smart_get('a') == d
         assert r.type('a') == 'hash'
 
+    def test_smart_get_many(self, r):
+        r.smart_set('s', 'str')
+        r.smart_set('l', [1, '2', {'3': 3}])
+        r.smart_set('set', {1, '2'})
+        r.smart_set('h', {'a': 1, 'b': [2]})
+        r.zadd('z', {'m1': 1, 'm2': 2})
+        assert r.smart_get_many(['s', 'l', 'missing', 'set', 'h', 'z']) == [
+            'str', [1, '2', {'3': 3}], None, {1, '2'}, {'a': 1, 'b': [2]}, ['m1', 'm2']]
+        assert r.smart_get_many([]) == []
+
+    def test_smart_set_diff(self, r):
+        commands = []
+        pipeline = r.pipeline
+
+        def recording_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            def recording_execute(*args, **kwargs):
+                commands.extend(command_args[0] for command_args, _ in pipe.command_stack)
+                return execute(*args, **kwargs)
+
+            pipe.execute = recording_execute
+            return pipe
+
+        r.pipeline = recording_pipeline
+
+        def smart_set_diff(name, value, previous=None):
+            del commands[:]
+            r.smart_set(name, value, diff=True, previous=previous)
+            assert r.smart_get(name) == value
+            return [command for command in commands if command not in ('MULTI', 'EXEC')]
+
+        r.smart_set('h', {'a': 1, 'b': 2, 'c': [3]})
+        assert smart_set_diff('h', {'a': 1, 'b': 20, 'c': [3], 'd': 4}) == ['HMSET']
+        assert smart_set_diff('h', {'a': 1, 'b': 20}) == ['HDEL']
+        assert smart_set_diff('h', {'a': 1, 'b': 20}) == []
+        assert smart_set_diff('h', {'a': 2}, previous={'a': 1, 'b': 20}) == ['HDEL', 'HMSET']
+
+        r.smart_set('s', {1, '2', 3})
+        assert smart_set_diff('s', {'2', 3, 4}) == ['SREM', 'SADD']
+
+        r.smart_set('l', [1, '2'])
+        assert smart_set_diff('l', [1, '2', {'3': 3}, 4]) == ['RPUSH']
+        assert smart_set_diff('l', [1]) == ['LTRIM']
+        assert smart_set_diff('l', [5, 1]) == ['DEL', 'RPUSH']
+        assert smart_set_diff('l', [5, 1, 6], previous=[5, 1]) == ['RPUSH']
+
+        r.smart_set('str', 'a')
+        assert smart_set_diff('str', 'a') == []
+        assert smart_set_diff('str', {'b': 1}) == ['DEL', 'HMSET']
+        assert smart_set_diff('missing', [1]) == ['DEL', 'RPUSH']
+
+    def test_smart_set_and_get_chunks(self, r):
+        l = [{'i': i} for i in range(35)]
+        s = set(range(35))
+        d = {'f%d' % i: [i] for i in range(35)}
+        for name, value in (('l', l), ('s', s), ('d', d), ('str', 'str')):
+            r.smart_set(name, value, chunk_size=10)
+            assert r.smart_get(name) == value
+            assert r.smart_get(name, chunk_size=10) == value
+        assert sorted(r.keys()) == ['d', 'l', 's', 'str']
+        assert list(r.smart_iter('l', chunk_size=10)) == l
+        assert dict(r.smart_iter('d', chunk_size=10)) == d
+        assert list(r.smart_iter('str')) == ['str']
+        assert list(r.smart_iter('missing')) == []
+        assert r.smart_get('missing', chunk_size=10) is None
+        r.zadd('z', {'m%d' % i: i for i in range(25)})
+        assert r.smart_get('z', chunk_size=10) == ['m%d' % i for i in range(25)]
+
+        r.smart_set('l', [], chunk_size=10)
+        assert not r.exists('l')
+        with pytest.raises(ValueError):
+            r.smart_set('l', l, diff=True, chunk_size=10)
+
     def test_get_and_set(self, r):
         # get and set can't be tested independently of each other
         assert r.get('a') is None
@@ -452,6 +550,37 @@ class TestRedisCommands(object):
         pairs = list(r.zscan_iter('a', match='a'))
         assert set(pairs) == set([('a', 1)])
 
+    @skip_if_server_version_lt('2.8.0')
+    def test_scan_iter_pages(self, r):
+        r.mset({'k%d' % i: i for i in range(100)})
+        # large enough not to be stored compactly, which are returned in one page
+        r.sadd('s', *('m%d' % i for i in range(200)))
+        r.hmset('h', {'f%d' % i: [i] for i in range(100)})
+        r.zadd('z', {'m%d' % i: i for i in range(100)})
+        for worker in (False, True):
+            keys = list(r.scan_iter(match='k*', count=10, worker=worker))
+            assert sorted(keys) == sorted('k%d' % i for i in range(100))
+            pages = list(r.sscan_iter('s', count=10, batch=True, worker=worker))
+            assert len(pages) > 1
+            assert set().union(*pages) == set('m%d' % i for i in range(200))
+            assert set(r.sscan_iter('s', match='m5', worker=worker)) == {'m5'}
+            assert dict(r.hscan_iter('h', count=10, worker=worker)) == {'f%d' % i: [i] for i in range(100)}
+            pages = list(r.hscan_iter('h', count=10, batch=True, worker=worker))
+            assert all(isinstance(page, dict) for page in pages)
+            pairs = list(r.zscan_iter('z', count=10, score_cast_func=int, worker=worker))
+            assert sorted(pairs, key=lambda pair: pair[1]) == [('m%d' % i, i) for i in range(100)]
+
+    @skip_if_server_version_lt('2.8.0')
+    def test_scan_iter_closed_early(self, r):
+        r.sadd('s', *range(100))
+        for worker in (False, True):
+            members = r.sscan_iter('s', count=10, worker=worker)
+            next(members)
+            members.close()
+            # prefetched page is not left on a pooled connection
+            assert r.scard('s') == 100
+            assert r.smembers('s') == set(range(100))
+
     # SET COMMANDS
     def test_sadd(self, r):
         members = set([1, '2', '3'])
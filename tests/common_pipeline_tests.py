@@ -221,3 +221,14 @@ class TestPipeline(object):
             assert str(ex.value).startswith(expected)
 
         assert r[key] == 1
+
+    def test_pipeline_class_is_cached(self, r):
+        with r.pipeline() as pipe1, r.pipeline() as pipe2:
+            assert type(pipe1) is type(pipe2)
+            assert isinstance(pipe1, type(r))
+            assert pipe1.serialize_fn is r.serialize_fn
+
+    def test_pipeline_reuse_after_execute(self, r):
+        with r.pipeline() as pipe:
+            assert pipe.set('a', {'b': 1}).get('a').execute() == [True, {'b': 1}]
+            assert pipe.set('a', [1, 2]).get('a').execute() == [True, [1, 2]]
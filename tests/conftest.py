@@ -3,8 +3,13 @@ from unittest.mock import Mock
 import pytest
 import redis
 
+from serialized_redis import JSONSerializedRedis, PickleSerializedRedis, MsgpackSerializedRedis
+
 _REDIS_VERSIONS = {}
 
+# value all serializers round trip
+VALUE = {'a': [1, 2, 'three'], 'b': 'c'}
+
 
 def get_version(**kwargs):
     params = {'host': 'localhost', 'port': 6379, 'db': 9}
@@ -32,6 +37,16 @@ def _get_client(cls, request=None, **kwargs):
     return client
 
 
+@pytest.fixture(params=[JSONSerializedRedis, PickleSerializedRedis, MsgpackSerializedRedis])
+def client_class(request):
+    return request.param
+
+
+def get_raw(key):
+    "Returns the value of ``key`` as stored, in the test database"
+    return redis.Redis(host='localhost', port=6379, db=9).get(key)
+
+
 def skip_if_server_version_lt(min_version):
     check = StrictVersion(get_version()) < StrictVersion(min_version)
     return pytest.mark.skipif(check, reason="")
@@ -0,0 +1,138 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('redis.asyncio')
+
+from serialized_redis import ZlibCompressor, Offloader
+from serialized_redis.asyncio import (AsyncJSONSerializedRedis, AsyncPickleSerializedRedis,
+                                      AsyncMsgpackSerializedRedis)
+
+from .conftest import VALUE
+
+
+@pytest.fixture(params=[AsyncJSONSerializedRedis, AsyncPickleSerializedRedis, AsyncMsgpackSerializedRedis])
+def client_class(request):
+    return request.param
+
+
+def run(client_class, test, **kwargs):
+    "Runs coroutine function ``test`` with a client on a flushed db"
+    async def main():
+        r = client_class(host='localhost', port=6379, db=9, **kwargs)
+        await r.flushdb()
+        try:
+            await test(r)
+        finally:
+            await r.connection_pool.disconnect()
+    asyncio.run(main())
+
+
+class TestAsyncSerializedRedis(object):
+
+    def test_get_set(self, client_class):
+        async def test(r):
+            assert await r.get('a') is None
+            assert await r.set('a', VALUE)
+            assert await r.get('a') == VALUE
+            await r.mset({'b': 1, 'c': [1, 2]})
+            assert await r.mget('a', 'b', 'c', 'd') == [VALUE, 1, [1, 2], None]
+        run(client_class, test)
+
+    def test_collections(self, client_class):
+        async def test(r):
+            await r.rpush('l', 1, VALUE, 'x')
+            assert await r.lrange('l', 0, -1) == [1, VALUE, 'x']
+            assert await r.rpop('l') == 'x'
+            await r.sadd('s', 1, 'two')
+            assert await r.smembers('s') == {1, 'two'}
+            assert sorted(await r.smembers_as_list('s'), key=str) == [1, 'two']
+            await r.hmset('h', {'f1': VALUE, 'f2': 2})
+            assert await r.hgetall('h') == {'f1': VALUE, 'f2': 2}
+            await r.zadd('z', {'a1': 1, 'a2': 2})
+            assert await r.zrange('z', 0, -1, withscores=True) == [('a1', 1.0), ('a2', 2.0)]
+        run(client_class, test)
+
+    def test_pipeline(self, client_class):
+        async def test(r):
+            async with r.pipeline() as pipe:
+                pipe.set('a', VALUE).get('a').sadd('s', 1).smembers('s').rpush('l', 1, 2).rpop('l')
+                assert await pipe.execute() == [True, VALUE, 1, {1}, 2, 2]
+                # reusable once executed
+                assert await pipe.get('a').execute() == [VALUE]
+        run(client_class, test)
+
+    def test_smart_get_set(self, client_class):
+        async def test(r):
+            for i, value in enumerate(['a', [1, 'b'], {1, 'b'}, {'f': VALUE}]):
+                await r.smart_set(i, value)
+                assert await r.smart_get(i) == value
+            assert await r.smart_get('missing') is None
+            assert await r.smart_get_many([0, 'missing', 1]) == ['a', None, [1, 'b']]
+            await r.smart_set(3, {'f': 1, 'g': 2}, diff=True)
+            assert await r.smart_get(3) == {'f': 1, 'g': 2}
+            await r.smart_set(1, [1, 'b', 'c'], diff=True, previous=[1, 'b'])
+            assert await r.smart_get(1) == [1, 'b', 'c']
+        run(client_class, test)
+
+    def test_incr(self, client_class):
+        async def test(r):
+            assert await r.incr('a') == 1
+            assert await r.incrbyfloat('a', 1.5) == 2.5
+            await r.script_flush()
+            assert await r.incrbyfloat('a', -0.5) == 2.0
+            async with r.pipeline() as pipe:
+                pipe.incrby('b', 3).decr('b').incrbyfloat('b', 0.25).get('b')
+                assert await pipe.execute() == [3, 2, 2.25, 2.25]
+        run(client_class, test)
+
+    def test_serialized_script(self, client_class):
+        async def test(r):
+            script = r.register_script("redis.call('SET', KEYS[1], ARGV[1]) return {ARGV[1], ARGV[2]}",
+                                       values=[0, 1], reply='list')
+            assert await script(['a'], [VALUE, 1]) == [VALUE, 1]
+            await r.script_flush()
+            assert await script(['a'], ['b', None]) == ['b', None]
+            async with r.pipeline() as pipe:
+                script(['c'], [1, 2], client=pipe)
+                pipe.get('c')
+                assert await pipe.execute() == [[1, 2], 1]
+        run(client_class, test)
+
+    def test_pubsub(self, client_class):
+        async def test(r):
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe('channel')
+            await r.publish('channel', VALUE)
+            message = None
+            for _ in range(10):
+                message = await pubsub.get_message(timeout=1)
+                if message is not None:
+                    break
+            assert message['channel'] == 'channel'
+            assert message['data'] == VALUE
+            await pubsub.close()
+        run(client_class, test)
+
+    def test_compression(self, client_class):
+        async def test(r):
+            value = ['x' * 100] * 100
+            await r.set('a', value)
+            assert await r.get('a') == value
+            assert await r.strlen('a') < 500
+        run(client_class, test, compressor=ZlibCompressor(threshold=64))
+
+    def test_offloaded_deserialization(self, client_class):
+        async def test(r):
+            values = [{'i': i} for i in range(10)]
+            await r.rpush('l', *values)
+            await r.hmset('h', {str(i): value for i, value in enumerate(values)})
+            await r.zadd('z', {'m%d' % i: i for i in range(10)})
+            assert await r.lrange('l', 0, -1) == values
+            assert await r.hgetall('h') == {str(i): value for i, value in enumerate(values)}
+            assert await r.zrange('z', 0, -1, withscores=True) == [('m%d' % i, float(i)) for i in range(10)]
+            async with r.pipeline() as pipe:
+                assert await pipe.lrange('l', 0, -1).lrange('l', 0, 1).execute() == [values, values[:2]]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            run(client_class, test, offloader=Offloader(executor, threshold=5, chunk_size=3))
@@ -0,0 +1,58 @@
+import pytest
+
+from serialized_redis import BULK_CHUNKS_PER_PIPELINE
+
+from .conftest import _get_client
+
+
+class TestBulkLoad(object):
+
+    def test_zadd_bulk(self, client_class, request):
+        r = _get_client(client_class, request)
+        members = [{'id': i} for i in range(100)]
+        reports = []
+        stats = r.zadd_bulk('z', members, range(100), chunk_size=3, progress=lambda stats: reports.append(stats.items))
+        assert stats.items == stats.added == 100
+        assert stats.chunks == 34
+        assert stats.round_trips == 3
+        assert reports == [3 * BULK_CHUNKS_PER_PIPELINE, 6 * BULK_CHUNKS_PER_PIPELINE, 100]
+        assert stats.throughput > 0
+        assert r.zrange('z', 0, -1, withscores=True) == [({'id': i}, float(i)) for i in range(100)]
+        # updated scores are not added
+        stats = r.zadd_bulk('z', members[:10], [-1] * 10)
+        assert (stats.items, stats.added, stats.round_trips) == (10, 0, 1)
+        assert r.zscore('z', {'id': 0}) == -1
+
+    def test_zadd_bulk_iterables(self, client_class, request):
+        r = _get_client(client_class, request)
+        stats = r.zadd_bulk('z', ('m%d' % i for i in range(10)), iter(range(10)), chunk_size=4)
+        assert stats.added == 10
+        assert r.zcard('z') == 10
+        assert r.zadd_bulk('empty', [], []).round_trips == 0
+        with pytest.raises(ValueError):
+            r.zadd_bulk('z', ['a', 'b'], [1])
+        with pytest.raises(ValueError):
+            r.zadd_bulk('z', ('m%d' % i for i in range(5)), range(4), chunk_size=2)
+
+    def test_numpy_columns(self, client_class, request):
+        numpy = pytest.importorskip('numpy')
+        r = _get_client(client_class, request)
+        stats = r.zadd_bulk('z', numpy.arange(1000), numpy.linspace(0, 1, 1000), chunk_size=100)
+        assert stats.added == 1000
+        assert r.zrange('z', 0, 1) == [0, 1]
+        assert r.zscore('z', 999) == 1.0
+        lons = numpy.array([13.361389, 15.087269])
+        lats = numpy.array([38.115556, 37.502669])
+        assert r.geoadd_bulk('g', lons, lats, numpy.array(['Palermo', 'Catania'])).added == 2
+        assert r.geodist('g', 'Palermo', 'Catania') == 166274.1516
+
+    def test_geoadd_bulk(self, client_class, request):
+        r = _get_client(client_class, request)
+        members = [('place', i) for i in range(20)]
+        stats = r.geoadd_bulk('g', [10 + i / 100 for i in range(20)], [20] * 20, members, chunk_size=7)
+        assert (stats.items, stats.added, stats.chunks) == (20, 20, 3)
+        lon, lat = r.geopos('g', members[5])[0]
+        assert round(lon, 4) == 10.05
+        assert round(lat, 4) == 20
+        with pytest.raises(ValueError):
+            r.geoadd_bulk('g', [1, 2], [1], ['a', 'b'])
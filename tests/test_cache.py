@@ -0,0 +1,138 @@
+import time
+
+from serialized_redis import NearCache
+
+from .conftest import VALUE, _get_client
+
+
+def get_cached_client(client_class, request, **kwargs):
+    cache = NearCache(**kwargs)
+    other = _get_client(client_class, request)
+    other.config_set('notify-keyspace-events', 'KA')
+    r = client_class(db=9, near_cache=cache)
+    request.addfinalizer(cache.close)
+    wait_for(lambda: cache.listening)
+    return r, other
+
+
+def wait_for_notifications(r, count):
+    "Waits for ``count`` notifications of writes, so that they do not invalidate values fetched later"
+    wait_for(lambda: r.near_cache.notifications >= count)
+
+
+def wait_for(condition, timeout=2):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+class TestNearCache(object):
+
+    def test_cached_reads(self, client_class, request):
+        r, other = get_cached_client(client_class, request)
+        other.set('a', VALUE)
+        other.hmset('h', {'f1': VALUE, 'f2': 2})
+        wait_for_notifications(r, 2)
+
+        assert r.get('a') == VALUE
+        assert r.get('a') == VALUE
+        assert r.hgetall('h') == {'f1': VALUE, 'f2': 2}
+        assert r.hgetall('h') == {'f1': VALUE, 'f2': 2}
+        assert r.get('missing') is None
+        assert (r.near_cache.hits, r.near_cache.misses) == (2, 3)
+        assert len(r.near_cache) == 3 and r.near_cache.size > 0
+        # pipelines are not cached
+        with r.pipeline() as pipe:
+            assert pipe.get('a').hgetall('h').execute() == [VALUE, {'f1': VALUE, 'f2': 2}]
+        assert r.near_cache.hits == 2
+
+    def test_invalidated_by_own_writes(self, client_class, request):
+        r, other = get_cached_client(client_class, request)
+        r.set('a', 1)
+        assert r.get('a') == 1
+        r.set('a', 2)
+        assert r.get('a') == 2
+        r.mset({'a': 3, 'b': 4})
+        assert r.get('a') == 3
+        r.hset('h', 'f', 1)
+        assert r.hgetall('h') == {'f': 1}
+        r.hset('h', 'f', 2)
+        assert r.hgetall('h') == {'f': 2}
+        r.delete('a', 'h')
+        assert r.get('a') is None
+        assert r.hgetall('h') == {}
+        assert r.near_cache.hits == 0
+
+    def test_invalidated_by_pipeline_writes(self, client_class, request):
+        r, other = get_cached_client(client_class, request)
+        r.set('a', 1)
+        r.hset('h', 'f', 1)
+        assert r.get('a') == 1
+        assert r.hgetall('h') == {'f': 1}
+        with r.pipeline() as pipe:
+            pipe.set('a', 2).hset('h', 'f', 2)
+            # queued commands are not cached
+            assert pipe.get('a') is pipe
+            assert pipe.execute() == [True, 0, 2]
+        assert r.get('a') == 2
+        assert r.hgetall('h') == {'f': 2}
+        r.smart_set('h', {'f': 3, 'g': 4})
+        assert r.hgetall('h') == {'f': 3, 'g': 4}
+        with r.pipeline() as pipe:
+            pipe.watch('a')
+            pipe.set('a', 3)
+        assert r.get('a') == 3
+        assert r.near_cache.hits == 0
+
+    def test_invalidated_by_script_writes(self, client_class, request):
+        r, other = get_cached_client(client_class, request)
+        r.set('a', 1)
+        assert r.get('a') == 1
+        script = r.register_script("redis.call('SET', KEYS[1], ARGV[1])", values=[0])
+        script(['a'], [2])
+        assert r.get('a') == 2
+        r.eval("redis.call('DEL', KEYS[1])", 1, 'a')
+        assert r.get('a') is None
+        assert r.near_cache.hits == 0
+
+    def test_invalidated_by_notifications(self, client_class, request):
+        r, other = get_cached_client(client_class, request)
+        other.set('a', 1)
+        other.hset('h', 'f', 1)
+        wait_for_notifications(r, 2)
+        assert r.get('a') == 1
+        assert r.hgetall('h') == {'f': 1}
+        other.set('a', 2)
+        other.hset('h', 'f', 2)
+        wait_for_notifications(r, 4)
+        assert len(r.near_cache) == 0
+        assert r.get('a') == 2
+        assert r.hgetall('h') == {'f': 2}
+        assert r.near_cache.invalidations == 2
+
+    def test_eviction(self, client_class, request):
+        r, other = get_cached_client(client_class, request, max_bytes=100, max_entries=3)
+        for i in range(5):
+            other.set(i, i)
+        wait_for_notifications(r, 5)
+        for i in range(5):
+            assert r.get(i) == i
+        assert len(r.near_cache) == 3
+        assert r.near_cache.evictions == 2
+        assert r.get(4) == 4
+        assert r.near_cache.hits == 1
+        other.set('large', 'x' * 200)
+        wait_for_notifications(r, 6)
+        assert r.get('large') == 'x' * 200
+        assert len(r.near_cache) == 3
+
+    def test_ttl(self, client_class, request):
+        r, other = get_cached_client(client_class, request, ttl=0.05)
+        other.set('a', 1)
+        wait_for_notifications(r, 1)
+        assert r.get('a') == 1
+        assert r.get('a') == 1
+        time.sleep(0.1)
+        assert r.get('a') == 1
+        assert (r.near_cache.hits, r.near_cache.misses) == (1, 2)
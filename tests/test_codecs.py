@@ -0,0 +1,58 @@
+import pickle
+
+import pytest
+
+from serialized_redis import JSONSerializedRedis, PickleSerializedRedis, MsgpackSerializedRedis, codecs
+
+from .conftest import VALUE, _get_client, get_raw
+
+
+class TestCodecTag(object):
+
+    def test_values_are_tagged(self, client_class, request):
+        r = _get_client(client_class, request, codec_tag=True)
+        r.set('a', VALUE)
+        assert get_raw('a')[:1] == client_class.CODEC_TAG
+        assert r.get('a') == VALUE
+        r.rpush('l', 1, VALUE)
+        assert r.lrange('l', 0, -1) == [1, VALUE]
+
+    def test_read_values_of_other_codecs(self, client_class, request):
+        r = _get_client(client_class, request, codec_tag=True)
+        others = [JSONSerializedRedis(db=9, codec_tag=True), PickleSerializedRedis(db=9, codec_tag=True),
+                  MsgpackSerializedRedis(db=9, codec_tag=True)]
+        for i, other in enumerate(others):
+            other.set(i, VALUE)
+            other.rpush('l', i)
+            other.hset('h', i, VALUE)
+        assert r.mget(0, 1, 2) == [VALUE] * 3
+        assert r.lrange('l', 0, -1) == [0, 1, 2]
+        assert r.hgetall('h') == {'0': VALUE, '1': VALUE, '2': VALUE}
+        for other in others:
+            assert other.lrange('l', 0, -1) == [0, 1, 2]
+
+    def test_read_untagged_values(self, request):
+        legacy = _get_client(PickleSerializedRedis, request)
+        legacy.set('a', VALUE)
+        legacy.sadd('s', 1, 2)
+        r = MsgpackSerializedRedis(db=9, codec_tag=True, untagged_deserialize_fn=pickle.loads)
+        assert r.get('a') == VALUE
+        r.sadd('s', 3)
+        assert r.smembers('s') == {1, 2, 3}
+        with r.pipeline() as pipe:
+            assert pipe.set('b', VALUE).get('a').get('b').execute() == [True, VALUE, VALUE]
+
+    def test_read_one_byte_untagged_values(self, request):
+        # msgpack ints 1, 2 and 3 are single bytes equal to the pickle, json and msgpack tags
+        legacy = _get_client(MsgpackSerializedRedis, request)
+        legacy.set('a', 3)
+        legacy.rpush('l', 3, 3, 3)
+        legacy.rpush('mixed', 1, 2, 3, VALUE)
+        r = MsgpackSerializedRedis(db=9, codec_tag=True)
+        assert r.get('a') == 3
+        assert r.lrange('l', 0, -1) == [3, 3, 3]
+        assert r.lrange('mixed', 0, -1) == [1, 2, 3, VALUE]
+
+    def test_register_codec_invalid_tag(self):
+        with pytest.raises(ValueError):
+            codecs.register_codec(b'a', None)
@@ -0,0 +1,139 @@
+import pytest
+import redis
+
+from serialized_redis import (JSONSerializedRedis, ZlibCompressor, LzmaCompressor, ZlibDictCompressor, ZdictStore,
+                              train_zdict, sample_values)
+from serialized_redis.compression import zdict_id
+
+from .conftest import _get_client, get_raw
+
+LARGE_VALUE = {'key%d' % i: ['value'] * 10 for i in range(100)}
+
+
+@pytest.fixture()
+def r(request, client_class):
+    return _get_client(client_class, request, compressor=ZlibCompressor(threshold=100))
+
+
+class TestCompression(object):
+
+    def test_large_values_are_compressed(self, r):
+        r.set('a', LARGE_VALUE)
+        raw = get_raw('a')
+        assert raw.startswith(b'\x00z')
+        assert len(raw) < 500
+        assert r.get('a') == LARGE_VALUE
+
+    def test_small_values_are_not_compressed(self, r):
+        r.set('a', 'small')
+        assert not get_raw('a').startswith(b'\x00')
+        assert r.get('a') == 'small'
+
+    def test_uncompressed_values_readable(self, r, client_class, request):
+        legacy = _get_client(client_class, request)
+        legacy.set('a', LARGE_VALUE)
+        legacy.rpush('l', 0, LARGE_VALUE)
+        assert r.get('a') == LARGE_VALUE
+        r.rpush('l', LARGE_VALUE)
+        assert r.lrange('l', 0, -1) == [0, LARGE_VALUE, LARGE_VALUE]
+
+    def test_multi_values_commands(self, r):
+        r.hmset('h', {'a': LARGE_VALUE, 'b': 1})
+        assert r.hgetall('h') == {'a': LARGE_VALUE, 'b': 1}
+        r.mset({'a': LARGE_VALUE, 'b': 'b'})
+        assert r.mget('a', 'b', 'c') == [LARGE_VALUE, 'b', None]
+        with r.pipeline() as pipe:
+            assert pipe.set('a', LARGE_VALUE).get('a').execute() == [True, LARGE_VALUE]
+
+    def test_read_values_compressed_with_other_compressor(self, r, client_class, request):
+        other = _get_client(client_class, request, compressor=LzmaCompressor(threshold=100))
+        other.set('a', LARGE_VALUE)
+        assert get_raw('a').startswith(b'\x00x')
+        assert r.get('a') == LARGE_VALUE
+
+    def test_decode_responses_not_supported(self, client_class):
+        if client_class is JSONSerializedRedis:
+            return
+        with pytest.raises(ValueError):
+            client_class(decode_responses=True, compressor=ZlibCompressor())
+
+
+def small_value(i):
+    return {'id': i, 'name': 'user %d' % i, 'email': 'user%d@example.com' % i, 'roles': ['admin', 'user'],
+            'settings': {'theme': 'dark', 'lang': 'en'}}
+
+
+class TestZlibDictCompression(object):
+
+    def test_train_zdict(self, client_class, request):
+        client = _get_client(client_class, request)
+        samples = client.serialize_many([small_value(i) for i in range(200)])
+        zdict = train_zdict(samples, size=4096)
+        assert 0 < len(zdict) <= 4096
+        compressor = ZlibDictCompressor(zdict)
+        data = samples[0] if isinstance(samples[0], bytes) else samples[0].encode()
+        assert len(compressor.compress(data)) < len(data) / 2
+        assert compressor.decompress(compressor.compress(data)) == data
+
+    def test_sample_values(self, client_class, request):
+        # JSON clients decode responses by default
+        r = _get_client(client_class, request)
+        r.mset({'k%d' % i: small_value(i) for i in range(10)})
+        r.rpush('l', 1)
+        samples = sample_values(r)
+        assert len(samples) == 10
+        assert sorted(r.deserialize_many(samples), key=lambda value: value['id']) == [
+            small_value(i) for i in range(10)]
+        assert train_zdict(samples, size=1024)
+
+    def test_dictionary_rotation(self, client_class, request):
+        r = _get_client(client_class, request, compressor=ZlibCompressor())
+        r.mset({'k%d' % i: small_value(i) for i in range(100)})
+
+        store = ZdictStore(r)
+        assert store.current() is None
+        first_id = store.rotate(sample_values(r, count=50), size=2048)
+
+        r1 = client_class(db=9, compressor=ZlibDictCompressor(store=store))
+        assert r1.compressor.dict_id == first_id
+        r1.set('a', small_value(1))
+        raw = get_raw('a')
+        assert raw.startswith(b'\x00d')
+        assert len(raw) < len(r.serialize(small_value(1))) / 2
+        # legacy values are still readable
+        assert r1.get('k1') == small_value(1)
+
+        store.rotate([r.serialize(small_value(i)) for i in range(100, 150)], size=1024)
+        r2 = client_class(db=9, compressor=ZlibDictCompressor(store=store))
+        assert r2.compressor.dict_id != first_id
+        r2.set('b', small_value(2))
+        # previous dictionary is fetched from the store
+        assert r2.get('a') == small_value(1)
+        # new dictionary is loaded on refresh
+        assert r1.get('b') == small_value(2)
+        assert r1.compressor.dict_id == first_id
+        r1.compressor.reload()
+        assert r1.compressor.dict_id == r2.compressor.dict_id
+
+    def test_zdict_with_refreshed_store(self, client_class, request):
+        samples = [_get_client(client_class, request).serialize(small_value(i)) for i in range(50)]
+        zdict = train_zdict(samples, size=1024)
+        store = ZdictStore(redis.Redis(db=9))
+        compressor = ZlibDictCompressor(zdict=zdict, store=store, refresh_interval=60)
+        r = client_class(db=9, compressor=compressor)
+        r.set('a', small_value(1))
+        assert r.get('a') == small_value(1)
+        assert compressor.dict_id == zdict_id(zdict)
+        # the store has no dictionary yet, the provided one is kept on refresh
+        compressor.refresh_interval = 0
+        r.set('b', small_value(2))
+        assert compressor.dict_id == zdict_id(zdict)
+        new_id = store.save(train_zdict(samples[10:], size=512))
+        r.set('c', small_value(3))
+        assert compressor.dict_id == new_id
+        assert r.mget('a', 'b', 'c') == [small_value(1), small_value(2), small_value(3)]
+
+    def test_no_dictionary(self, client_class, request):
+        r = _get_client(client_class, request, compressor=ZlibDictCompressor(store=ZdictStore(redis.Redis(db=9))))
+        r.set('a', small_value(1))
+        assert r.get('a') == small_value(1)
@@ -0,0 +1,208 @@
+import pickle
+import threading
+
+import pytest
+import redis
+
+from serialized_redis import JSONSerializedRedis, PickleSerializedRedis, MsgpackSerializedRedis, PickleCodec
+from serialized_redis.counters import MAX_INT
+
+from .conftest import _get_client
+
+INTS = [0, 1, -1, 255, 256, -256, 65535, 65536, 2 ** 31 - 1, 2 ** 31, -2 ** 31, -2 ** 31 - 1, 2 ** 40, -2 ** 40,
+        MAX_INT - 1, -MAX_INT + 1]
+
+
+@pytest.fixture(params=[PickleSerializedRedis, MsgpackSerializedRedis])
+def client_class(request):
+    return request.param
+
+
+@pytest.fixture()
+def r(request, client_class):
+    return _get_client(client_class, request)
+
+
+class TestCounters(object):
+
+    def test_ints(self, r):
+        for i, value in enumerate(INTS):
+            r.set(i, value)
+            assert r.incr(i) == value + 1
+            assert r.get(i) == value + 1
+            assert type(r.get(i)) is int
+            assert r.decrby(i, 2) == value - 1
+            assert r.get(i) == value - 1
+        assert r.incrby('a', 2 ** 40) == 2 ** 40
+        assert r.decr('a', 2 ** 41) == -2 ** 40
+        assert r.get('a') == -2 ** 40
+
+    def test_floats(self, r):
+        assert r.incrbyfloat('a', 0.1) == 0.1
+        assert r.incrbyfloat('a', 0.2) == 0.1 + 0.2
+        assert r.get('a') == 0.1 + 0.2
+        r.set('b', 2)
+        assert r.incrbyfloat('b', -2.0) == 0.0
+        assert type(r.get('b')) is float
+        assert r.incrbyfloat('c', 1e308) == 1e308
+        with pytest.raises(redis.ResponseError):
+            r.incrbyfloat('c', 1e308)
+        assert r.get('c') == 1e308
+
+    def test_errors(self, r):
+        r.set('float', 1.5)
+        with pytest.raises(redis.ResponseError):
+            r.incr('float')
+        r.set('str', 'a')
+        with pytest.raises(redis.ResponseError):
+            r.incr('str')
+        r.set('none', None)
+        with pytest.raises(redis.ResponseError):
+            r.incrbyfloat('none')
+        with pytest.raises(redis.ResponseError):
+            r.incrby('a', 1.5)
+        r.set('max', MAX_INT)
+        with pytest.raises(redis.ResponseError):
+            r.incr('max')
+        assert r.get('max') == MAX_INT
+        r.rpush('list', 1)
+        with pytest.raises(redis.ResponseError):
+            r.incr('list')
+        assert r.get('float') == 1.5
+
+    def test_ttl(self, r):
+        r.set('a', 1, ex=100)
+        r.incr('a')
+        assert 0 < r.ttl('a') <= 100
+        r.incrbyfloat('b')
+        assert r.ttl('b') == -1
+
+    def test_pipeline(self, r):
+        with r.pipeline() as pipe:
+            pipe.incr('a').incrbyfloat('a', 0.5).set('b', 1).decr('b').get('a')
+            assert pipe.execute() == [1, 1.5, True, 0, 1.5]
+        with r.pipeline(transaction=False) as pipe:
+            pipe.incrbyfloat('a', 0.5).incrbyfloat('a', -4)
+            assert pipe.execute() == [2.0, -2.0]
+
+    def test_script_reloaded(self, r):
+        assert r.incr('a') == 1
+        r.script_flush()
+        assert r.incr('a') == 2
+        r.script_flush()
+        with r.pipeline() as pipe:
+            assert pipe.incrbyfloat('a').execute() == [3.0]
+
+    def test_codec_tag(self, request, client_class):
+        r = _get_client(client_class, request, codec_tag=True)
+        untagged = _get_client(client_class, request)
+        assert r.incr('a', 5) == 5
+        assert r.incrbyfloat('a', 0.5) == 5.5
+        assert r.raw_redis().get('a')[:1] == r.CODEC_TAG
+        assert r.get('a') == 5.5
+        untagged.set('b', 300)
+        assert r.incr('b') == 301
+        assert r.get('b') == 301
+
+    def test_concurrent_increments(self, r):
+        def incr():
+            for _ in range(100):
+                r.incr('a')
+                r.incrbyfloat('b', 0.5)
+        threads = [threading.Thread(target=incr) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert r.get('a') == 400
+        assert r.get('b') == 200.0
+
+    def test_ordered(self, request, client_class):
+        r = _get_client(client_class, request, ordered=True)
+        with pytest.raises(NotImplementedError):
+            r.incr('a')
+
+
+class TestPickleCounters(object):
+
+    @pytest.mark.parametrize('protocol', range(2, pickle.HIGHEST_PROTOCOL + 1))
+    def test_protocols(self, request, protocol):
+        r = _get_client(PickleSerializedRedis, request, pickle_codec=PickleCodec(protocol=protocol))
+        for value in INTS[:-2]:
+            r.set('a', value)
+            assert r.incrby('a', 3) == value + 3
+            r.set('a', value + 0.5)
+            assert r.incrbyfloat('a', 3) == value + 3.5
+
+    def test_large_ints(self, request):
+        r = _get_client(PickleSerializedRedis, request)
+        r.set('a', 2 ** 54)
+        with pytest.raises(redis.ResponseError):
+            r.incr('a')
+        r.set('a', 10 ** 30)
+        with pytest.raises(redis.ResponseError):
+            r.incr('a')
+        assert r.get('a') == 10 ** 30
+
+    def test_out_of_band(self, request):
+        r = _get_client(PickleSerializedRedis, request, pickle_codec=PickleCodec(out_of_band=True, optimize=True))
+        r.set('a', 10)
+        assert r.incr('a') == 11
+
+
+class TestMsgpackCounters(object):
+
+    def test_single_float(self, request):
+        r = _get_client(MsgpackSerializedRedis, request)
+        r.raw_redis().set('a', b'\xca\x3f\xc0\x00\x00')
+        assert r.incrbyfloat('a', 1) == 2.5
+        assert r.get('a') == 2.5
+
+
+    def test_one_byte_untagged_values(self, request):
+        legacy = _get_client(MsgpackSerializedRedis, request)
+        r = _get_client(MsgpackSerializedRedis, request, codec_tag=True)
+        for value in (1, 2, 3):
+            legacy.set(value, value)
+            assert r.incr(value) == value + 1
+            assert r.get(value) == value + 1
+
+
+class TestJSONCounters(object):
+
+    def test_native(self, request):
+        r = _get_client(JSONSerializedRedis, request)
+        assert r.incr('a') == 1
+        assert r.incrbyfloat('a', 0.5) == 1.5
+        assert r.get('a') == 1.5
+        assert r._incr_script is None
+
+    def test_codec_tag(self, request):
+        r = _get_client(JSONSerializedRedis, request, codec_tag=True)
+        untagged = _get_client(JSONSerializedRedis, request)
+        assert r.incr('a') == 1
+        assert r.incrby('a', 2 ** 40) == 2 ** 40 + 1
+        assert r.decr('a', 2 ** 40 + 3) == -2
+        assert r.raw_redis().get('a') == r.CODEC_TAG + b'-2'
+        assert r.get('a') == -2
+        assert r.incrbyfloat('a', 0.5) == -1.5
+        assert r.incrbyfloat('a', 1.5) == 0.0
+        assert r.raw_redis().get('a') == r.CODEC_TAG + b'0.0'
+        assert type(r.get('a')) is float
+        assert r.incrbyfloat('b', 0.1) == 0.1
+        assert r.incrbyfloat('b', 0.2) == 0.1 + 0.2
+        assert r.get('b') == 0.1 + 0.2
+        assert r.incrbyfloat('c', 1e20) == 1e20
+        assert r.get('c') == 1e20
+        untagged.set('d', 300)
+        assert r.incr('d') == 301
+        assert r.get('d') == 301
+        for value in ('1', [1], 1.5):
+            r.set('e', value)
+            with pytest.raises(redis.ResponseError):
+                r.incr('e')
+        r.raw_redis().set('e', r.CODEC_TAG + b'0x10')
+        with pytest.raises(redis.ResponseError):
+            r.incr('e')
+        with r.pipeline() as pipe:
+            assert pipe.incr('f').incrbyfloat('f', 0.5).execute() == [1, 1.5]
@@ -0,0 +1,61 @@
+import pytest
+
+from serialized_redis import JSONSerializedRedis
+from serialized_redis.json_backends import get_json_backend
+from tests import common_commands_tests
+
+from .conftest import _get_client
+
+VALUE = {'b': [1, 2.5, None, True], 'a': 'é/€', 'c': {'z': 1, 'y': 2}}
+
+
+@pytest.fixture(params=['json', 'orjson', 'ujson', 'simplejson'])
+def json_backend(request):
+    if request.param != 'json':
+        pytest.importorskip(request.param)
+    return request.param
+
+
+class TestOrjsonRedisCommands(common_commands_tests.TestRedisCommands):
+
+    @pytest.fixture()
+    def r(self, request):
+        pytest.importorskip('orjson')
+        return _get_client(JSONSerializedRedis, request, json_backend='orjson')
+
+    def test_response_callbacks_shared_between_instances(self, r):
+        other = type(r)(connection_pool=r.connection_pool, json_backend='orjson')
+        for command in ('GET', 'HGETALL', 'ZRANGE', 'SMEMBERS', 'GEORADIUS'):
+            assert other.response_callbacks[command] is r.response_callbacks[command]
+
+
+class TestJSONBackends(object):
+
+    def test_roundtrip(self, request, json_backend):
+        r = _get_client(JSONSerializedRedis, request, json_backend=json_backend)
+        r.set('a', VALUE)
+        assert r.get('a') == VALUE
+        r.rpush('l', VALUE, 'x', 1)
+        assert r.lrange('l', 0, -1) == [VALUE, 'x', 1]
+
+    def test_sorted_keys(self, request, json_backend):
+        r = _get_client(JSONSerializedRedis, request, json_backend=json_backend)
+        r.sadd('s', {'a': 1, 'b': 2})
+        assert r.sismember('s', {'b': 2, 'a': 1})
+        r.zadd('z', {'m': 1})
+        assert r.zscore('z', 'm') == 1
+
+    def test_responses_not_decoded(self, request, json_backend):
+        r = _get_client(JSONSerializedRedis, request, json_backend=json_backend)
+        assert r.connection_pool.connection_kwargs['decode_responses'] == (json_backend == 'json')
+
+    def test_shared_functions(self, json_backend):
+        assert get_json_backend(json_backend) is get_json_backend(json_backend)
+
+    def test_auto(self):
+        dumps, loads = get_json_backend('auto')
+        assert loads(dumps({'b': 1, 'a': 2})) == {'a': 2, 'b': 1}
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_json_backend('yaml')
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from serialized_redis import SerializedRedis, PickleSerializedRedis, LazyList, LazyDict
+
+from .conftest import VALUE, _get_client
+
+
+class TestLazy(object):
+
+    def test_lazy_replies(self, client_class, request):
+        r = _get_client(client_class, request, lazy=True)
+        values = [VALUE, 1, 'two', None]
+        r.rpush('l', *values)
+        r.hmset('h', {'a': VALUE, 'b': 2})
+        r.zadd('z', {'m1': 1, 'm2': 2})
+        r.set('s', VALUE)
+
+        lrange = r.lrange('l', 0, -1)
+        assert isinstance(lrange, LazyList)
+        assert lrange == values
+        assert lrange[-1] is None and lrange[1:3] == [1, 'two']
+        assert len(lrange) == 4
+        hgetall = r.hgetall('h')
+        assert isinstance(hgetall, LazyDict)
+        assert hgetall == {'a': VALUE, 'b': 2}
+        assert 'a' in hgetall and 'c' not in hgetall
+        assert r.zrange('z', 0, -1) == ['m1', 'm2']
+        assert r.zrange('z', 0, -1, withscores=True) == [('m1', 1.0), ('m2', 2.0)]
+        assert r.mget('s', 'missing') == [VALUE, None]
+        assert r.get('s') == VALUE
+        with r.pipeline() as pipe:
+            lrange, hgetall = pipe.lrange('l', 0, -1).hgetall('h').execute()
+        assert isinstance(lrange, LazyList) and lrange == values
+        assert isinstance(hgetall, LazyDict) and hgetall == {'a': VALUE, 'b': 2}
+
+    def test_values_deserialized_once_on_access(self, request):
+        deserialized = []
+
+        def deserialize(value):
+            deserialized.append(value)
+            return json.loads(value)
+
+        r = _get_client(SerializedRedis, request, serialize_fn=json.dumps, deserialize_fn=deserialize, lazy=True)
+        r.rpush('l', *range(100))
+        r.hmset('h', {str(i): i for i in range(100)})
+
+        lrange = r.lrange('l', 0, -1)
+        hgetall = r.hgetall('h')
+        assert deserialized == []
+        assert lrange[10] == 10 and lrange[10] == 10
+        assert hgetall['20'] == 20 and hgetall['20'] == 20
+        assert list(hgetall)[:2] == ['0', '1']
+        assert len(deserialized) == 2
+
+    def test_deserialization_error_raised_on_access(self, request):
+        r = _get_client(PickleSerializedRedis, request, lazy=True)
+        r.rpush('l', 1)
+        r.execute_command('RPUSH', 'l', b'not pickled')
+        lrange = r.lrange('l', 0, -1)
+        assert lrange[0] == 1
+        with pytest.raises(Exception):
+            lrange[1]
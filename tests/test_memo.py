@@ -0,0 +1,96 @@
+from serialized_redis import SerializationMemo, DeserializationMemo, ZlibCompressor
+
+from .conftest import _get_client
+
+
+class TestSerializationMemo(object):
+
+    def test_repeated_values_serialized_once(self, client_class, request):
+        memo = SerializationMemo()
+        r = _get_client(client_class, request, serialize_memo=memo)
+        r.sadd('s', 'user:1', 'user:2', 3)
+        for _ in range(10):
+            assert r.sismember('s', 'user:1')
+            assert not r.sismember('s', 'user:3')
+        assert memo.misses == 4
+        assert memo.hits == 19
+        assert memo.size == 4
+        r.srem('s', 'user:1', 3)
+        assert r.smembers('s') == {'user:2'}
+        assert memo.hits == 21
+
+    def test_equal_values_of_different_types(self, client_class, request):
+        memo = SerializationMemo()
+        r = _get_client(client_class, request, serialize_memo=memo)
+        unmemoized = client_class(db=9)
+        for value in (1, 1.0, True, (1, 2), (1.0, 2), (True, 2), 'a', None):
+            assert r.serialize(value) == unmemoized.serialize(value)
+        assert memo.size == 8
+
+    def test_signed_zeros(self, client_class, request):
+        memo = SerializationMemo()
+        r = _get_client(client_class, request, serialize_memo=memo)
+        unmemoized = client_class(db=9)
+        for value in (0.0, -0.0, (0.0, 1), (-0.0, 1), ((-0.0,),)):
+            assert r.serialize(value) == unmemoized.serialize(value)
+        r.sadd('s', 0.0, -0.0)
+        assert r.sismember('s', -0.0)
+        assert memo.size == 5
+
+    def test_mutable_values_not_memoized(self, client_class, request):
+        memo = SerializationMemo()
+        r = _get_client(client_class, request, serialize_memo=memo)
+        value = {'a': [1]}
+        r.rpush('l', value, [1], ([1], 2), 'a')
+        value['a'].append(2)
+        r.rpush('l', value)
+        assert r.lrange('l', 0, -1) == [{'a': [1]}, [1], r.deserialize(r.serialize(([1], 2))), 'a', {'a': [1, 2]}]
+        r.set('a', value)
+        value['a'].append(3)
+        r.set('b', value)
+        assert r.mget('a', 'b') == [{'a': [1, 2]}, {'a': [1, 2, 3]}]
+
+    def test_bounded(self, client_class, request):
+        memo = SerializationMemo(maxsize=10)
+        r = _get_client(client_class, request, serialize_memo=memo)
+        r.sadd('s', *range(100))
+        assert memo.size == 10
+        memo.clear()
+        assert memo.size == 0
+
+
+class TestDeserializationMemo(object):
+
+    def test_repeated_payloads_deserialized_once(self, client_class, request):
+        memo = DeserializationMemo()
+        r = _get_client(client_class, request, deserialize_memo=memo)
+        r.rpush('l', *(['active', 'inactive'] * 50))
+        assert r.lrange('l', 0, -1) == ['active', 'inactive'] * 50
+        assert (memo.hits, memo.misses, memo.size) == (98, 2, 2)
+        assert memo.hit_rate == 0.98
+        assert r.lrange('l', 0, 1) == ['active', 'inactive']
+        assert r.get('missing') is None
+        assert memo.hits == 100
+
+    def test_large_payloads_not_memoized(self, client_class, request):
+        memo = DeserializationMemo(max_length=100)
+        r = _get_client(client_class, request, deserialize_memo=memo, compressor=ZlibCompressor(threshold=500))
+        r.rpush('l', 'x' * 1000, 'x' * 1000, 'y' * 200, 'y' * 200)
+        assert r.lrange('l', 0, -1) == ['x' * 1000, 'x' * 1000, 'y' * 200, 'y' * 200]
+        # memo is keyed on raw payloads, compressed ones are small
+        assert (memo.hits, memo.misses) == (1, 1)
+
+    def test_copy(self, client_class, request):
+        memo = DeserializationMemo(copy=True)
+        r = _get_client(client_class, request, deserialize_memo=memo)
+        r.set('a', {'status': ['active']})
+        value = r.get('a')
+        value['status'].append('modified')
+        assert r.get('a') == {'status': ['active']}
+        assert memo.hits == 1
+
+    def test_shared_without_copy(self, client_class, request):
+        memo = DeserializationMemo()
+        r = _get_client(client_class, request, deserialize_memo=memo)
+        r.set('a', {'status': ['active']})
+        assert r.get('a') is r.get('a')
@@ -0,0 +1,147 @@
+import datetime
+import pickle
+
+import redis
+
+from serialized_redis import PickleSerializedRedis, MsgpackSerializedRedis, JSONSerializedRedis
+from serialized_redis import migrate as migrate_module
+from serialized_redis.migrate import migrate, main, FileCheckpoint
+from serialized_redis.msgpack_codec import ExtTypes
+
+from .conftest import _get_client
+
+VALUES = {
+    'string': {'a': [1, 2]},
+    'hash': {'a': 1, 'b': {'c': 'd'}},
+    'list': [1, 'two', {'three': 3}],
+    'set': {1, 'two', (3, 4)},
+    'zset': [('one', 1.0), ('two', 2.0)],
+}
+
+
+def fill(r):
+    r.set('string', VALUES['string'])
+    r.hmset('hash', VALUES['hash'])
+    r.rpush('list', *VALUES['list'])
+    r.sadd('set', *VALUES['set'])
+    r.zadd('zset', dict(VALUES['zset']))
+    r.expire('list', 100)
+
+
+def check(r):
+    assert r.get('string') == VALUES['string']
+    assert r.hgetall('hash') == VALUES['hash']
+    assert r.lrange('list', 0, -1) == VALUES['list']
+    assert 0 < r.ttl('list') <= 100
+    assert r.ttl('string') == -1
+    assert r.zrange('zset', 0, -1, withscores=True) == VALUES['zset']
+
+
+class TestMigrate(object):
+
+    def test_migrate_to_other_database(self, request):
+        source = _get_client(PickleSerializedRedis, request)
+        target = _get_client(MsgpackSerializedRedis, request, db=10)
+        fill(source)
+        redis.Redis(db=9).set('bad', b'not pickled')
+        redis.Redis(db=9).xadd('stream', {'a': 1})
+
+        stats = migrate(source, target, batch_size=2)
+        assert (stats.migrated, stats.skipped, stats.errors) == (5, 1, 1)
+        check(target)
+        # msgpack has no tuples
+        assert len(target.smembers_as_list('set')) == 3
+        assert [3, 4] in target.smembers_as_list('set')
+        # source is untouched
+        check(source)
+
+    def test_migrate_in_place_with_codec_tag(self, request):
+        fill(_get_client(PickleSerializedRedis, request))
+        source = PickleSerializedRedis(db=9, codec_tag=True)
+        target = MsgpackSerializedRedis(db=9, codec_tag=True)
+        migrate(source, target)
+        assert redis.Redis(db=9).get('string')[:1] == MsgpackSerializedRedis.CODEC_TAG
+        check(target)
+        # migrating again is harmless
+        stats = migrate(source, target)
+        assert stats.errors == 0
+        check(target)
+
+    def test_migrate_none_values(self, request):
+        source = _get_client(PickleSerializedRedis, request)
+        target = _get_client(JSONSerializedRedis, request, db=10)
+        source.set('none', None)
+        source.set('zero', 0)
+        stats = migrate(source, target)
+        assert (stats.migrated, stats.skipped, stats.errors) == (2, 0, 0)
+        assert redis.Redis(db=10).exists('none')
+        assert target.get('none') is None
+        assert target.get('zero') == 0
+
+    def test_retried_batch_counted_once(self, request, monkeypatch):
+        source = _get_client(PickleSerializedRedis, request)
+        target = _get_client(MsgpackSerializedRedis, request, db=10)
+        source.set('a', 1)
+        redis.Redis(db=9).set('bad', b'not pickled')
+        redis.Redis(db=9).xadd('stream', {'a': 1})
+        read_batch = migrate_module._read_batch
+        calls = []
+
+        def read_batch_modified(source, target, raw, keys):
+            result = read_batch(source, target, raw, keys)
+            if not calls:
+                # modified by another client while the batch is watched
+                target.set('a', 2)
+            calls.append(keys)
+            return result
+
+        monkeypatch.setattr(migrate_module, '_read_batch', read_batch_modified)
+        stats = migrate(source, target, batch_size=10)
+        assert len(calls) == 2
+        assert (stats.migrated, stats.skipped, stats.errors) == (1, 1, 1)
+        assert target.get('a') == 1
+
+    def test_values_target_can_not_serialize(self, request):
+        source = _get_client(PickleSerializedRedis, request)
+        target = _get_client(MsgpackSerializedRedis, request, db=10)
+        source.set('date', datetime.date(2020, 1, 2))
+        source.rpush('list', 1, datetime.date(2020, 1, 2))
+        source.set('a', 1)
+        stats = migrate(source, target, batch_size=10)
+        assert (stats.migrated, stats.skipped, stats.errors) == (1, 0, 2)
+        assert target.get('a') == 1
+        assert not redis.Redis(db=10).exists('date', 'list')
+
+    def test_checkpoint(self, request, tmpdir):
+        source = _get_client(JSONSerializedRedis, request)
+        target = _get_client(PickleSerializedRedis, request, db=10)
+        source.mset({'k%d' % i: i for i in range(100)})
+        checkpoint = FileCheckpoint(str(tmpdir.join('checkpoint.json')))
+        assert checkpoint.load() == 0
+        checkpoint.save(12)
+        assert checkpoint.load() == 12
+        checkpoint.save(0)
+
+        migrate(source, target, batch_size=10, checkpoint=checkpoint, rate=10000)
+        assert checkpoint.load() == 0
+        assert target.mget(['k%d' % i for i in range(100)]) == list(range(100))
+
+    def test_main(self, request, tmpdir):
+        source = _get_client(PickleSerializedRedis, request)
+        fill(source)
+        stats = main(['--url', 'redis://localhost:6379/9', '--source-codec', 'pickle', '--target-codec', 'msgpack',
+                      '--codec-tag', '--checkpoint', str(tmpdir.join('checkpoint.json'))])
+        assert stats.migrated == 5
+        check(MsgpackSerializedRedis(db=9, codec_tag=True, untagged_deserialize_fn=pickle.loads))
+
+    def test_main_ext_types(self, request):
+        source = _get_client(PickleSerializedRedis, request)
+        _get_client(MsgpackSerializedRedis, request, db=10)
+        source.set('date', datetime.date(2020, 1, 2))
+        source.sadd('set', (3, 4))
+        stats = main(['--url', 'redis://localhost:6379/9', '--target-url', 'redis://localhost:6379/10',
+                      '--source-codec', 'pickle', '--target-codec', 'msgpack', '--ext-types'])
+        assert (stats.migrated, stats.errors) == (2, 0)
+        target = MsgpackSerializedRedis(db=10, ext_types=ExtTypes())
+        assert target.get('date') == datetime.date(2020, 1, 2)
+        assert target.smembers('set') == {(3, 4)}
@@ -0,0 +1,161 @@
+import collections
+import datetime
+import decimal
+import enum
+import pickle
+import threading
+import uuid
+
+import pytest
+
+msgpack = pytest.importorskip('msgpack')
+
+from serialized_redis import MsgpackSerializedRedis
+from serialized_redis.msgpack_codec import ExtTypes, MsgpackCodec, get_msgpack_codec
+
+from .conftest import _get_client
+
+EXT_TYPES = ExtTypes()
+
+VALUES = [
+    (1, 'a', (2, 3)),
+    {1, 'a'},
+    frozenset([1, 2]),
+    datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+    datetime.datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone(datetime.timedelta(hours=-5))),
+    datetime.date(2020, 1, 2),
+    datetime.timedelta(days=-1, microseconds=3),
+    decimal.Decimal('3.14159265358979323846'),
+    uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    {'nested': [(1, 2), {decimal.Decimal(1)}]},
+]
+
+
+class Color(enum.IntEnum):
+    RED = 1
+
+
+class Point(object):
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+
+class TestMsgpackCodec(object):
+
+    def test_same_output_as_msgpack(self):
+        codec = MsgpackCodec()
+        value = {'a': [1, 2.5, None, True, b'x'], 'b': (1, 2)}
+        assert codec.dumps(value) == msgpack.packb(value)
+        assert codec.dumps_many([value, 1]) == [msgpack.packb(value), msgpack.packb(1)]
+        assert codec.loads(msgpack.packb(value)) == msgpack.unpackb(msgpack.packb(value))
+
+    def test_invalid_data(self):
+        codec = MsgpackCodec()
+        for data in (b'\x92\x01', b'\x01\x02', b'\xc1'):
+            with pytest.raises(ValueError):
+                codec.loads(data)
+            assert codec.loads(b'\x01') == 1
+
+    def test_loads_many(self, request):
+        codec = MsgpackCodec()
+        values = [1, 'two', [3], {'four': 4}, None]
+        assert codec.loads_many(codec.dumps_many(values)) == values
+        assert codec.loads_many([]) == []
+        # values splitting or merging msgpack objects, adding up to the right count
+        for data in ([b'\x91', b'\x01\x02'], [b'\x01\x02', b'\x91'], [b'\x01\x02', b''], [b'\x01', b'']):
+            with pytest.raises(ValueError):
+                codec.loads_many(data)
+        r = _get_client(MsgpackSerializedRedis, request)
+        r.raw_redis().rpush('l', b'\x91', b'\x01\x02')
+        with pytest.raises(ValueError):
+            r.lrange('l', 0, -1)
+
+    def test_large_values(self):
+        codec = MsgpackCodec()
+        value = ['x' * 1000] * 1000
+        assert codec.loads(codec.dumps(value)) == value
+
+    def test_threads(self):
+        codec = MsgpackCodec(EXT_TYPES)
+        errors = []
+
+        def run(i):
+            for j in range(1000):
+                value = (i, j, {'a': [i] * (j % 10)})
+                if codec.loads(codec.dumps(value)) != value:
+                    errors.append(value)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+
+    def test_picklable(self):
+        codec = pickle.loads(pickle.dumps(MsgpackCodec(EXT_TYPES)))
+        assert codec.loads(codec.dumps(VALUES)) == VALUES
+
+    def test_shared(self):
+        assert get_msgpack_codec(EXT_TYPES) is get_msgpack_codec(EXT_TYPES)
+        assert get_msgpack_codec() is not get_msgpack_codec(EXT_TYPES)
+
+    def test_bounded(self):
+        for _ in range(200):
+            MsgpackSerializedRedis(ext_types=ExtTypes())
+        assert get_msgpack_codec.cache_info().currsize <= 128
+
+
+class TestExtTypes(object):
+
+    def test_common_types(self, request):
+        r = _get_client(MsgpackSerializedRedis, request, ext_types=EXT_TYPES)
+        for i, value in enumerate(VALUES):
+            r.set(i, value)
+            assert r.get(i) == value
+            assert type(r.get(i)) is type(value)
+        r.rpush('l', *VALUES)
+        assert r.lrange('l', 0, -1) == VALUES
+
+    def test_set_members(self, request):
+        r = _get_client(MsgpackSerializedRedis, request, ext_types=EXT_TYPES)
+        r.sadd('s', (1, 2), {3, 4, 5}, datetime.date(2020, 1, 1))
+        assert r.sismember('s', (1, 2))
+        assert r.sismember('s', {5, 4, 3})
+        assert not r.sismember('s', [1, 2])
+        assert sorted(r.smembers_as_list('s'), key=str) == [(1, 2), datetime.date(2020, 1, 1), {3, 4, 5}]
+
+    def test_subclasses(self, request):
+        r = _get_client(MsgpackSerializedRedis, request, ext_types=EXT_TYPES)
+        point = collections.namedtuple('point', 'x y')(1, 2)
+        r.set('a', [Color.RED, collections.OrderedDict(a=1), point])
+        assert r.get('a') == [1, {'a': 1}, (1, 2)]
+
+    def test_user_types(self, request):
+        ext_types = ExtTypes()
+        ext_types.register(16, Point, lambda p: (p.x, p.y), lambda value: Point(*value))
+        r = _get_client(MsgpackSerializedRedis, request, ext_types=ext_types)
+        r.set('a', {'p': Point(1, (2, 3))})
+        assert r.get('a') == {'p': Point(1, (2, 3))}
+        with pytest.raises(TypeError):
+            r.set('b', object())
+
+    def test_register_errors(self):
+        ext_types = ExtTypes()
+        with pytest.raises(ValueError):
+            ext_types.register(1, Point, None, None)
+        with pytest.raises(ValueError):
+            ext_types.register(128, Point, None, None)
+
+    def test_unknown_codes(self, request):
+        r = _get_client(MsgpackSerializedRedis, request, ext_types=ExtTypes(common=False))
+        r.set('a', msgpack.ExtType(42, b'data'))
+        assert r.get('a') == msgpack.ExtType(42, b'data')
+        # without ext types, tuples are lists
+        r.set('b', (1, 2))
+        assert r.get('b') == [1, 2]
@@ -11,18 +11,6 @@ def r(request, **kwargs):
 
 class TestRedisCommands(common_commands_tests.TestRedisCommands):
 
-    def test_incr(self, r):
-        with pytest.raises(NotImplementedError):
-            r.incr('a')
-
-    def test_incrby(self, r):
-        with pytest.raises(NotImplementedError):
-            r.incrby('a')
-
-    def test_incrbyfloat(self, r):
-        with pytest.raises(NotImplementedError):
-            r.incrbyfloat('a')
-
     def test_sort_by(self, r):
         r['score:1'] = 8
         r['score:2'] = 3
@@ -0,0 +1,101 @@
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from serialized_redis import JSONSerializedRedis, PickleSerializedRedis, SerializedRedis, ZlibCompressor, numpy_codec
+
+from .conftest import _get_client
+
+ARRAYS = [
+    numpy.arange(12, dtype='float32').reshape(3, 4),
+    numpy.arange(10, dtype='>i8'),
+    numpy.array(3.5),
+    numpy.zeros((0, 3)),
+    numpy.array(['a', 'bc']),
+    numpy.array(['2020-01-01'], dtype='datetime64[D]'),
+    numpy.arange(20, dtype='int16')[::2],
+]
+
+
+def assert_array_equal(value, expected):
+    assert type(value) is numpy.ndarray
+    assert value.dtype == expected.dtype
+    assert value.shape == expected.shape
+    assert (value == expected).all()
+
+
+class TestNumpyCodec(object):
+
+    def test_dumps_loads(self):
+        for array in ARRAYS:
+            data = numpy_codec.dumps(array)
+            assert numpy_codec.is_serialized_array(data)
+            value = numpy_codec.loads(data)
+            assert_array_equal(value, array)
+        value = numpy_codec.loads(numpy_codec.dumps(ARRAYS[0]))
+        # not copied
+        assert not value.flags.writeable
+        assert not value.flags.owndata
+        assert value.flags.aligned
+
+    def test_standalone(self, request):
+        r = _get_client(SerializedRedis, request, serialize_fn=numpy_codec.dumps, deserialize_fn=numpy_codec.loads)
+        r.set('a', ARRAYS[0])
+        assert_array_equal(r.get('a'), ARRAYS[0])
+
+    def test_arrays_layer(self, client_class, request):
+        r = _get_client(client_class, request, numpy_arrays=True)
+        for i, array in enumerate(ARRAYS):
+            r.set(i, array)
+            assert_array_equal(r.get(i), array)
+        r.set('other', {'a': [1, 2]})
+        assert r.get('other') == {'a': [1, 2]}
+        r.rpush('l', ARRAYS[0], 'x', ARRAYS[1])
+        values = r.lrange('l', 0, -1)
+        assert_array_equal(values[0], ARRAYS[0])
+        assert values[1] == 'x'
+        assert_array_equal(values[2], ARRAYS[1])
+
+    def test_compression(self, client_class, request):
+        r = _get_client(client_class, request, numpy_arrays=True, compressor=ZlibCompressor(threshold=64))
+        array = numpy.zeros(1000)
+        r.set('a', array)
+        assert r.strlen('a') < 100
+        assert_array_equal(r.get('a'), array)
+
+    def test_read_by_tagged_clients(self, client_class, request):
+        r = _get_client(client_class, request, numpy_arrays=True, codec_tag=True)
+        r.set('a', ARRAYS[0])
+        r.set('b', [1, 2])
+        assert r.get('b') == [1, 2]
+        other = PickleSerializedRedis(db=9, codec_tag=True)
+        assert_array_equal(other.get('a'), ARRAYS[0])
+        assert other.get('b') == [1, 2]
+
+    def test_decode_responses(self):
+        with pytest.raises(ValueError):
+            JSONSerializedRedis(db=9, numpy_arrays=True, decode_responses=True)
+
+    def test_mget_arrays(self, client_class, request):
+        r = _get_client(client_class, request, numpy_arrays=True)
+        vectors = [numpy.random.rand(8).astype('float32') for _ in range(5)]
+        r.mset({'v%d' % i: vector for i, vector in enumerate(vectors)})
+        stacked = r.mget_arrays(['v%d' % i for i in range(5)])
+        assert_array_equal(stacked, numpy.stack(vectors))
+        assert stacked.flags.writeable
+        assert r.mget_arrays('v0', 'v1', dtype='float64').dtype == numpy.float64
+        r.set('list', [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0])
+        assert r.mget_arrays('v0', 'list')[1].tolist() == list(range(1, 9))
+        with pytest.raises(KeyError):
+            r.mget_arrays('v0', 'missing')
+        r.set('other', numpy.zeros(3))
+        with pytest.raises(ValueError):
+            r.mget_arrays('v0', 'other')
+
+    def test_lrange_arrays(self, client_class, request):
+        r = _get_client(client_class, request, numpy_arrays=True)
+        vectors = [numpy.full(4, i, dtype='int32') for i in range(10)]
+        r.rpush('l', *vectors)
+        assert_array_equal(r.lrange_arrays('l'), numpy.stack(vectors))
+        assert_array_equal(r.lrange_arrays('l', 2, 3), numpy.stack(vectors[2:4]))
+        assert r.lrange_arrays('missing').shape == (0,)
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from serialized_redis import PickleSerializedRedis, Offloader
+
+from .conftest import VALUE, _get_client
+
+
+class CountingExecutor(ThreadPoolExecutor):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class TestOffload(object):
+
+    def test_large_replies_deserialized_by_chunks(self, client_class, request):
+        with CountingExecutor(max_workers=4) as executor:
+            r = _get_client(client_class, request, offloader=Offloader(executor, threshold=10, chunk_size=4))
+            values = [{'i': i} for i in range(10)]
+            r.rpush('l', *values)
+            r.hmset('h', {str(i): value for i, value in enumerate(values)})
+            r.zadd('z', {'m%d' % i: i for i in range(10)})
+            r.sadd('s', *range(10))
+
+            assert r.lrange('l', 0, -1) == values
+            assert r.hgetall('h') == {str(i): value for i, value in enumerate(values)}
+            assert r.zrange('z', 0, -1, withscores=True) == [('m%d' % i, float(i)) for i in range(10)]
+            assert r.smembers('s') == set(range(10))
+            assert executor.submitted == 4 * 3
+            with r.pipeline() as pipe:
+                assert pipe.lrange('l', 0, -1).execute() == [values]
+            assert executor.submitted == 5 * 3
+
+            # small replies are deserialized inline
+            assert r.lrange('l', 0, 8) == values[:9]
+            assert r.mget('l', 'missing') == [None, None]
+            assert executor.submitted == 5 * 3
+
+    def test_process_pool(self, request):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            r = _get_client(PickleSerializedRedis, request, offloader=Offloader(executor, threshold=2, chunk_size=2))
+            r.rpush('l', VALUE, None, 3, 'four', 5)
+            assert r.lrange('l', 0, -1) == [VALUE, None, 3, 'four', 5]
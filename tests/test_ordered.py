@@ -0,0 +1,166 @@
+import random
+
+import pytest
+
+from serialized_redis import JSONSerializedRedis, PickleSerializedRedis, ZlibCompressor, ordered
+
+from .conftest import _get_client
+
+INTS = [0, 1, -1, 254, 255, 256, -254, -255, -256, 65024, 65025, -65025, 2 ** 64, -2 ** 64, 10 ** 100, -10 ** 100]
+FLOATS = [0.0, -0.0, 1.5, -1.5, 1e-300, -1e-300, 1e300, -1e300, float('inf'), float('-inf'), 3.14, -3.14]
+STRS = ['', 'a', 'ab', 'b', 'a\x00', 'a\x00b', 'a\x01', 'a\x02', '\x00', '\x01', 'é', '日本', '\U0001f600']
+BYTES = [b'', b'\x00', b'\x00\x00', b'\x01', b'\x01\x00', b'\x02', b'\xff', b'a\x00', b'a']
+
+
+@pytest.fixture()
+def r(request, client_class):
+    return _get_client(client_class, request, ordered=True)
+
+
+def assert_ordered(values):
+    values = sorted(values)
+    encoded = [ordered.dumps(value) for value in values]
+    assert encoded == sorted(encoded)
+    for value, data in zip(values, encoded):
+        assert b'\x00' not in data
+        loaded = ordered.loads(data)
+        assert type(loaded) is type(value)
+        assert loaded == value
+
+
+class TestOrderedCodec(object):
+
+    def test_ints(self):
+        assert_ordered(INTS)
+        assert_ordered(random.Random(0).sample(range(-10 ** 6, 10 ** 6), 1000))
+
+    def test_floats(self):
+        assert_ordered([value for value in FLOATS if value != 0] + [0.0])
+        assert_ordered([random.Random(1).uniform(-1e6, 1e6) for _ in range(1000)])
+        assert str(ordered.loads(ordered.dumps(-0.0))) == '-0.0'
+
+    def test_strs(self):
+        assert_ordered(STRS)
+
+    def test_bytes(self):
+        assert_ordered(BYTES)
+
+    def test_types_order(self):
+        values = [None, False, True, -1, 1, -1.5, 1.5, b'a', 'a']
+        encoded = [ordered.dumps(value) for value in values]
+        assert encoded == sorted(encoded)
+        assert [ordered.loads(data) for data in encoded] == values
+
+    def test_unsupported(self):
+        assert not ordered.is_supported([1])
+        assert not ordered.is_supported(1j)
+        with pytest.raises(TypeError):
+            ordered.dumps({'a': 1})
+        with pytest.raises(ValueError):
+            ordered.dumps(256 ** 130)
+
+
+class TestOrderedRedis(object):
+
+    def test_values(self, r):
+        values = [None, True, False, 1, -2, 1.5, 'a', b'b', [1, 'a'], {'a': 1}]
+        for i, value in enumerate(values):
+            r.set(i, value)
+        assert r.mget(range(len(values))) == values
+        r.rpush('l', *values)
+        assert r.lrange('l', 0, -1) == values
+        with r.pipeline() as pipe:
+            pipe.get(0).lrange('l', 0, -1)
+            assert pipe.execute() == [None, values]
+
+    def test_sort(self, r):
+        values = random.Random(2).sample(range(-1000, 1000), 50)
+        r.rpush('ints', *values)
+        assert r.sort('ints') == sorted(values)
+        assert r.sort('ints', desc=True, start=0, num=3) == sorted(values, reverse=True)[:3]
+        r.sadd('names', *STRS)
+        assert r.sort('names') == sorted(STRS)
+        assert r.sort('names', alpha=True) == sorted(STRS)
+
+    def test_sort_by(self, r):
+        r.rpush('users', 'a', 'b', 'c')
+        # patterns are substituted with serialized elements
+        r.mset({b'weight_' + r.serialize(user): weight for user, weight in zip('abc', [2.5, -1.0, 1e10])})
+        r.mset({b'name_' + r.serialize(user): name for user, name in zip('abc', ['x', {'y': 1}, None])})
+        assert r.sort('users', by='weight_*') == ['b', 'a', 'c']
+        assert r.sort('users', by='weight_*', get=['#', 'name_*']) == ['b', {'y': 1}, 'a', 'x', 'c', None]
+
+    def test_sort_store(self, r):
+        r.rpush('a', 3, 1, 2)
+        assert r.sort('a', store='sorted_a') == 3
+        assert r.lrange('sorted_a', 0, -1) == [1, 2, 3]
+
+    def test_lex_commands(self, r):
+        names = ['bob', 'alice', 'carol', 'dave', 'Eve']
+        r.zadd('z', dict.fromkeys(names, 0))
+        assert r.zrangebylex('z') == sorted(names)
+        assert r.zrangebylex('z', 'b', 'd') == ['bob', 'carol']
+        assert r.zrangebylex('z', 'bob', 'dave', min_exclusive=True, max_exclusive=True) == ['carol']
+        assert r.zrangebylex('z', 'alice', None, start=1, num=2) == ['bob', 'carol']
+        assert r.zrevrangebylex('z', 'd', 'b') == ['carol', 'bob']
+        assert r.zrevrangebylex('z', None, 'carol', max_exclusive=True) == ['dave', 'carol']
+        assert r.zlexcount('z') == 5
+        assert r.zlexcount('z', 'a', 'c') == 2
+        assert r.zremrangebylex('z', 'a', 'c') == 2
+        assert r.zrangebylex('z') == ['Eve', 'carol', 'dave']
+
+    def test_lex_numbers(self, r):
+        r.zadd('z', dict.fromkeys([-10, 3, 100, 2 ** 70], 0))
+        assert r.zrangebylex('z', 0, None) == [3, 100, 2 ** 70]
+        assert r.zrangebylex('z', None, 100, max_exclusive=True) == [-10, 3]
+        with r.pipeline() as pipe:
+            pipe.zrangebylex('z', 0, 200).zlexcount('z', -10, 3)
+            assert pipe.execute() == [[3, 100], 2]
+
+    def test_not_ordered(self, request, client_class):
+        r = _get_client(client_class, request)
+        assert not r.ordered
+        with pytest.raises(NotImplementedError):
+            r.zrangebylex('z', 'a', 'b')
+        with pytest.raises(NotImplementedError):
+            r.pipeline().zlexcount('z')
+
+    def test_ordered_client(self, request, client_class):
+        r = _get_client(client_class, request, decode_responses=False)
+        r_ordered = r.ordered_client()
+        assert r_ordered.ordered and not r.ordered
+        assert r_ordered.ordered_client() is r_ordered
+        assert r_ordered.connection_pool is r.connection_pool
+        r_ordered.rpush('l', 'b', 'c', 'a')
+        assert r_ordered.sort('l') == ['a', 'b', 'c']
+        r_ordered.zadd('z', {'b': 0, 'a': 0})
+        assert r_ordered.zrangebylex('z', 'a', 'a') == ['a']
+        r.set('a', [1, 2])
+        assert r_ordered.get('a') == [1, 2]
+        with r_ordered.pipeline() as pipe:
+            pipe.zrangebylex('z').lrange('l', 0, -1)
+            assert pipe.execute() == [['a', 'b'], ['b', 'c', 'a']]
+        with pytest.raises(NotImplementedError):
+            r.zrangebylex('z')
+
+    def test_ordered_client_decode_responses(self, request):
+        r = _get_client(JSONSerializedRedis, request)
+        with pytest.raises(ValueError):
+            r.ordered_client()
+        with pytest.raises(ValueError):
+            _get_client(JSONSerializedRedis, request, ordered=True, decode_responses=True)
+
+    def test_codec_tag(self, request, client_class):
+        r = _get_client(client_class, request, ordered=True, codec_tag=True)
+        tagged = _get_client(PickleSerializedRedis, request, codec_tag=True)
+        r.set('a', 1.5)
+        r.set('b', {'a': 1})
+        assert tagged.get('a') == 1.5
+        assert tagged.get('b') == {'a': 1}
+
+    def test_not_compressed(self, request, client_class):
+        r = _get_client(client_class, request, ordered=True, compressor=ZlibCompressor(threshold=10))
+        value = 'a' * 1000
+        r.rpush('l', value, 'b')
+        assert r.raw_redis().lindex('l', 0) == ordered.dumps(value)
+        assert r.sort('l') == [value, 'b']
@@ -0,0 +1,72 @@
+import pickle
+
+import pytest
+
+from serialized_redis import PickleSerializedRedis, MsgpackSerializedRedis, PickleCodec
+from serialized_redis.pickle_codec import OUT_OF_BAND_HEADER
+
+from .conftest import _get_client
+
+LARGE = b'x' * 100000
+VALUE = {'bytes': LARGE, 'bytearray': bytearray(b'y' * 10000), 'small': b'z', 'list': [1, 'a']}
+
+
+class TestPickleCodec(object):
+
+    def test_out_of_band(self, request):
+        r = _get_client(PickleSerializedRedis, request, pickle_codec=PickleCodec(out_of_band=True))
+        r.set('a', VALUE)
+        assert r.get('a') == VALUE
+        assert type(r.get('a')['bytearray']) is bytearray
+        assert r.strlen('a') < len(LARGE) + 10200
+        r.rpush('l', LARGE, 1)
+        assert r.lrange('l', 0, -1) == [LARGE, 1]
+
+    def test_wire_format(self):
+        codec = PickleCodec(out_of_band=True, threshold=1000)
+        data = codec.dumps([LARGE, b'small', LARGE])
+        assert data.startswith(OUT_OF_BAND_HEADER)
+        # buffer referenced twice is stored once
+        assert len(data) < len(LARGE) + 100
+        value = codec.loads(data)
+        assert value == [LARGE, b'small', LARGE]
+        assert value[0] is value[2]
+        # values without large buffers are plain pickles
+        assert pickle.loads(codec.dumps([b'small', 1])) == [b'small', 1]
+
+    def test_read_by_other_clients(self, request):
+        writer = _get_client(PickleSerializedRedis, request, pickle_codec=PickleCodec(out_of_band=True))
+        writer.set('a', VALUE)
+        reader = PickleSerializedRedis(db=9, pickle_codec=PickleCodec(out_of_band=True, threshold=100))
+        assert reader.get('a') == VALUE
+        with pytest.raises(pickle.UnpicklingError):
+            PickleSerializedRedis(db=9).get('a')
+        tagged_writer = PickleSerializedRedis(db=9, codec_tag=True, pickle_codec=PickleCodec(out_of_band=True))
+        tagged_writer.set('b', VALUE)
+        pytest.importorskip('msgpack')
+        assert MsgpackSerializedRedis(db=9, codec_tag=True).get('b') == VALUE
+
+    def test_protocol(self):
+        assert pickle.loads(PickleCodec(protocol=2).dumps(VALUE)) == VALUE
+        assert PickleCodec(protocol=2).dumps(1)[:2] == b'\x80\x02'
+        with pytest.raises(ValueError):
+            PickleCodec(protocol=4, out_of_band=True)
+
+    def test_optimize(self, request):
+        codec = PickleCodec(optimize=True)
+        value = {'a': [1, 2], 'b': ('c', 'd')}
+        assert len(codec.dumps(value)) < len(pickle.dumps(value))
+        r = _get_client(PickleSerializedRedis, request, pickle_codec=codec)
+        r.set('a', value)
+        assert r.get('a') == value
+        out_of_band = PickleCodec(out_of_band=True, optimize=True)
+        assert out_of_band.loads(out_of_band.dumps(VALUE)) == VALUE
+
+    def test_numpy_arrays(self, request):
+        numpy = pytest.importorskip('numpy')
+        r = _get_client(PickleSerializedRedis, request, pickle_codec=PickleCodec(out_of_band=True))
+        array = numpy.arange(10000, dtype='float64').reshape(100, 100)
+        r.set('a', array)
+        value = r.get('a')
+        assert (value == array).all()
+        assert not value.flags.writeable
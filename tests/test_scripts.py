@@ -0,0 +1,120 @@
+import pytest
+import redis
+
+from serialized_redis import PickleSerializedRedis, MsgpackSerializedRedis, SerializedScript
+
+from .conftest import VALUE, _get_client
+
+# sets KEYS[1] to ARGV[1] if it does not exist, returns the current value
+GET_OR_SET = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    return value
+end
+redis.call('SET', KEYS[1], ARGV[1])
+return ARGV[1]
+"""
+
+# pushes ARGV[2:] to KEYS[1] keeping at most ARGV[1] values, returns the list
+PUSH_CAPPED = """
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 2))
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[1]), -1)
+return redis.call('LRANGE', KEYS[1], 0, -1)
+"""
+
+
+@pytest.fixture()
+def r(request, client_class):
+    return _get_client(client_class, request)
+
+
+class TestSerializedScript(object):
+
+    def test_value(self, r):
+        get_or_set = r.register_script(GET_OR_SET, values=[0], reply='value')
+        assert isinstance(get_or_set, SerializedScript)
+        assert get_or_set(['a'], [VALUE]) == VALUE
+        assert get_or_set(['a'], [{'other': 1}]) == VALUE
+        assert r.get('a') == VALUE
+
+    def test_list(self, r):
+        push = r.register_script(PUSH_CAPPED, values=[1, 2, 3], reply='list')
+        assert push(['l'], [2, 'a', VALUE]) == ['a', VALUE]
+        assert push(['l'], [2, None]) == [VALUE, None]
+        assert r.lrange('l', 0, -1) == [VALUE, None]
+
+    def test_negative_positions(self, r):
+        script = r.register_script("if ARGV[1] == 'raw' then return ARGV[2] end", values=[-1], reply='value')
+        assert script(args=['raw', VALUE]) == VALUE
+
+    def test_all_values(self, r):
+        script = r.register_script("redis.call('SADD', KEYS[1], unpack(ARGV)) "
+                                   "return redis.call('SMEMBERS', KEYS[1])", values=True, reply='list')
+        assert sorted(script(['s'], [1, 2, 'x']), key=str) == [1, 2, 'x']
+        assert r.smembers('s') == {1, 2, 'x'}
+
+    def test_hash(self, r):
+        r.hmset('h', {'f1': VALUE, 'f2': 2})
+        script = r.register_script("return redis.call('HGETALL', KEYS[1])", reply='hash')
+        assert script(['h']) == {'f1': VALUE, 'f2': 2}
+        assert script(['missing']) == {}
+
+    def test_zset(self, r):
+        r.zadd('z', {'a': 1, 'b': 2.5})
+        script = r.register_script("return redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')", reply='zset')
+        assert script(['z']) == [('a', 1.0), ('b', 2.5)]
+
+    def test_mixed_reply(self, r):
+        script = r.register_script("return {ARGV[1], 3, false}", values=[0], reply='list')
+        assert script(args=['a']) == ['a', 3, None]
+        script = r.register_script("return tonumber(ARGV[1])", reply='value')
+        assert script(args=[3]) == 3
+        script = r.register_script("return redis.call('GET', KEYS[1])", reply='list')
+        assert script(['missing']) is None
+
+    def test_callable_reply(self, r):
+        script = r.register_script("return {KEYS[1], ARGV[1]}", values=[0],
+                                   reply=lambda client, response: (client.decode(response[0]),
+                                                                   client.deserialize(response[1])))
+        assert script(['k'], [VALUE]) == ('k', VALUE)
+
+    def test_raw(self, r):
+        script = r.register_script("return ARGV[1]")
+        assert not isinstance(script, SerializedScript)
+        assert script(args=['a']) in (b'a', 'a')
+
+    def test_pipeline(self, r):
+        get_or_set = r.register_script(GET_OR_SET, values=[0], reply='value')
+        with r.pipeline() as pipe:
+            pipe.set('b', 1)
+            get_or_set(['a'], [VALUE], client=pipe)
+            get_or_set(['b'], [2], client=pipe)
+            pipe.get('a')
+            assert pipe.execute() == [True, VALUE, 1, VALUE]
+
+    def test_script_loaded_again(self, r):
+        script = r.register_script(GET_OR_SET, values=[0], reply='value')
+        assert script(['a'], [1]) == 1
+        r.script_flush()
+        assert script(['a'], [2]) == 1
+        r.script_flush()
+        with r.pipeline() as pipe:
+            script(['b'], [VALUE], client=pipe)
+            assert pipe.execute() == [VALUE]
+        assert r.script_exists(script.sha) == [True]
+
+    def test_errors(self, r):
+        with pytest.raises(ValueError):
+            r.register_script("return 1", reply='tuple')
+        script = r.register_script("return redis.error_reply('failed')", reply='value')
+        with pytest.raises(redis.ResponseError):
+            script()
+
+
+def test_other_client(request):
+    r = _get_client(PickleSerializedRedis, request)
+    other = _get_client(MsgpackSerializedRedis, request)
+    script = r.register_script(GET_OR_SET, values=[0], reply='value')
+    # values are serialized and deserialized by the client running the script
+    assert script(['a'], [VALUE], client=other) == VALUE
+    assert other.get('a') == VALUE